@@ -0,0 +1,203 @@
+"""
+End-to-end benchmark of the bot against the local mock Roblox API
+
+Each scenario starts a MockRobloxServer with a friend request backlog and
+fault settings, points a RobloxFriendBot at it through base_url, and drains
+the backlog with the sync and async engines. It reports accepts per second,
+time to drain and HTTP requests per accept, so regressions in the accept path
+or the retry handling show up as numbers.
+
+The realtime scenario instead runs run_forever with a RealtimeSubscriber. It
+pushes the backlog through the mock's realtime hub, then drops the stream
+and checks that polling accepts new requests and that the subscriber
+reconnects.
+
+Usage:
+    python bench_bot.py [--backlog 200] [--engines sync async] [--scenarios baseline csrf realtime]
+"""
+import argparse
+import asyncio
+import logging
+import threading
+import time
+
+from mock_roblox_api import MockRobloxServer, MockRobloxState
+from railway_bot import (DEFAULT_ACCEPT_CONCURRENCY, AsyncRobloxFriendBot, BotMetrics, PollScheduler, RealtimeSubscriber, RequestGuard,
+                         RequestStateStore, RobloxFriendBot, ShutdownController)
+
+SCENARIOS = {
+    'baseline': {},
+    'latency': {'latency': 0.02, 'jitter': 0.01},
+    'csrf': {'csrf_rotate_every': 25},
+    'rate-limited': {'rate_limit_every': 20, 'retry_after': 0.05},
+    'hostile': {'latency': 0.02, 'jitter': 0.01, 'csrf_rotate_every': 25, 'rate_limit_every': 20, 'retry_after': 0.05},
+    'realtime': {'realtime': True}
+}
+
+# Friend requests added while the realtime stream is down, to be picked up by polling
+REALTIME_FALLBACK_REQUESTS = 10
+
+
+def drain_sync(bot, state, page_size, timeout):
+    """Accept friend requests one at a time until the mock has none left"""
+    deadline = time.monotonic() + timeout
+    while state.pending and time.monotonic() < deadline:
+        for request in bot.iter_friend_requests(limit=page_size, max_pages=None):
+            bot._accept_friend_request(request.requester_id)
+
+
+async def drain_async(bot, state, page_size, timeout):
+    """Accept friend requests concurrently, page by page, until the mock has none left"""
+    deadline = time.monotonic() + timeout
+    while state.pending and time.monotonic() < deadline:
+        tasks = []
+        async for items in bot.iter_friend_request_pages(limit=page_size, max_pages=None):
+            tasks.extend(asyncio.create_task(bot._accept_friend_request(request.requester_id)) for request in items)
+        await asyncio.gather(*tasks)
+
+
+def wait_for(condition, timeout):
+    """
+    Returns:
+        bool: Whether condition() became true before timeout seconds passed
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def drive_realtime(state, subscriber, shutdown, backlog, timeout, result):
+    """Push the backlog through the hub, drop the stream, check polling takes over and the subscriber reconnects, then stop run_forever"""
+    try:
+        if not wait_for(lambda: subscriber.connected, timeout):
+            return
+        state.reset_stats()
+        accepted_before = state.accepts
+        started = time.perf_counter()
+        state.push_friend_request(backlog)
+        wait_for(lambda: not state.pending, timeout)
+        result['seconds'] = time.perf_counter() - started
+        result['accepted'] = state.accepts - accepted_before
+        result['left'] = len(state.pending)
+        result['requests'] = state.stats['requests']
+
+        state.realtime = False
+        state.drop_realtime()
+        if not wait_for(lambda: not subscriber.connected, timeout):
+            return
+        started = time.perf_counter()
+        state.add_requests(REALTIME_FALLBACK_REQUESTS)
+        if wait_for(lambda: not state.pending, timeout):
+            result['fallback_seconds'] = time.perf_counter() - started
+
+        state.realtime = True
+        result['reconnected'] = wait_for(lambda: subscriber.connected, timeout)
+    finally:
+        shutdown.request_stop('benchmark finished')
+
+
+def run_realtime(name, settings, engine, backlog, concurrency, timeout):
+    """
+    Accept a pushed backlog with run_forever, then check the polling fallback and the reconnect
+
+    Returns:
+        dict: The run_scenario fields, plus seconds for polling to accept requests sent while the stream was down and whether it reconnected
+    """
+    state = MockRobloxState(backlog=0, **settings)
+    with MockRobloxServer(state) as server:
+        metrics = BotMetrics(summary_interval=0)
+        # The negotiate circuit opens while the hub refuses connections, a short reset timeout lets the reconnect through
+        guard = RequestGuard(base_delay=0.05, reset_timeout=1, metrics=metrics)
+        bot = RobloxFriendBot(cookie='bench', base_url=server.base_url, metrics=metrics, guard=guard, fast_start=False)
+        subscriber = RealtimeSubscriber(poll_interval=timeout)
+        shutdown = ShutdownController()
+        result = {'accepted': 0, 'left': backlog, 'seconds': 0.0, 'requests': 0, 'fallback_seconds': None, 'reconnected': False}
+
+        driver = threading.Thread(target=drive_realtime, args=(state, subscriber, shutdown, backlog, timeout, result), daemon=True)
+        driver.start()
+        options = {'scheduler': PollScheduler(interval=1), 'state_store': RequestStateStore(':memory:'), 'shutdown': shutdown, 'realtime': subscriber}
+        if engine == 'async':
+            asyncio.run(AsyncRobloxFriendBot(max_concurrency=concurrency, bot=bot).run_forever(**options))
+        else:
+            bot.run_forever(**options)
+        driver.join()
+
+        accepted, elapsed = result['accepted'], result['seconds']
+        return {
+            'scenario': name,
+            'engine': engine,
+            'accepted': accepted,
+            'left': result['left'],
+            'seconds': elapsed,
+            'accepts_per_second': accepted / elapsed if elapsed else 0.0,
+            'requests_per_accept': result['requests'] / accepted if accepted else float('inf'),
+            'fallback_seconds': result['fallback_seconds'],
+            'reconnected': result['reconnected']
+        }
+
+
+def run_scenario(name, settings, engine, backlog, page_size, concurrency, timeout):
+    """
+    Drain one backlog with one engine
+
+    Returns:
+        dict: accepted, seconds, accepts per second, requests per accept and what was left over
+    """
+    state = MockRobloxState(backlog=backlog, **settings)
+    with MockRobloxServer(state) as server:
+        bot = RobloxFriendBot(cookie='bench', base_url=server.base_url, metrics=BotMetrics(summary_interval=0))
+        state.reset_stats()
+        accepted_before = state.accepts
+
+        started = time.perf_counter()
+        if engine == 'async':
+            async_bot = AsyncRobloxFriendBot(max_concurrency=concurrency, bot=bot)
+            asyncio.run(drain_async(async_bot, state, page_size, timeout))
+        else:
+            drain_sync(bot, state, page_size, timeout)
+        elapsed = time.perf_counter() - started
+
+        accepted = state.accepts - accepted_before
+        return {
+            'scenario': name,
+            'engine': engine,
+            'accepted': accepted,
+            'left': len(state.pending),
+            'seconds': elapsed,
+            'accepts_per_second': accepted / elapsed if elapsed else 0.0,
+            'requests_per_accept': state.stats['requests'] / accepted if accepted else float('inf')
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--backlog', type=int, default=200, help='Pending friend requests per run')
+    parser.add_argument('--page-size', type=int, default=100, help='Friend requests fetched per page')
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_ACCEPT_CONCURRENCY, help='Concurrent accepts for the async engine')
+    parser.add_argument('--engines', nargs='+', choices=['sync', 'async'], default=['sync', 'async'])
+    parser.add_argument('--scenarios', nargs='+', choices=sorted(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument('--timeout', type=float, default=120, help='Give up on a run after this many seconds')
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.ERROR)
+
+    print(f"{'scenario':<14} {'engine':<6} {'accepted':>8} {'left':>5} {'seconds':>8} {'accepts/s':>10} {'req/accept':>10}")
+    for name in args.scenarios:
+        for engine in args.engines:
+            settings = SCENARIOS[name]
+            if settings.get('realtime'):
+                result = run_realtime(name, settings, engine, args.backlog, args.concurrency, args.timeout)
+            else:
+                result = run_scenario(name, settings, engine, args.backlog, args.page_size, args.concurrency, args.timeout)
+            print(f"{result['scenario']:<14} {result['engine']:<6} {result['accepted']:>8} {result['left']:>5} "
+                  f"{result['seconds']:>8.2f} {result['accepts_per_second']:>10.1f} {result['requests_per_accept']:>10.2f}")
+            if 'fallback_seconds' in result:
+                fallback = 'never' if result['fallback_seconds'] is None else f"in {result['fallback_seconds']:.2f}s"
+                print(f"{'':<21} polling took over {fallback}, reconnected: {'yes' if result['reconnected'] else 'no'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,506 @@
+"""
+Local stand-in for the Roblox API endpoints the bot uses
+
+Serves every subdomain from one port, with the subdomain as the first path
+segment, which is the layout RobloxFriendBot produces when given a base_url:
+
+    GET  /users/v1/users/authenticated
+    GET  /friends/v1/user/friend-requests/count
+    GET  /friends/v1/my/friends/requests?limit=&cursor=
+    POST /friends/v1/users/{id}/accept-friend-request
+    POST /www/api/friends/acceptfriendrequest
+    POST /users/v1/users
+    POST /accountsettings/v1/email and the other CSRF endpoints
+    POST /realtime-signalr/userhub/negotiate
+    GET  /realtime-signalr/userhub (WebSocket upgrade)
+
+Latency, CSRF token rotation, rate limiting and the size of the friend
+request backlog are configurable, so benchmarks can exercise the bot's
+retry paths without touching the real site.
+
+The realtime hub speaks just enough of the SignalR JSON protocol for
+RealtimeSubscriber: push_friend_request() queues a request and notifies
+every connected client, and drop_realtime() cuts them off to exercise the
+bot's fallback to polling.
+
+Usage:
+    python mock_roblox_api.py [--port 8080] [--backlog 500] [--latency 0.05]
+    ROBLOX_BASE_URL=http://127.0.0.1:8080 ROBLOSECURITY=mock python railway_bot.py
+"""
+import argparse
+import base64
+import hashlib
+import json
+import random
+import re
+import secrets
+import socket
+import struct
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+PAGE_SIZES = (10, 18, 25, 50, 100)
+FIRST_REQUESTER_ID = 1000000
+WEBSOCKET_GUID = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+SIGNALR_SEPARATOR = '\x1e'
+
+ACCEPT_PATH = re.compile(r'^/friends/v1/users/(?P<user_id>\d+)/accept-friend-request$')
+CSRF_PATHS = {
+    '/accountsettings/v1/email',
+    '/friends/v1/users/1/request-friendship',
+    '/avatar/v1/avatar/set-wearing-assets',
+    '/groups/v1/groups/search'
+}
+
+
+class MockHubConnection:
+    """Server end of one realtime hub WebSocket: unmasked text frames out, masked client frames in"""
+
+    def __init__(self, sock, rfile):
+        self.sock = sock
+        self.rfile = rfile
+        self.lock = threading.Lock()
+
+    def _send_frame(self, opcode, payload):
+        header = bytearray([0x80 | opcode])
+        if len(payload) < 126:
+            header.append(len(payload))
+        elif len(payload) < 1 << 16:
+            header.append(126)
+            header += struct.pack('!H', len(payload))
+        else:
+            header.append(127)
+            header += struct.pack('!Q', len(payload))
+        with self.lock:
+            self.sock.sendall(bytes(header) + payload)
+
+    def send(self, message):
+        """Send one SignalR message"""
+        self._send_frame(0x1, (json.dumps(message) + SIGNALR_SEPARATOR).encode())
+
+    def recv(self):
+        """
+        Returns:
+            str: The next text message, or None once the client has gone
+        """
+        while True:
+            head = self.rfile.read(2)
+            if len(head) < 2:
+                return None
+            length = head[1] & 0x7f
+            if length == 126:
+                length = struct.unpack('!H', self.rfile.read(2))[0]
+            elif length == 127:
+                length = struct.unpack('!Q', self.rfile.read(8))[0]
+            mask = self.rfile.read(4) if head[1] & 0x80 else bytes(4)
+            payload = bytes(byte ^ mask[i % 4] for i, byte in enumerate(self.rfile.read(length)))
+
+            opcode = head[0] & 0x0f
+            if opcode == 0x8:
+                return None
+            if opcode == 0x9:
+                self._send_frame(0xA, payload)
+            elif opcode in (0x0, 0x1):
+                return payload.decode()
+
+    def close(self):
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+
+class MockRobloxState:
+    """Pending friend requests, the current CSRF token and fault injection settings, shared by all handler threads"""
+
+    def __init__(self, backlog=100, latency=0.0, jitter=0.0, csrf_rotate_every=0, rate_limit_every=0, retry_after=0.1,
+                 user_id=1, username='MockUser', realtime=True, hub_ping_interval=15):
+        """
+        Args:
+            backlog (int): Number of pending friend requests to start with
+            latency (float): Seconds added to every response
+            jitter (float): Up to this many extra seconds added at random
+            csrf_rotate_every (int): Rotate the CSRF token after this many POSTs. 0 never rotates.
+            rate_limit_every (int): Answer every Nth accept with a 429. 0 never rate limits.
+            retry_after (float): Retry-After seconds sent with a 429
+            user_id (int): ID of the logged in user
+            username (str): Name of the logged in user
+            realtime (bool): Accept connections to the realtime hub. Can be flipped at any time.
+            hub_ping_interval (float): Seconds between pings the hub sends each client. 0 never pings.
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.csrf_rotate_every = csrf_rotate_every
+        self.rate_limit_every = rate_limit_every
+        self.retry_after = retry_after
+        self.user_id = user_id
+        self.username = username
+        self.token = secrets.token_hex(6)
+        self.lock = threading.Lock()
+        self.stats = Counter()
+        self.posts = 0
+        self.accepts = 0
+        self.pending = {}
+        self.next_requester_id = FIRST_REQUESTER_ID
+        self.realtime = realtime
+        self.hub_ping_interval = hub_ping_interval
+        self.hub_connections = set()
+        self.notification_seq = 0
+        self.add_requests(backlog)
+
+    def add_requests(self, count):
+        """
+        Queue count new friend requests with fresh requester IDs
+
+        Returns:
+            list: The new requester IDs
+        """
+        with self.lock:
+            # Never reuse an ID, the bot remembers requesters it has already accepted
+            start = self.next_requester_id
+            self.next_requester_id += count
+            for requester_id in range(start, start + count):
+                self.pending[requester_id] = f'user{requester_id}'
+            return list(range(start, start + count))
+
+    def push_friend_request(self, count=1):
+        """
+        Queue new friend requests and notify every client connected to the realtime hub
+
+        Returns:
+            list: The new requester IDs
+        """
+        requester_ids = self.add_requests(count)
+        for requester_id in requester_ids:
+            detail = {'Type': 'FriendshipRequested', 'EventArgs': {'UserId1': requester_id, 'UserId2': self.user_id}}
+            with self.lock:
+                self.notification_seq += 1
+                message = {'type': 1, 'target': 'notification',
+                           'arguments': ['FriendshipNotifications', json.dumps(detail), self.notification_seq]}
+            self.broadcast(message)
+        return requester_ids
+
+    def broadcast(self, message):
+        """Send one SignalR message, well-formed or not, to every client connected to the realtime hub"""
+        with self.lock:
+            connections = list(self.hub_connections)
+        for connection in connections:
+            try:
+                connection.send(message)
+            except OSError:
+                pass
+
+    def drop_realtime(self):
+        """Cut off every client connected to the realtime hub"""
+        with self.lock:
+            connections = list(self.hub_connections)
+        for connection in connections:
+            connection.close()
+
+    def reset_stats(self):
+        with self.lock:
+            self.stats.clear()
+
+    def page(self, limit, cursor=None):
+        """
+        Newest first, keyed on requester ID so accepting during pagination doesn't skip anyone
+
+        Returns:
+            tuple: (items, next_cursor)
+        """
+        with self.lock:
+            ids = sorted((requester_id for requester_id in self.pending if cursor is None or requester_id < cursor), reverse=True)
+            page_ids = ids[:limit]
+            items = [self._item(requester_id) for requester_id in page_ids]
+        next_cursor = str(page_ids[-1]) if len(ids) > limit else None
+        return items, next_cursor
+
+    def _item(self, requester_id):
+        name = self.pending[requester_id]
+        return {
+            'friendRequest': {
+                'sentAt': '2024-01-01T00:00:00.000Z',
+                'senderId': requester_id,
+                'sourceUniverseId': None,
+                'originSourceType': 'UserProfile',
+                'contextualFriendRequestType': None
+            },
+            'mutualFriendsList': [],
+            'hasVerifiedBadge': False,
+            'description': '',
+            'created': '2020-01-01T00:00:00.000Z',
+            'isBanned': False,
+            'externalAppDisplayName': None,
+            'id': requester_id,
+            'name': name,
+            'displayName': name.title()
+        }
+
+    def users(self, user_ids):
+        """Batch users lookup, in the shape of POST /v1/users, for requesters that are still pending"""
+        with self.lock:
+            return [
+                {'hasVerifiedBadge': False, 'id': user_id, 'name': self.pending[user_id], 'displayName': self.pending[user_id].title()}
+                for user_id in user_ids if user_id in self.pending
+            ]
+
+    def check_post(self):
+        """
+        Count a POST and rotate the token on schedule
+
+        Returns:
+            int: How many POSTs have been made, including this one
+        """
+        with self.lock:
+            self.posts += 1
+            if self.csrf_rotate_every and self.posts % self.csrf_rotate_every == 0:
+                self.token = secrets.token_hex(6)
+            return self.posts
+
+    def accept(self, requester_id):
+        """
+        Returns:
+            bool: True if the request was pending
+        """
+        with self.lock:
+            if self.pending.pop(requester_id, None) is None:
+                return False
+            self.accepts += 1
+            return True
+
+    def next_accept_is_rate_limited(self):
+        with self.lock:
+            self.stats['accept_attempts'] += 1
+            return bool(self.rate_limit_every) and self.stats['accept_attempts'] % self.rate_limit_every == 0
+
+
+def make_handler(state):
+    """Build a request handler class bound to a MockRobloxState"""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        # Headers and body go out in separate writes, don't let delayed ACKs stall keep-alive connections
+        disable_nagle_algorithm = True
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status, body=None, headers=None):
+            payload = json.dumps(body if body is not None else {}).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def _error(self, status, code, message, headers=None):
+            self._send(status, {'errors': [{'code': code, 'message': message}]}, headers)
+
+        def _begin(self):
+            """Read the body, count the call and apply latency. Returns the path, or None if the caller isn't logged in."""
+            length = int(self.headers.get('Content-Length') or 0)
+            self.body = self.rfile.read(length) if length else b''
+
+            path = urlsplit(self.path).path
+            with state.lock:
+                state.stats['requests'] += 1
+                state.stats[f'{self.command} {ACCEPT_PATH.sub("/friends/v1/users/{id}/accept-friend-request", path)}'] += 1
+
+            delay = state.latency + (random.uniform(0, state.jitter) if state.jitter else 0)
+            if delay:
+                time.sleep(delay)
+
+            if '.ROBLOSECURITY=' not in (self.headers.get('Cookie') or '') and not path.startswith('/__mock__'):
+                self._error(401, 0, 'Authorization has been denied for this request.')
+                return None
+            return path
+
+        def do_GET(self):
+            path = self._begin()
+            if path is None:
+                return
+
+            if path == '/users/v1/users/authenticated':
+                self._send(200, {'id': state.user_id, 'name': state.username, 'displayName': state.username})
+            elif path == '/friends/v1/user/friend-requests/count':
+                with state.lock:
+                    count = len(state.pending)
+                self._send(200, {'count': count})
+            elif path == '/friends/v1/my/friends/requests':
+                query = parse_qs(urlsplit(self.path).query)
+                limit = int(query.get('limit', ['10'])[0])
+                if limit not in PAGE_SIZES:
+                    self._error(400, 0, 'Invalid limit')
+                    return
+                cursor = query.get('cursor', [None])[0]
+                items, next_cursor = state.page(limit, int(cursor) if cursor else None)
+                self._send(200, {'previousPageCursor': cursor, 'nextPageCursor': next_cursor, 'data': items})
+            elif path == '/realtime-signalr/userhub':
+                self._serve_hub()
+            elif path == '/__mock__/stats':
+                with state.lock:
+                    self._send(200, {'pending': len(state.pending), 'accepts': state.accepts, 'stats': dict(state.stats)})
+            else:
+                self._error(404, 0, 'NotFound')
+
+        def _serve_hub(self):
+            """Upgrade to a WebSocket, answer the SignalR handshake, then hold the connection open for notifications"""
+            key = self.headers.get('Sec-WebSocket-Key')
+            if not state.realtime or (self.headers.get('Upgrade') or '').lower() != 'websocket' or not key:
+                self._error(503 if not state.realtime else 400, 0, 'Realtime hub unavailable')
+                return
+
+            accept = base64.b64encode(hashlib.sha1((key + WEBSOCKET_GUID).encode()).digest()).decode()
+            self.send_response(101, 'Switching Protocols')
+            self.send_header('Upgrade', 'websocket')
+            self.send_header('Connection', 'Upgrade')
+            self.send_header('Sec-WebSocket-Accept', accept)
+            self.end_headers()
+            self.wfile.flush()
+            self.close_connection = True
+
+            hub = MockHubConnection(self.connection, self.rfile)
+            closed = threading.Event()
+
+            def ping():
+                while not closed.wait(state.hub_ping_interval):
+                    try:
+                        hub.send({'type': 6})
+                    except OSError:
+                        return
+
+            try:
+                if hub.recv() is None:
+                    return
+                hub.send({})
+                with state.lock:
+                    state.hub_connections.add(hub)
+                    state.stats['realtime_connections'] += 1
+                if state.hub_ping_interval:
+                    threading.Thread(target=ping, name='mock-hub-ping', daemon=True).start()
+                # Client pings need no answer, keep reading until the client goes away
+                while hub.recv() is not None:
+                    pass
+            except OSError:
+                pass
+            finally:
+                closed.set()
+                with state.lock:
+                    state.hub_connections.discard(hub)
+
+        def do_POST(self):
+            path = self._begin()
+            if path is None:
+                return
+
+            # SignalR's negotiate doesn't take a CSRF token
+            if path == '/realtime-signalr/userhub/negotiate':
+                if not state.realtime:
+                    self._error(503, 0, 'Service unavailable')
+                    return
+                connection_id = secrets.token_hex(8)
+                self._send(200, {'negotiateVersion': 1, 'connectionId': connection_id, 'connectionToken': connection_id,
+                                 'availableTransports': [{'transport': 'WebSockets', 'transferFormats': ['Text', 'Binary']}]})
+                return
+
+            state.check_post()
+            if self.headers.get('X-CSRF-TOKEN') != state.token:
+                self._error(403, 0, 'Token Validation Failed', {'x-csrf-token': state.token})
+                return
+
+            match = ACCEPT_PATH.match(path)
+            if match:
+                if state.next_accept_is_rate_limited():
+                    self._error(429, 0, 'Too many requests', {'Retry-After': str(state.retry_after)})
+                elif state.accept(int(match.group('user_id'))):
+                    self._send(200, {})
+                else:
+                    self._error(400, 10, 'The friend request does not exist.')
+            elif path == '/users/v1/users':
+                try:
+                    user_ids = [int(user_id) for user_id in json.loads(self.body or b'{}').get('userIds', [])]
+                except (ValueError, TypeError, AttributeError):
+                    self._error(400, 0, 'Invalid request')
+                    return
+                if len(user_ids) > 100:
+                    self._error(400, 2, 'Too many ids')
+                    return
+                self._send(200, {'data': state.users(user_ids)})
+            elif path == '/www/api/friends/acceptfriendrequest':
+                self._send(200, {'success': False, 'message': 'Use the friends API'})
+            elif path in CSRF_PATHS:
+                self._send(200, {})
+            else:
+                self._error(404, 0, 'NotFound')
+
+    return Handler
+
+
+class MockRobloxServer:
+    """Runs a MockRobloxState behind a threaded HTTP server on a background thread"""
+
+    def __init__(self, state=None, host='127.0.0.1', port=0):
+        """
+        Args:
+            state (MockRobloxState, optional): State to serve. A default one is created if not provided.
+            host (str): Interface to bind
+            port (int): Port to listen on, 0 picks a free one
+        """
+        self.state = state or MockRobloxState()
+        self.server = ThreadingHTTPServer((host, port), make_handler(self.state))
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, name='mock-roblox-api', daemon=True)
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.state.drop_realtime()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1', help='Interface to bind')
+    parser.add_argument('--port', type=int, default=8080, help='Port to listen on')
+    parser.add_argument('--backlog', type=int, default=100, help='Pending friend requests to start with')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds added to every response')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Up to this many extra seconds added at random')
+    parser.add_argument('--csrf-rotate-every', type=int, default=0, help='Rotate the CSRF token after this many POSTs')
+    parser.add_argument('--rate-limit-every', type=int, default=0, help='Answer every Nth accept with a 429')
+    parser.add_argument('--retry-after', type=float, default=0.1, help='Retry-After seconds sent with a 429')
+    args = parser.parse_args()
+
+    state = MockRobloxState(backlog=args.backlog, latency=args.latency, jitter=args.jitter,
+                            csrf_rotate_every=args.csrf_rotate_every, rate_limit_every=args.rate_limit_every,
+                            retry_after=args.retry_after)
+    server = MockRobloxServer(state, args.host, args.port)
+    print(f"🧪 Mock Roblox API serving {args.backlog} friend requests on {server.base_url}")
+    try:
+        server.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Offline profiling of the bot by recording HTTP traffic once and replaying it
+
+"record" runs the bot against the local mock Roblox API and writes every
+call to a trace. A production trace can be captured the same way by setting
+HTTP_RECORD on a live deployment. "replay" runs run_forever with the network
+swapped for that trace, under cProfile and tracemalloc, and stops it
+through the bot's graceful shutdown after --duration seconds. The replay
+can run at full speed or with the recorded latencies. Every profile then
+sees the same responses and can be repeated.
+
+Usage:
+    python profile_bot.py record trace.jsonl.gz [--backlog 500] [--duration 10]
+    python profile_bot.py replay trace.jsonl.gz [--engine sync] [--timing fast] [--duration 30] [--cpu-out bot.prof]
+"""
+import argparse
+import asyncio
+import logging
+import threading
+import time
+
+from mock_roblox_api import MockRobloxServer, MockRobloxState
+from railway_bot import (DEFAULT_ACCEPT_CONCURRENCY, DEFAULT_PROFILE_TOP, AsyncRobloxFriendBot, BotMetrics, HttpTraceRecorder,
+                         HttpTraceReplay, ProfileSession, RequestStateStore, RobloxFriendBot, ShutdownController, TransportConfig)
+
+
+def run_bot(engine, transport, duration, base_url=None, concurrency=DEFAULT_ACCEPT_CONCURRENCY):
+    """
+    Run run_forever for duration seconds, then stop it the way a SIGTERM would
+
+    Returns:
+        RobloxFriendBot: The bot, for its metrics
+    """
+    metrics = BotMetrics(summary_interval=0)
+    shutdown = ShutdownController()
+    state_store = RequestStateStore(':memory:')
+    bot = RobloxFriendBot(cookie='profile', base_url=base_url, metrics=metrics, transport=transport, fast_start=False)
+
+    timer = threading.Timer(duration, shutdown.request_stop, ('duration',))
+    timer.start()
+    try:
+        if engine == 'async':
+            async_bot = AsyncRobloxFriendBot(max_concurrency=concurrency, bot=bot)
+            asyncio.run(async_bot.run_forever(state_store=state_store, shutdown=shutdown))
+        else:
+            bot.run_forever(state_store=state_store, shutdown=shutdown)
+    finally:
+        timer.cancel()
+        state_store.close()
+    return bot
+
+
+def record(args):
+    state = MockRobloxState(backlog=args.backlog, latency=args.latency, jitter=args.latency / 2)
+    recorder = HttpTraceRecorder(args.trace)
+    with MockRobloxServer(state) as server:
+        run_bot(args.engine, TransportConfig(recorder=recorder), args.duration, base_url=server.base_url, concurrency=args.concurrency)
+        base_url = server.base_url
+    recorder.close()
+    print(f"Recorded {recorder.count} HTTP calls ({state.accepts} accepts) to {args.trace}")
+    print(f"Replay with: python profile_bot.py replay {args.trace} --base-url {base_url}")
+
+
+def replay(args):
+    trace = HttpTraceReplay.from_file(args.trace, args.timing)
+    profile = ProfileSession(cpu_path=args.cpu_out, memory=not args.no_memory, top=args.top)
+
+    started = time.perf_counter()
+    profile.start()
+    try:
+        bot = run_bot(args.engine, TransportConfig(replay=trace), args.duration, base_url=args.base_url, concurrency=args.concurrency)
+    finally:
+        report = profile.stop()
+    elapsed = time.perf_counter() - started
+
+    print(f"Replayed {trace.served} HTTP calls ({trace.repeated} repeated, {trace.missing} not recorded) in {elapsed:.2f}s, "
+          f"{bot.metrics.counter_total('accepts_total')} accepts")
+    if report['cpu'] is not None:
+        report['cpu'].print_stats(args.top)
+        print(f"CPU profile written to {args.cpu_out}, inspect with: python -m pstats {args.cpu_out}")
+    if report['memory'] is not None:
+        print(f"Top {args.top} allocation sites by growth:")
+        for diff in report['memory']:
+            print(f"  {diff}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('mode', choices=['record', 'replay'])
+    parser.add_argument('trace', help='Trace file, gzipped JSON lines')
+    parser.add_argument('--engine', choices=['sync', 'async'], default='sync')
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_ACCEPT_CONCURRENCY, help='Concurrent accepts for the async engine')
+    parser.add_argument('--duration', type=float, default=10, help='Seconds to run the bot for')
+    parser.add_argument('--backlog', type=int, default=500, help='Pending friend requests on the mock when recording')
+    parser.add_argument('--latency', type=float, default=0.02, help='Mock response latency when recording')
+    parser.add_argument('--base-url', help='base_url the trace was recorded with, if it was pointed at a mock')
+    parser.add_argument('--timing', choices=[HttpTraceReplay.FAST, HttpTraceReplay.ORIGINAL], default=HttpTraceReplay.FAST)
+    parser.add_argument('--cpu-out', default='bot.prof', help='Where to write the cProfile stats')
+    parser.add_argument('--no-memory', action='store_true', help="Don't trace allocations")
+    parser.add_argument('--top', type=int, default=DEFAULT_PROFILE_TOP, help='Functions and allocation sites to report')
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.ERROR)
+
+    if args.mode == 'record':
+        record(args)
+    else:
+        replay(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,468 +1,4733 @@
 import requests
+import asyncio
 import time
 import json
+import operator
 import os
 import logging
-import traceback
+import logging.handlers
+import functools
+import hashlib
+import re
+import sqlite3
+import random
+import threading
+import queue
+import sys
+import atexit
+import gzip
+import cProfile
+import pstats
+import tracemalloc
+import signal
+import _thread
+import bisect
+import socket
+import ssl
+import struct
+import base64
+from collections import OrderedDict, deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
 from datetime import datetime
+from email.utils import parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import quote, urlsplit
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
-# Set up logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler("roblox_bot.log"),
-        logging.StreamHandler()
+# Page sizes accepted by the friend requests endpoint
+FRIEND_REQUEST_PAGE_SIZES = (10, 18, 25, 50, 100)
+DEFAULT_FRIEND_REQUEST_PAGE_SIZE = 100
+DEFAULT_FRIEND_REQUEST_MAX_PAGES = 5
+
+# Async engine defaults
+DEFAULT_ACCEPT_CONCURRENCY = 10
+DEFAULT_RETRY_AFTER = 2
+MAX_RETRY_AFTER = 60
+
+# How long a successful login check is trusted before re-verifying
+DEFAULT_SESSION_TTL = 300
+
+# Where accepted, failed and skipped requests are remembered between restarts
+DEFAULT_STATE_DB = 'roblox_bot_state.db'
+
+# Adaptive polling defaults
+DEFAULT_POLL_MIN_INTERVAL = 0.5
+DEFAULT_POLL_MAX_INTERVAL = 20
+
+# Logging defaults
+DEFAULT_LOG_FILE = 'roblox_bot.log'
+DEFAULT_LOG_MAX_BYTES = 5 * 1024 * 1024
+DEFAULT_LOG_BACKUP_COUNT = 3
+
+# Metrics defaults
+DEFAULT_LATENCY_BUCKETS = (0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+DEFAULT_CALL_COUNT_BUCKETS = (1, 2, 3, 5, 8, 13, 21)
+DEFAULT_METRICS_SUMMARY_INTERVAL = 60
+DEFAULT_METRICS_HOST = '127.0.0.1'
+
+# Transport defaults
+ROBLOX_API_HOSTS = ('friends', 'users', 'accountsettings', 'avatar', 'groups', 'www', 'realtime-signalr')
+DEFAULT_CONNECT_TIMEOUT = 3.05
+DEFAULT_READ_TIMEOUT = 10
+DEFAULT_HTTP_RETRIES = 3
+DEFAULT_HTTP_RETRY_BACKOFF = 0.3
+
+# Retry and circuit breaker defaults
+DEFAULT_RETRY_MAX_ATTEMPTS = 3
+DEFAULT_RETRY_BASE_DELAY = 0.5
+DEFAULT_RETRY_MAX_DELAY = 30
+DEFAULT_CIRCUIT_FAILURE_THRESHOLD = 5
+DEFAULT_CIRCUIT_RESET_TIMEOUT = 30
+
+# Requester filter defaults
+DEFAULT_PROFILE_CACHE_SIZE = 10000
+DEFAULT_PROFILE_CACHE_TTL = 3600
+DEFAULT_PROFILE_BATCH_SIZE = 100
+# Longest the count gate trusts an unchanged count to mean a backlog of filtered or backed-off requesters
+DEFAULT_IDLE_BACKLOG_RELIST = 300
+
+# Record/replay and profiling defaults
+TRACE_RESPONSE_HEADERS = ('Content-Type', 'x-csrf-token', 'Retry-After', 'Location')
+DEFAULT_PROFILE_TOP = 25
+
+# Graceful shutdown defaults
+DEFAULT_SHUTDOWN_DEADLINE = 20
+DEFAULT_CHECKPOINT_MAX_AGE = 3600
+
+# Realtime notification defaults, the hub pings every 15 seconds and expects the same from clients
+REALTIME_HUB_URL = 'https://realtime-signalr.roblox.com/userhub'
+DEFAULT_REALTIME_POLL_INTERVAL = 60
+DEFAULT_REALTIME_RECONNECT_MAX = 60
+REALTIME_KEEPALIVE_INTERVAL = 15
+REALTIME_SERVER_TIMEOUT = 30
+
+# Matches the scheme and host of a Roblox API URL, capturing the subdomain
+ROBLOX_HOST_PATTERN = re.compile(r'^https://(?P<subdomain>[a-z-]+)\.roblox\.com')
+
+
+class StructuredEvent:
+    """
+    A log message made of an event name, a message template and fields
+    
+    Nothing is formatted until a handler asks for the text, which happens on
+    the background logging thread. Field values may be callables so expensive
+    payloads are only built when a handler actually writes the record.
+    """
+    
+    __slots__ = ('event', 'template', 'fields')
+    
+    def __init__(self, event, template, fields):
+        self.event = event
+        self.template = template
+        self.fields = fields
+    
+    def resolved_fields(self):
+        return {key: value() if callable(value) else value for key, value in self.fields.items()}
+    
+    def message(self, fields):
+        try:
+            return self.template.format(**fields)
+        except (KeyError, IndexError, ValueError):
+            return self.template
+    
+    def __str__(self):
+        fields = self.resolved_fields()
+        message = self.message(fields)
+        extra = ' '.join(f"{key}={value}" for key, value in fields.items() if '{' + key not in self.template)
+        return f"{message} [{self.event}{' ' + extra if extra else ''}]"
+
+
+class EventLogger:
+    """Emits StructuredEvents, skipping all work for levels that are disabled"""
+    
+    def __init__(self, name):
+        self.logger = logging.getLogger(name)
+    
+    def log(self, level, event, template='', exc_info=False, **fields):
+        if self.logger.isEnabledFor(level):
+            self.logger.log(level, StructuredEvent(event, template, fields), exc_info=exc_info)
+    
+    def debug(self, event, template='', **fields):
+        self.log(logging.DEBUG, event, template, **fields)
+    
+    def info(self, event, template='', **fields):
+        self.log(logging.INFO, event, template, **fields)
+    
+    def warning(self, event, template='', **fields):
+        self.log(logging.WARNING, event, template, **fields)
+    
+    def error(self, event, template='', **fields):
+        self.log(logging.ERROR, event, template, **fields)
+    
+    def exception(self, event, template='', **fields):
+        self.log(logging.ERROR, event, template, exc_info=True, **fields)
+    
+    def enabled(self, level):
+        return self.logger.isEnabledFor(level)
+
+
+class JsonLogFormatter(logging.Formatter):
+    """One JSON object per line, with structured event fields kept as keys"""
+    
+    def format(self, record):
+        data = {'ts': self.formatTime(record), 'level': record.levelname, 'logger': record.name}
+        if isinstance(record.msg, StructuredEvent):
+            fields = record.msg.resolved_fields()
+            data['event'] = record.msg.event
+            data['message'] = record.msg.message(fields)
+            data.update(fields)
+        else:
+            data['message'] = record.getMessage()
+        if record.exc_info:
+            data['exception'] = self.formatException(record.exc_info)
+        return json.dumps(data, default=str)
+
+
+class BackgroundQueueHandler(logging.handlers.QueueHandler):
+    """
+    Hands records to the listener thread without formatting them first
+    
+    Records are dropped, and counted, rather than blocking the caller when the
+    queue is full because stdout or the disk has stalled. BotMetrics reports
+    the count in its summary line and as log_records_dropped_total.
+    """
+    
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+    
+    def prepare(self, record):
+        # The queue stays in-process, so formatting can wait for the listener thread
+        return record
+    
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def _dropped_log_records():
+    """Records dropped by every BackgroundQueueHandler on the root logger since it was installed"""
+    return sum(handler.dropped for handler in logging.getLogger().handlers if isinstance(handler, BackgroundQueueHandler))
+
+
+def configure_logging(level=None, log_file=None, max_bytes=None, backup_count=None, json_output=None, queue_size=10000):
+    """
+    Route all logging through a background thread writing to stdout and a rotating file
+    
+    Unset arguments are read from LOG_LEVEL, LOG_FILE, LOG_MAX_BYTES,
+    LOG_BACKUP_COUNT and LOG_FORMAT ("json" for JSON lines).
+    
+    Returns:
+        logging.handlers.QueueListener: The running listener, stopped automatically at exit
+    """
+    level = level or os.environ.get('LOG_LEVEL', 'INFO').upper()
+    log_file = log_file or os.environ.get('LOG_FILE', DEFAULT_LOG_FILE)
+    max_bytes = max_bytes or int(os.environ.get('LOG_MAX_BYTES', DEFAULT_LOG_MAX_BYTES))
+    backup_count = backup_count if backup_count is not None else int(os.environ.get('LOG_BACKUP_COUNT', DEFAULT_LOG_BACKUP_COUNT))
+    if json_output is None:
+        json_output = os.environ.get('LOG_FORMAT', '').lower() == 'json'
+    
+    formatter = JsonLogFormatter() if json_output else logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+    handlers = [logging.StreamHandler(sys.stdout)]
+    if log_file:
+        handlers.append(logging.handlers.RotatingFileHandler(log_file, maxBytes=max_bytes, backupCount=backup_count))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    
+    log_queue = queue.Queue(maxsize=queue_size)
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(BackgroundQueueHandler(log_queue))
+    root.setLevel(level)
+    
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
+
+
+events = EventLogger('roblox_bot')
+
+
+def _rebase_url(url, base_url=None):
+    """
+    Point a Roblox API URL at another server, such as a local mock
+    
+    The subdomain becomes the first path segment, so with a base_url of
+    http://127.0.0.1:8080, https://friends.roblox.com/v1/x is sent to
+    http://127.0.0.1:8080/friends/v1/x.
+    
+    Args:
+        url (str): A https://<subdomain>.roblox.com URL
+        base_url (str, optional): Server to send it to instead. None leaves the URL unchanged.
+        
+    Returns:
+        str: The URL to request
+    """
+    if not base_url:
+        return url
+    return ROBLOX_HOST_PATTERN.sub(lambda match: f"{base_url.rstrip('/')}/{match.group('subdomain')}", url, count=1)
+
+
+def _retry_after_seconds(response, default=DEFAULT_RETRY_AFTER, maximum=MAX_RETRY_AFTER):
+    """
+    Work out how long to wait from a 429 response's Retry-After header
+    
+    Args:
+        response (requests.Response): The rate limited response
+        default (float): Delay to use when the header is missing or unreadable
+        maximum (float): Upper bound on the returned delay
+        
+    Returns:
+        float: Seconds to wait before retrying
+    """
+    value = response.headers.get('Retry-After')
+    if not value:
+        return default
+    
+    try:
+        delay = float(value)
+    except ValueError:
+        # Retry-After may also be an HTTP date
+        try:
+            retry_at = parsedate_to_datetime(value)
+            delay = (retry_at - datetime.now(retry_at.tzinfo)).total_seconds()
+        except (TypeError, ValueError):
+            return default
+    
+    return min(max(delay, 0), maximum)
+
+
+_ID_SEGMENT = re.compile(r'/\d+(?=/|$)')
+
+
+def _endpoint_label(url):
+    """Turn a request URL into a low-cardinality label, e.g. friends.roblox.com/v1/users/{id}/accept-friend-request"""
+    parts = urlsplit(url)
+    return parts.netloc + _ID_SEGMENT.sub('/{id}', parts.path)
+
+
+class Histogram:
+    """Cumulative bucket counts plus sum and count, in the Prometheus style"""
+    
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+    
+    def __init__(self, buckets):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+    
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+    
+    def quantile(self, q):
+        """
+        Estimate a quantile by interpolating inside the bucket it falls in
+        
+        Returns:
+            float: The estimate, or None if nothing has been observed
+        """
+        if not self.count:
+            return None
+        
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if seen + count >= rank and count:
+                lower = self.buckets[index - 1] if index else 0.0
+                if index == len(self.buckets):
+                    return lower
+                return lower + (self.buckets[index] - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+
+class BotMetrics:
+    """
+    Thread-safe counters, gauges and histograms for the bot
+    
+    Every HTTP call made through the bot's session is timed per endpoint, and
+    the poll and accept paths add cycle latency, accept latency, calls per
+    accept, fallback usage and retries. The backlog is tracked as friend
+    requests that have been fetched but not yet processed.
+    
+    Metrics are exposed in the Prometheus text format through render(), and a
+    one-line summary is logged every summary_interval seconds.
+    """
+    
+    def __init__(self, prefix='roblox_bot', buckets=DEFAULT_LATENCY_BUCKETS, summary_interval=DEFAULT_METRICS_SUMMARY_INTERVAL):
+        """
+        Args:
+            prefix (str): Prepended to every metric name
+            buckets (tuple): Default histogram bucket bounds, in seconds
+            summary_interval (float): Seconds between summary lines. 0 disables them.
+        """
+        self.prefix = prefix
+        self.buckets = buckets
+        self.summary_interval = summary_interval
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+        self._backlog = {}
+        self._started = time.monotonic()
+        self._last_summary = self._started
+        self._last_summary_counters = {}
+    
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted(labels.items()))
+    
+    def inc(self, name, value=1, **labels):
+        """Add to a counter"""
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+    
+    def set_gauge(self, name, value, **labels):
+        """Set a gauge to an absolute value"""
+        with self._lock:
+            self._gauges[self._key(name, labels)] = value
+    
+    def add_gauge(self, name, delta, **labels):
+        """Move a gauge up or down"""
+        key = self._key(name, labels)
+        with self._lock:
+            self._gauges[key] = self._gauges.get(key, 0) + delta
+    
+    def observe(self, name, value, buckets=None, **labels):
+        """Record a value in a histogram, created with the given buckets on first use"""
+        key = self._key(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(buckets or self.buckets)
+            histogram.observe(value)
+    
+    @contextmanager
+    def timer(self, name, **labels):
+        """Time the body of a with block into a histogram"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+    
+    def observe_http(self, method, url, status, elapsed):
+        """Record one HTTP call, status is None when the call raised"""
+        endpoint = _endpoint_label(url)
+        if status is None:
+            self.inc('http_errors_total', endpoint=endpoint, method=method)
+        else:
+            self.inc('http_requests_total', endpoint=endpoint, method=method, status=str(status))
+        self.observe('http_request_duration_seconds', elapsed, endpoint=endpoint, method=method)
+    
+    def track_backlog(self, requester_ids):
+        """Note fetched friend requests as waiting to be processed"""
+        now = time.monotonic()
+        with self._lock:
+            for requester_id in requester_ids:
+                if requester_id:
+                    self._backlog.setdefault(requester_id, now)
+    
+    def resolve_backlog(self, requester_id):
+        """Drop a friend request from the backlog once it has been handled or skipped"""
+        with self._lock:
+            self._backlog.pop(requester_id, None)
+    
+    def backlog(self):
+        """
+        Returns:
+            tuple: (number of waiting friend requests, age in seconds of the oldest one)
+        """
+        with self._lock:
+            if not self._backlog:
+                return 0, 0.0
+            return len(self._backlog), time.monotonic() - min(self._backlog.values())
+    
+    def counter_total(self, name, **labels):
+        """Sum a counter across every label set matching the given labels"""
+        wanted = set(labels.items())
+        with self._lock:
+            return sum(value for (key, key_labels), value in self._counters.items() if key == name and wanted <= set(key_labels))
+    
+    def histogram(self, name, **labels):
+        """Merge every histogram with this name and matching labels into one"""
+        wanted = set(labels.items())
+        merged = None
+        with self._lock:
+            for (key, key_labels), histogram in self._histograms.items():
+                if key != name or not wanted <= set(key_labels):
+                    continue
+                if merged is None:
+                    merged = Histogram(histogram.buckets)
+                if merged.buckets == histogram.buckets:
+                    merged.counts = [a + b for a, b in zip(merged.counts, histogram.counts)]
+                    merged.sum += histogram.sum
+                    merged.count += histogram.count
+        return merged
+    
+    def _format_labels(self, labels, **extra):
+        items = list(labels) + list(extra.items())
+        if not items:
+            return ''
+        escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in items)
+        return '{' + ','.join(f'{key}="{value}"' for (key, _), value in zip(items, escaped)) + '}'
+    
+    def render(self):
+        """
+        Render every metric in the Prometheus text exposition format
+        
+        Returns:
+            str: The exposition text
+        """
+        depth, age = self.backlog()
+        self.set_gauge('backlog_requests', depth)
+        self.set_gauge('backlog_oldest_age_seconds', age)
+        self.set_gauge('uptime_seconds', time.monotonic() - self._started)
+        
+        lines = []
+        with self._lock:
+            self._counters[self._key('log_records_dropped_total', {})] = _dropped_log_records()
+            for kind, metrics in (('counter', self._counters), ('gauge', self._gauges)):
+                for name in sorted({key for key, _ in metrics}):
+                    lines.append(f"# TYPE {self.prefix}_{name} {kind}")
+                    for (key, labels), value in sorted(metrics.items()):
+                        if key == name:
+                            lines.append(f"{self.prefix}_{name}{self._format_labels(labels)} {value}")
+            
+            for name in sorted({key for key, _ in self._histograms}):
+                lines.append(f"# TYPE {self.prefix}_{name} histogram")
+                for (key, labels), histogram in sorted(self._histograms.items(), key=lambda item: item[0]):
+                    if key != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets + ('+Inf',), histogram.counts):
+                        cumulative += count
+                        lines.append(f"{self.prefix}_{name}_bucket{self._format_labels(labels, le=bound)} {cumulative}")
+                    lines.append(f"{self.prefix}_{name}_sum{self._format_labels(labels)} {histogram.sum}")
+                    lines.append(f"{self.prefix}_{name}_count{self._format_labels(labels)} {histogram.count}")
+        
+        return '\n'.join(lines) + '\n'
+    
+    def summary(self):
+        """
+        Headline numbers for the summary line
+        
+        Returns:
+            dict: HTTP calls, accepts, calls per accept, latency percentiles, retries, backlog and dropped log records
+        """
+        requests_total = self.counter_total('http_requests_total') + self.counter_total('http_errors_total')
+        accepted = self.counter_total('accepts_total', outcome=ACCEPTED)
+        accept_latency = self.histogram('accept_duration_seconds')
+        cycle_latency = self.histogram('poll_cycle_duration_seconds')
+        depth, age = self.backlog()
+        
+        return {
+            'http_calls': requests_total,
+            'accepted': accepted,
+            'calls_per_accept': requests_total / accepted if accepted else None,
+            'accept_p50': accept_latency.quantile(0.5) if accept_latency else None,
+            'accept_p95': accept_latency.quantile(0.95) if accept_latency else None,
+            'cycle_p95': cycle_latency.quantile(0.95) if cycle_latency else None,
+            'retries': self.counter_total('retries_total'),
+            'backlog': depth,
+            'backlog_age': age,
+            'log_dropped': _dropped_log_records()
+        }
+    
+    def maybe_log_summary(self):
+        """Log the summary line if summary_interval has passed since the last one"""
+        now = time.monotonic()
+        if not self.summary_interval or now - self._last_summary < self.summary_interval:
+            return
+        self._last_summary = now
+        
+        summary = self.summary()
+        fallbacks = {}
+        with self._lock:
+            for (key, labels), value in self._counters.items():
+                if key == 'accept_attempts_total':
+                    endpoint = dict(labels)['endpoint']
+                    fallbacks[endpoint] = fallbacks.get(endpoint, 0) + value
+        
+        def fmt(value, spec, unit=''):
+            return 'n/a' if value is None else format(value, spec) + unit
+        
+        events.info('metrics.summary',
+                    "📊 {http_calls} HTTP calls, {accepted} accepted ({per_accept} calls each), "
+                    "accept p50/p95 {p50}/{p95}, cycle p95 {cycle}, {retries} retries, backlog {backlog} (oldest {age:.0f}s), {log_dropped} log records dropped",
+                    http_calls=summary['http_calls'], accepted=summary['accepted'],
+                    per_accept=fmt(summary['calls_per_accept'], '.1f'),
+                    p50=fmt(summary['accept_p50'], '.2f', 's'), p95=fmt(summary['accept_p95'], '.2f', 's'),
+                    cycle=fmt(summary['cycle_p95'], '.2f', 's'), retries=summary['retries'],
+                    backlog=summary['backlog'], age=summary['backlog_age'], log_dropped=summary['log_dropped'], endpoints=fallbacks)
+
+
+class InstrumentedAdapter(HTTPAdapter):
+    """
+    HTTPAdapter that times every request it sends into BotMetrics, including ones that raise
+    
+    Requests sent without a timeout get the adapter's default, so a hung
+    connection can't block a caller forever. Retries made by urllib3 inside
+    the adapter are counted as transport retries. With a recorder, every call
+    is also written to an HTTP trace.
+    """
+    
+    def __init__(self, metrics, *args, timeout=None, recorder=None, **kwargs):
+        """
+        Args:
+            metrics (BotMetrics): Where to record each call
+            timeout (float or tuple, optional): Default (connect, read) timeout for requests that don't set one
+            recorder (HttpTraceRecorder, optional): Writes every request and response to a trace
+            *args, **kwargs: Passed through to HTTPAdapter
+        """
+        self.metrics = metrics
+        self.timeout = timeout
+        self.recorder = recorder
+        super().__init__(*args, **kwargs)
+    
+    def _transmit(self, request, *args, **kwargs):
+        """Send the request over the network"""
+        return super().send(request, *args, **kwargs)
+    
+    def send(self, request, *args, **kwargs):
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = self.timeout
+        
+        started = time.perf_counter()
+        status = None
+        response = error = None
+        try:
+            response = self._transmit(request, *args, **kwargs)
+            status = response.status_code
+            retries = getattr(response.raw, 'retries', None)
+            if retries is not None and retries.history:
+                self.metrics.inc('retries_total', len(retries.history), reason='transport')
+            return response
+        except requests.RequestException as e:
+            error = e
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            self.metrics.observe_http(request.method, request.url, status, elapsed)
+            if self.recorder is not None:
+                self.recorder.record(request, response, elapsed, error)
+
+
+class HttpTraceRecorder:
+    """
+    Writes every request the bot sends, and the response it got, to a gzipped JSON lines trace
+    
+    Each line holds the offset from the start of recording, method, URL,
+    status, elapsed time, the response headers the bot reads and the response
+    body, or the transport error raised instead. Request headers and bodies
+    are left out, so the cookie the bot sends never reaches the trace. CSRF
+    tokens handed out in responses are swapped for numbered placeholders, so
+    a replay still sees the header and every rotation without the trace
+    holding a usable token. Response bodies do carry user IDs and names.
+    """
+    
+    def __init__(self, path):
+        """
+        Args:
+            path (str): Trace file to create, replacing any existing one
+        """
+        self.path = path
+        self.started = time.perf_counter()
+        self.count = 0
+        self._lock = threading.Lock()
+        self._csrf_placeholders = {}
+        self._file = gzip.open(path, 'wt', encoding='utf-8')
+        atexit.register(self.close)
+        events.info('trace.recording', "⏺️ Recording HTTP traffic to {path}", path=path)
+    
+    def _redact_csrf(self, token):
+        """Map a CSRF token to the same placeholder every time it is seen, under the lock"""
+        placeholder = self._csrf_placeholders.get(token)
+        if placeholder is None:
+            placeholder = self._csrf_placeholders[token] = f'redacted-{len(self._csrf_placeholders) + 1}'
+        return placeholder
+    
+    def record(self, request, response, elapsed, error=None):
+        """Append one request and its response, or the error it raised"""
+        entry = {'t': round(time.perf_counter() - self.started - elapsed, 4), 'm': request.method, 'u': request.url, 'e': round(elapsed, 4)}
+        if response is not None:
+            entry['s'] = response.status_code
+            entry['h'] = {name: response.headers[name] for name in TRACE_RESPONSE_HEADERS if name in response.headers}
+            entry['b'] = response.text
+        else:
+            entry['x'] = f'{type(error).__name__}: {error}'
+        
+        with self._lock:
+            if self._file.closed:
+                return
+            if 'x-csrf-token' in entry.get('h', {}):
+                entry['h']['x-csrf-token'] = self._redact_csrf(entry['h']['x-csrf-token'])
+            self._file.write(json.dumps(entry, separators=(',', ':')) + '\n')
+            self.count += 1
+    
+    def close(self):
+        with self._lock:
+            if self._file.closed:
+                return
+            self._file.close()
+        events.info('trace.recorded', "⏹️ Recorded {count} HTTP calls to {path}", count=self.count, path=self.path)
+
+
+def load_http_trace(path):
+    """
+    Read a trace written by HttpTraceRecorder
+    
+    Returns:
+        list: Trace entries in the order they were recorded
+    """
+    with gzip.open(path, 'rt', encoding='utf-8') as trace_file:
+        return [json.loads(line) for line in trace_file if line.strip()]
+
+
+class HttpTraceReplay:
+    """
+    Serves a recorded trace back in place of the network
+    
+    Responses are matched on method and URL and handed out in recorded order.
+    Once the calls recorded for a URL run out, the last response is repeated,
+    so a polling loop can keep running on a finite trace. A call that was
+    never recorded, which happens once the run drifts past the end of the
+    trace, gets an immediate 404 rather than a transport error the bot would
+    back off on. With original timing each response is delayed by its
+    recorded latency, otherwise the trace is served as fast as the bot asks.
+    """
+    
+    FAST = 'fast'
+    ORIGINAL = 'original'
+    
+    def __init__(self, entries, timing=FAST):
+        """
+        Args:
+            entries (list): Trace entries, see load_http_trace()
+            timing (str): FAST or ORIGINAL
+        """
+        if timing not in (self.FAST, self.ORIGINAL):
+            raise ValueError(f"Unknown replay timing {timing!r}, use {self.FAST!r} or {self.ORIGINAL!r}")
+        
+        self.timing = timing
+        self.served = 0
+        self.repeated = 0
+        self.missing = 0
+        self._lock = threading.Lock()
+        self._exhausted = set()
+        self._calls = {}
+        for entry in entries:
+            self._calls.setdefault((entry['m'], entry['u']), deque()).append(entry)
+    
+    @classmethod
+    def from_file(cls, path, timing=FAST):
+        entries = load_http_trace(path)
+        events.info('trace.replaying', "▶️ Replaying {count} recorded HTTP calls from {path} ({timing} timing)", count=len(entries), path=path, timing=timing)
+        return cls(entries, timing)
+    
+    def next_entry(self, method, url):
+        """
+        Returns:
+            dict: Trace entry to answer this call with, or None if the URL was never recorded
+        """
+        key = (method, url)
+        with self._lock:
+            calls = self._calls.get(key)
+            if not calls:
+                self.missing += 1
+                return None
+            self.served += 1
+            if len(calls) > 1:
+                return calls.popleft()
+            if key in self._exhausted:
+                self.repeated += 1
+            self._exhausted.add(key)
+            return calls[0]
+    
+    def respond(self, request):
+        """
+        Build the recorded response for a prepared request
+        
+        Raises:
+            requests.ConnectionError: If the call was recorded as failing
+        """
+        entry = self.next_entry(request.method, request.url)
+        if entry is None:
+            events.debug('trace.missing', "No recorded response for {method} {url}, answering 404", method=request.method, url=request.url)
+            entry = {'s': 404, 'e': 0, 'h': {'Content-Type': 'application/json'}, 'b': '{"errors": [{"code": 0, "message": "Not recorded"}]}'}
+        if self.timing == self.ORIGINAL:
+            time.sleep(entry['e'])
+        if 'x' in entry:
+            raise requests.ConnectionError(f"Recorded error: {entry['x']}", request=request)
+        
+        response = requests.Response()
+        response.status_code = entry['s']
+        response.headers.update(entry.get('h', {}))
+        response._content = entry.get('b', '').encode('utf-8')
+        response.encoding = 'utf-8'
+        response.url = request.url
+        response.request = request
+        return response
+
+
+class ReplayAdapter(InstrumentedAdapter):
+    """InstrumentedAdapter answering from an HttpTraceReplay instead of the network"""
+    
+    def __init__(self, metrics, replay, *args, **kwargs):
+        """
+        Args:
+            metrics (BotMetrics): Where to record each call
+            replay (HttpTraceReplay): Recorded responses, shared by every mounted adapter
+            *args, **kwargs: Passed through to InstrumentedAdapter
+        """
+        self.replay = replay
+        super().__init__(metrics, *args, **kwargs)
+    
+    def _transmit(self, request, *args, **kwargs):
+        return self.replay.respond(request)
+
+
+class TransportConfig:
+    """
+    Connection pooling, timeouts and transport-level retries for the bot's session
+    
+    Each Roblox API host gets its own adapter and connection pool, sized so
+    concurrent accepts don't queue for a connection, with connections kept
+    alive between calls. urllib3 retries transport failures with exponential
+    backoff: connection failures for any method, since the request never
+    left, and read failures only for idempotent methods, so an accept POST is
+    never sent twice by the transport. Error responses are left to the
+    RequestGuard, which doesn't retry transport failures in turn, so one
+    failing call isn't multiplied by both retry layers.
+    """
+    
+    def __init__(self, connect_timeout=DEFAULT_CONNECT_TIMEOUT, read_timeout=DEFAULT_READ_TIMEOUT,
+                 pool_maxsize=DEFAULT_ACCEPT_CONCURRENCY, pool_block=False, retries=DEFAULT_HTTP_RETRIES,
+                 retry_backoff=DEFAULT_HTTP_RETRY_BACKOFF, hosts=ROBLOX_API_HOSTS,
+                 recorder=None, replay=None):
+        """
+        Args:
+            connect_timeout (float): Seconds to wait for a TCP connection
+            read_timeout (float): Seconds to wait between bytes of the response
+            pool_maxsize (int): Connections kept open per host
+            pool_block (bool): Wait for a free connection instead of opening a throwaway one when the pool is exhausted
+            retries (int): Transport retries per request. 0 disables them.
+            retry_backoff (float): Backoff factor between retries, in seconds
+            hosts (tuple): Roblox API subdomains that get their own pool
+            recorder (HttpTraceRecorder, optional): Record every call to a trace
+            replay (HttpTraceReplay, optional): Answer every call from a recorded trace instead of the network
+        """
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.pool_maxsize = pool_maxsize
+        self.pool_block = pool_block
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        self.hosts = tuple(hosts)
+        self.recorder = recorder
+        self.replay = replay
+    
+    @classmethod
+    def from_env(cls):
+        """
+        Build a config from HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT, HTTP_POOL_MAXSIZE,
+        HTTP_POOL_BLOCK, HTTP_RETRIES and HTTP_RETRY_BACKOFF, falling back to the defaults
+        
+        HTTP_RECORD names a trace file to record to. HTTP_REPLAY names one to
+        replay instead of going to the network, with HTTP_REPLAY_TIMING set to
+        "fast" (the default) or "original".
+        """
+        env = os.environ
+        return cls(
+            recorder=HttpTraceRecorder(env['HTTP_RECORD']) if env.get('HTTP_RECORD') else None,
+            replay=HttpTraceReplay.from_file(env['HTTP_REPLAY'], env.get('HTTP_REPLAY_TIMING', HttpTraceReplay.FAST)) if env.get('HTTP_REPLAY') else None,
+            connect_timeout=float(env.get('HTTP_CONNECT_TIMEOUT', DEFAULT_CONNECT_TIMEOUT)),
+            read_timeout=float(env.get('HTTP_READ_TIMEOUT', DEFAULT_READ_TIMEOUT)),
+            pool_maxsize=int(env.get('HTTP_POOL_MAXSIZE', DEFAULT_ACCEPT_CONCURRENCY)),
+            pool_block=env.get('HTTP_POOL_BLOCK', '').lower() in ('1', 'true', 'yes'),
+            retries=int(env.get('HTTP_RETRIES', DEFAULT_HTTP_RETRIES)),
+            retry_backoff=float(env.get('HTTP_RETRY_BACKOFF', DEFAULT_HTTP_RETRY_BACKOFF))
+        )
+    
+    @property
+    def timeout(self):
+        return self.connect_timeout, self.read_timeout
+    
+    def retry(self):
+        """urllib3 Retry policy for transport failures, read failures only for idempotent calls. Responses are left to the RequestGuard."""
+        return Retry(
+            total=self.retries,
+            connect=self.retries,
+            read=self.retries,
+            status=0,
+            backoff_factor=self.retry_backoff,
+            allowed_methods=Retry.DEFAULT_ALLOWED_METHODS,
+            raise_on_status=False
+        )
+    
+    def adapter(self, metrics, pool_maxsize=None):
+        """Build one instrumented adapter, which pools connections for a single host, or replays them"""
+        pool_maxsize = max(pool_maxsize or 0, self.pool_maxsize)
+        if self.replay is not None:
+            return ReplayAdapter(metrics, self.replay, timeout=self.timeout, recorder=self.recorder)
+        return InstrumentedAdapter(metrics, timeout=self.timeout, recorder=self.recorder, pool_connections=1, pool_maxsize=pool_maxsize,
+                                   pool_block=self.pool_block, max_retries=self.retry())
+    
+    def mount(self, session, metrics, pool_maxsize=None, base_url=None):
+        """
+        Mount a dedicated adapter per Roblox host on the session
+        
+        Args:
+            session (requests.Session): Session to configure
+            metrics (BotMetrics): Where the adapters record each call
+            pool_maxsize (int, optional): Raise the per-host pool size, e.g. to the accept concurrency
+            base_url (str, optional): Server the bot was pointed at instead of roblox.com, given its own pool
+        """
+        for host in self.hosts:
+            session.mount(f'https://{host}.roblox.com/', self.adapter(metrics, pool_maxsize))
+        if base_url:
+            session.mount(base_url.rstrip('/') + '/', self.adapter(metrics, pool_maxsize))
+        
+        # Anything else still gets timeouts, retries and metrics
+        session.mount('https://', self.adapter(metrics, pool_maxsize))
+        session.mount('http://', self.adapter(metrics, pool_maxsize))
+
+
+class MetricsServer:
+    """Serves BotMetrics at /metrics in the Prometheus text format from a daemon thread"""
+    
+    def __init__(self, metrics, port, host=DEFAULT_METRICS_HOST):
+        """
+        Args:
+            metrics (BotMetrics): Metrics to expose
+            port (int): Port to listen on, 0 picks a free one
+            host (str): Interface to bind, local only by default
+        """
+        self.metrics = metrics
+        
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(handler):
+                if handler.path.split('?')[0] != '/metrics':
+                    handler.send_error(404)
+                    return
+                body = metrics.render().encode()
+                handler.send_response(200)
+                handler.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                handler.send_header('Content-Length', str(len(body)))
+                handler.end_headers()
+                handler.wfile.write(body)
+            
+            def log_message(handler, format, *args):
+                events.debug('metrics.scrape', "Metrics request: {request}", request=lambda: format % args)
+        
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, name='metrics-server', daemon=True)
+    
+    @property
+    def port(self):
+        return self.server.server_address[1]
+    
+    def start(self):
+        self.thread.start()
+        events.info('metrics.serving', "📊 Serving metrics on http://{host}:{port}/metrics", host=self.server.server_address[0], port=self.port)
+        return self
+    
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class ProfileSession:
+    """
+    cProfile and tracemalloc around a bot run, for finding hot paths and leaks
+    
+    The CPU profile covers the thread that calls start(), which runs every
+    poll and accept in the sync engine but only the event loop in the async
+    one. Memory is compared against a snapshot taken at start(), so what a
+    long-running session keeps allocating shows up at the top.
+    """
+    
+    def __init__(self, cpu_path=None, memory=False, top=DEFAULT_PROFILE_TOP, frames=1):
+        """
+        Args:
+            cpu_path (str, optional): Where to dump pstats data. CPU profiling is off if not provided.
+            memory (bool): Trace allocations with tracemalloc
+            top (int): How many functions and allocation sites to log
+            frames (int): Stack frames tracemalloc keeps per allocation
+        """
+        self.cpu_path = cpu_path
+        self.memory = memory
+        self.top = top
+        self.frames = frames
+        self.profiler = None
+        self._baseline = None
+    
+    @classmethod
+    def from_env(cls):
+        """Build from PROFILE_CPU (pstats output file), PROFILE_MEMORY and PROFILE_TOP"""
+        return cls(
+            cpu_path=os.environ.get('PROFILE_CPU') or None,
+            memory=os.environ.get('PROFILE_MEMORY', '').lower() in ('1', 'true', 'yes'),
+            top=int(os.environ.get('PROFILE_TOP', DEFAULT_PROFILE_TOP))
+        )
+    
+    @property
+    def enabled(self):
+        return bool(self.cpu_path or self.memory)
+    
+    def start(self):
+        if self.memory:
+            tracemalloc.start(self.frames)
+            self._baseline = tracemalloc.take_snapshot()
+        if self.cpu_path:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        if self.enabled:
+            events.info('profile.started', "🔬 Profiling started (cpu: {cpu_path}, memory: {memory})", cpu_path=self.cpu_path, memory=self.memory)
+    
+    def stop(self):
+        """
+        Stop profiling, dump the CPU profile and log the top functions and allocation growth
+        
+        Returns:
+            dict: 'cpu' (pstats.Stats or None) and 'memory' (list of tracemalloc.StatisticDiff or None)
+        """
+        report = {'cpu': None, 'memory': None}
+        
+        if self.profiler is not None:
+            self.profiler.disable()
+            self.profiler.dump_stats(self.cpu_path)
+            stats = pstats.Stats(self.profiler).sort_stats(pstats.SortKey.CUMULATIVE)
+            top = [(func, stats.stats[func]) for func in stats.fcn_list[:self.top]]
+            events.info('profile.cpu', "🔬 Wrote CPU profile to {cpu_path}, {calls} calls in {seconds:.2f}s",
+                        cpu_path=self.cpu_path, calls=stats.total_calls, seconds=stats.total_tt,
+                        top=[{'function': pstats.func_std_string(func), 'calls': nc, 'cumtime': round(ct, 4)} for func, (cc, nc, tt, ct, callers) in top])
+            report['cpu'] = stats
+            self.profiler = None
+        
+        if self._baseline is not None:
+            current, peak = tracemalloc.get_traced_memory()
+            # Leave out what the profilers allocate themselves
+            snapshot = tracemalloc.take_snapshot().filter_traces([
+                tracemalloc.Filter(False, cProfile.__file__),
+                tracemalloc.Filter(False, pstats.__file__),
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, '<frozen importlib._bootstrap*>')
+            ])
+            growth = snapshot.compare_to(self._baseline, 'lineno')[:self.top]
+            tracemalloc.stop()
+            events.info('profile.memory', "🔬 Traced memory {current:.1f} MiB (peak {peak:.1f} MiB)",
+                        current=current / 2 ** 20, peak=peak / 2 ** 20, top=[str(diff) for diff in growth])
+            report['memory'] = growth
+            self._baseline = None
+        
+        return report
+    
+    def __enter__(self):
+        self.start()
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+class StartupTimer:
+    """Marks startup phases and reports time-to-first-poll once"""
+    
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = {}
+        self.first_poll = None
+        self._lock = threading.Lock()
+    
+    def elapsed(self):
+        return time.perf_counter() - self.started
+    
+    def mark(self, phase):
+        """Record when a phase finished, keeping the first time it is reached"""
+        self.phases.setdefault(phase, round(self.elapsed(), 3))
+    
+    def record_first_poll(self, metrics=None):
+        """Report time-to-first-poll the first time a poll response arrives, later calls do nothing"""
+        if self.first_poll is not None:
+            return
+        with self._lock:
+            if self.first_poll is not None:
+                return
+            self.first_poll = self.elapsed()
+        
+        events.info('startup.first_poll', "🚀 First poll {elapsed:.2f}s after start", elapsed=self.first_poll, phases=dict(self.phases))
+        if metrics is not None:
+            metrics.set_gauge('startup_first_poll_seconds', self.first_poll)
+
+
+class ShutdownController:
+    """
+    Turns SIGTERM and SIGINT into a graceful stop of run_forever
+    
+    The first signal stops polling and lets accepts already in flight finish.
+    If the sync engine is still busy deadline seconds later, the main thread
+    is interrupted so the checkpoint is written before the platform's hard
+    kill. A second signal interrupts it straight away.
+    """
+    
+    def __init__(self, deadline=DEFAULT_SHUTDOWN_DEADLINE):
+        """
+        Args:
+            deadline (float): Seconds in-flight accepts get to finish once shutdown is requested
+        """
+        self.deadline = deadline
+        self.reason = None
+        self._stopping = threading.Event()
+        self._stop_at = None
+        self._loop = None
+        self._async_event = None
+        self._timer = None
+        self._previous_handlers = {}
+    
+    @classmethod
+    def from_env(cls):
+        """Build from SHUTDOWN_DEADLINE"""
+        return cls(deadline=float(os.environ.get('SHUTDOWN_DEADLINE', DEFAULT_SHUTDOWN_DEADLINE)))
+    
+    @property
+    def stopping(self):
+        return self._stopping.is_set()
+    
+    def remaining(self):
+        """
+        Returns:
+            float: Seconds left before the deadline, or None if no shutdown has been requested
+        """
+        if self._stop_at is None:
+            return None
+        return max(self._stop_at - time.monotonic(), 0.0)
+    
+    def install(self, loop=None):
+        """
+        Handle SIGTERM and SIGINT until close() is called
+        
+        Args:
+            loop (asyncio.AbstractEventLoop, optional): Event loop of the async engine. Signals are then
+                handled on the loop and the deadline is left to the engine, which can cancel its accepts.
+        
+        Returns:
+            bool: False if signals can't be handled here because this isn't the main thread
+        """
+        if loop is not None:
+            self._loop = loop
+            self._async_event = asyncio.Event()
+            if self.stopping:
+                self._async_event.set()
+        
+        if threading.current_thread() is not threading.main_thread():
+            events.debug('shutdown.no_signals', "Not on the main thread, shutdown signals won't be handled")
+            return False
+        
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            if loop is not None:
+                loop.add_signal_handler(signum, self._handle_loop_signal, signum)
+            else:
+                self._previous_handlers[signum] = signal.signal(signum, self._handle_signal)
+        return True
+    
+    def close(self):
+        """Stop handling signals and cancel the deadline"""
+        if self._timer is not None:
+            self._timer.cancel()
+        if self._loop is not None and threading.current_thread() is threading.main_thread():
+            for signum in (signal.SIGTERM, signal.SIGINT):
+                self._loop.remove_signal_handler(signum)
+        for signum, handler in self._previous_handlers.items():
+            signal.signal(signum, handler)
+        self._previous_handlers = {}
+    
+    def _handle_signal(self, signum, frame):
+        if self.stopping:
+            raise KeyboardInterrupt
+        self.request_stop(signal.Signals(signum).name)
+        
+        # Interrupt whatever the main thread is blocked on once the deadline passes
+        self._timer = threading.Timer(self.deadline, _thread.interrupt_main)
+        self._timer.daemon = True
+        self._timer.start()
+    
+    def _handle_loop_signal(self, signum):
+        if self.stopping:
+            events.warning('shutdown.repeated', "🛑 Already shutting down, {remaining:.1f}s left for in-flight accepts", remaining=self.remaining())
+            return
+        self.request_stop(signal.Signals(signum).name)
+    
+    def request_stop(self, reason='requested'):
+        """Ask run_forever to stop, from any thread"""
+        if self.stopping:
+            return
+        self.reason = reason
+        self._stop_at = time.monotonic() + self.deadline
+        self._stopping.set()
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._async_event.set)
+        events.warning('shutdown.requested', "🛑 Shutdown requested ({reason}), finishing in-flight accepts within {deadline}s",
+                       reason=reason, deadline=self.deadline)
+    
+    def wait(self, delay):
+        """
+        Sleep for delay seconds, waking early on shutdown
+        
+        Returns:
+            bool: True if shutdown has been requested
+        """
+        return self._stopping.wait(delay)
+    
+    async def sleep(self, delay):
+        """Async counterpart of wait(), needs install() to have been given the loop"""
+        if self._async_event is None:
+            await asyncio.sleep(delay)
+        else:
+            try:
+                await asyncio.wait_for(self._async_event.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+        return self.stopping
+    
+    async def wait_stopping(self):
+        """Wait until shutdown is requested, needs install() to have been given the loop"""
+        await self._async_event.wait()
+
+
+class RunProgress:
+    """
+    Friend requests run_forever has picked up but not yet settled
+    
+    Requests are added once they pass the state store and filter, marked in
+    flight when their accept starts and dropped when it finishes. Whatever is
+    left when the bot stops goes into the checkpoint for the next instance.
+    """
+    
+    def __init__(self):
+        self.pending = OrderedDict()
+        self.in_flight = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def __len__(self):
+        with self._lock:
+            return len(self.pending) + len(self.in_flight)
+    
+    def add(self, requests_list):
+        """Note friend requests as waiting to be accepted"""
+        with self._lock:
+            for request in requests_list:
+                if request.requester_id:
+                    self.pending[request.requester_id] = request.requester_name
+    
+    def start(self, requester_id):
+        """Note that an accept has been sent for this requester"""
+        with self._lock:
+            self.in_flight[requester_id] = self.pending.pop(requester_id, 'Unknown')
+    
+    def is_in_flight(self, requester_id):
+        with self._lock:
+            return requester_id in self.in_flight
+    
+    def finish(self, requester_id):
+        """Drop a requester whose outcome has been recorded"""
+        with self._lock:
+            self.pending.pop(requester_id, None)
+            self.in_flight.pop(requester_id, None)
+    
+    def clear(self):
+        with self._lock:
+            self.pending.clear()
+            self.in_flight.clear()
+    
+    def snapshot(self):
+        """
+        Returns:
+            dict: 'pending' and 'in_flight' lists of [requester_id, requester_name]
+        """
+        with self._lock:
+            return {
+                'pending': [[requester_id, name] for requester_id, name in self.pending.items()],
+                'in_flight': [[requester_id, name] for requester_id, name in self.in_flight.items()]
+            }
+
+
+class PollScheduler:
+    """Fixed interval poll scheduler, matching the original run_forever timing"""
+    
+    def __init__(self, interval=5, max_errors=5, error_multiplier=2):
+        """
+        Args:
+            interval (float): Seconds to wait between checks
+            max_errors (int): Consecutive errors before waiting longer
+            error_multiplier (float): How much longer to wait after max_errors errors
+        """
+        self.interval = interval
+        self.max_errors = max_errors
+        self.error_multiplier = error_multiplier
+        self.last_decision = 'fixed'
+        self._errors = 0
+    
+    def observe_response(self, status_code, retry_after=None):
+        """Called for every HTTP response the bot receives"""
+    
+    def record_cycle(self, found):
+        """Called after each completed poll cycle with the number of friend requests found"""
+        self._errors = 0
+        self.last_decision = 'fixed'
+    
+    def record_error(self):
+        """Called when a poll cycle fails"""
+        self._errors += 1
+        self.last_decision = 'error'
+    
+    def next_delay(self):
+        """
+        Returns:
+            float: Seconds to sleep before the next poll cycle
+        """
+        if self._errors >= self.max_errors:
+            self._errors = 0
+            return self.interval * self.error_multiplier
+        return self.interval
+    
+    def snapshot(self):
+        """Current scheduler state, for logging and tuning"""
+        return {'interval': self.interval, 'decision': self.last_decision}
+    
+    def restore(self, snapshot):
+        """Pick up the interval from a snapshot() saved by a previous run"""
+        if snapshot.get('interval'):
+            self.interval = snapshot['interval']
+
+
+class AdaptivePollScheduler(PollScheduler):
+    """
+    Poll scheduler that tightens while friend requests keep arriving and backs off when idle
+    
+    Every cycle that finds requests drops the interval to min_interval. Idle
+    cycles grow it by backoff_factor up to max_interval. 429 and 5xx responses
+    push the next delay out, honouring Retry-After. Delays are jittered so
+    several instances don't poll in lockstep.
+    """
+    
+    def __init__(self, initial_interval=5, min_interval=DEFAULT_POLL_MIN_INTERVAL, max_interval=DEFAULT_POLL_MAX_INTERVAL,
+                 backoff_factor=1.5, jitter=0.1, history_size=100):
+        """
+        Args:
+            initial_interval (float): Interval used until the first cycle completes
+            min_interval (float): Floor used while requests keep arriving
+            max_interval (float): Ceiling used when idle or failing
+            backoff_factor (float): Multiplier applied to the interval on each idle cycle
+            jitter (float): Random +/- fraction applied to every delay
+            history_size (int): How many recent decisions to keep
+        """
+        if not 0 < min_interval <= max_interval:
+            raise ValueError("Poll intervals must satisfy 0 < min_interval <= max_interval")
+        
+        super().__init__(interval=min(max(initial_interval, min_interval), max_interval))
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff_factor = backoff_factor
+        self.jitter = jitter
+        self.last_decision = 'initial'
+        self.history = deque(maxlen=history_size)
+        self._throttle_until = 0
+        self._lock = threading.Lock()
+    
+    def _decide(self, decision):
+        self.last_decision = decision
+        self.history.append((time.time(), decision, self.interval))
+        events.debug('poll.decision', "Poll scheduler decision: {decision}, interval {interval:.2f}s", decision=decision, interval=self.interval)
+    
+    def observe_response(self, status_code, retry_after=None):
+        """Push the next poll out on 429 and 5xx responses"""
+        if status_code != 429 and status_code < 500:
+            return
+        
+        with self._lock:
+            self.interval = min(self.interval * 2, self.max_interval)
+            if status_code == 429:
+                # Retry-After may ask for longer than max_interval, honour it anyway
+                delay = max(self.interval, retry_after or 0)
+                self._throttle_until = max(self._throttle_until, time.monotonic() + delay)
+                self._decide('rate_limited')
+            else:
+                self._decide('server_error')
+    
+    def record_cycle(self, found):
+        """Tighten the interval when requests were found, back off otherwise"""
+        with self._lock:
+            if self.last_decision in ('rate_limited', 'server_error') and time.monotonic() < self._throttle_until:
+                return
+            
+            if found:
+                self.interval = self.min_interval
+                self._decide('active')
+            else:
+                self.interval = min(self.interval * self.backoff_factor, self.max_interval)
+                self._decide('idle')
+    
+    def record_error(self):
+        """Back off after a failed cycle"""
+        with self._lock:
+            self.interval = min(self.interval * 2, self.max_interval)
+            self._decide('error')
+    
+    def next_delay(self):
+        """
+        Returns:
+            float: Jittered seconds to sleep before the next poll cycle
+        """
+        with self._lock:
+            delay = self.interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+            delay = min(max(delay, self.min_interval), self.max_interval)
+            throttle = self._throttle_until - time.monotonic()
+            return max(delay, throttle)
+    
+    def snapshot(self):
+        """Current interval, last decision and recent decision counts, for logging and tuning"""
+        with self._lock:
+            counts = {}
+            for _, decision, _ in self.history:
+                counts[decision] = counts.get(decision, 0) + 1
+            return {'interval': self.interval, 'decision': self.last_decision, 'recent_decisions': counts}
+    
+    def restore(self, snapshot):
+        """Pick up the interval from a snapshot() saved by a previous run, within this scheduler's bounds"""
+        if snapshot.get('interval'):
+            with self._lock:
+                self.interval = min(max(snapshot['interval'], self.min_interval), self.max_interval)
+                self._decide('restored')
+
+
+class CircuitOpenError(requests.RequestException):
+    """Raised instead of calling an endpoint whose circuit breaker is open"""
+    
+    def __init__(self, endpoint, retry_in):
+        super().__init__(f"circuit open for {endpoint}, next probe in {retry_in:.1f}s")
+        self.endpoint = endpoint
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """
+    Closed, open and half-open states for one endpoint
+    
+    After failure_threshold consecutive failures the circuit opens and calls
+    are rejected without touching the network. Once reset_timeout has passed a
+    single probe call is let through, and its outcome closes or re-opens the
+    circuit.
+    """
+    
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+    
+    def __init__(self, failure_threshold=DEFAULT_CIRCUIT_FAILURE_THRESHOLD, reset_timeout=DEFAULT_CIRCUIT_RESET_TIMEOUT):
+        """
+        Args:
+            failure_threshold (int): Consecutive failures that open the circuit
+            reset_timeout (float): Seconds the circuit stays open before a probe is allowed
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+    
+    def retry_in(self):
+        """Seconds until an open circuit lets a probe through"""
+        if self.opened_at is None:
+            return 0.0
+        return max(0.0, self.opened_at + self.reset_timeout - time.monotonic())
+    
+    def allow(self):
+        """
+        Returns:
+            bool: True if a call may be made now
+        """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and self.retry_in() == 0:
+                # Let exactly one probe through
+                self.state = self.HALF_OPEN
+                return True
+            return False
+    
+    def record_success(self):
+        """
+        Returns:
+            bool: True if this closed a circuit that wasn't closed
+        """
+        with self._lock:
+            changed = self.state != self.CLOSED
+            self.state = self.CLOSED
+            self.failures = 0
+            self.opened_at = None
+            return changed
+    
+    def record_failure(self):
+        """
+        Returns:
+            bool: True if this opened the circuit
+        """
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or (self.state == self.CLOSED and self.failures >= self.failure_threshold):
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+                return True
+            return False
+
+
+def _is_failed_response(response):
+    """Default breaker failure test: auth failures, rate limits and server errors"""
+    return response.status_code in (401, 403, 429) or response.status_code >= 500
+
+
+def _is_retryable_response(response):
+    """Default retry test: CSRF rejections, rate limits and server errors. A 401 won't fix itself."""
+    return response.status_code in (403, 429) or response.status_code >= 500
+
+
+class RequestGuard:
+    """
+    Bounded retries with exponential backoff and jitter, plus a circuit breaker per endpoint
+    
+    Every network call the bot makes goes through call() or call_async(), so
+    a failing endpoint gets a few spaced-out attempts and is then left alone
+    until its breaker lets a probe through, instead of being hit in a loop.
+    Endpoints are keyed on their URL with IDs folded out, the same labels the
+    metrics use. Only responses are retried here. A transport failure has
+    already been through urllib3's retries, so it counts against the breaker
+    and is raised straight away.
+    """
+    
+    def __init__(self, max_attempts=DEFAULT_RETRY_MAX_ATTEMPTS, base_delay=DEFAULT_RETRY_BASE_DELAY, max_delay=DEFAULT_RETRY_MAX_DELAY,
+                 failure_threshold=DEFAULT_CIRCUIT_FAILURE_THRESHOLD, reset_timeout=DEFAULT_CIRCUIT_RESET_TIMEOUT, metrics=None):
+        """
+        Args:
+            max_attempts (int): Attempts per call, including the first
+            base_delay (float): Backoff before the first retry, doubled on each further retry
+            max_delay (float): Upper bound on a single backoff
+            failure_threshold (int): Consecutive failures that open an endpoint's circuit
+            reset_timeout (float): Seconds an open circuit waits before letting a probe through
+            metrics (BotMetrics, optional): Where to count retries and circuit state changes
+        """
+        if max_attempts < 1:
+            raise ValueError("max_attempts must be at least 1")
+        
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.metrics = metrics
+        self.breakers = {}
+        self._lock = threading.Lock()
+    
+    @classmethod
+    def from_env(cls, metrics=None):
+        """
+        Build a guard from RETRY_MAX_ATTEMPTS, RETRY_BASE_DELAY, RETRY_MAX_DELAY,
+        CIRCUIT_FAILURE_THRESHOLD and CIRCUIT_RESET_TIMEOUT, falling back to the defaults
+        """
+        env = os.environ
+        return cls(
+            max_attempts=int(env.get('RETRY_MAX_ATTEMPTS', DEFAULT_RETRY_MAX_ATTEMPTS)),
+            base_delay=float(env.get('RETRY_BASE_DELAY', DEFAULT_RETRY_BASE_DELAY)),
+            max_delay=float(env.get('RETRY_MAX_DELAY', DEFAULT_RETRY_MAX_DELAY)),
+            failure_threshold=int(env.get('CIRCUIT_FAILURE_THRESHOLD', DEFAULT_CIRCUIT_FAILURE_THRESHOLD)),
+            reset_timeout=float(env.get('CIRCUIT_RESET_TIMEOUT', DEFAULT_CIRCUIT_RESET_TIMEOUT)),
+            metrics=metrics
+        )
+    
+    def breaker(self, endpoint):
+        """The circuit breaker for an endpoint label, created on first use"""
+        breaker = self.breakers.get(endpoint)
+        if breaker is None:
+            with self._lock:
+                breaker = self.breakers.setdefault(endpoint, CircuitBreaker(self.failure_threshold, self.reset_timeout))
+        return breaker
+    
+    def backoff(self, attempt):
+        """Full-jitter exponential backoff after the given failed attempt"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+    
+    def snapshot(self):
+        """State of every breaker that isn't closed"""
+        return {endpoint: {'state': breaker.state, 'failures': breaker.failures, 'retry_in': round(breaker.retry_in(), 1)}
+                for endpoint, breaker in list(self.breakers.items()) if breaker.state != CircuitBreaker.CLOSED}
+    
+    def _admit(self, endpoint, breaker):
+        if not breaker.allow():
+            if self.metrics:
+                self.metrics.inc('circuit_rejected_total', endpoint=endpoint)
+            raise CircuitOpenError(endpoint, breaker.retry_in())
+    
+    def _settle(self, endpoint, breaker, failed):
+        """
+        Record an outcome on the breaker and report state changes
+        
+        Returns:
+            bool: True if this outcome opened the circuit
+        """
+        opened = False
+        if failed:
+            opened = breaker.record_failure()
+            if opened:
+                events.warning('circuit.opened', "🔌 Circuit opened for {endpoint} after {failures} failures, pausing calls for {timeout:.1f}s",
+                               endpoint=endpoint, failures=breaker.failures, timeout=breaker.reset_timeout)
+        elif breaker.record_success():
+            events.info('circuit.closed', "🔌 Circuit closed for {endpoint}", endpoint=endpoint)
+        if self.metrics:
+            self.metrics.set_gauge('circuit_open', int(breaker.state != CircuitBreaker.CLOSED), endpoint=endpoint)
+        return opened
+    
+    def _retry_delay(self, endpoint, response, attempt, override):
+        """Count and log a retry, returning how long to wait before it"""
+        status = response.status_code if response is not None else None
+        if override is not None:
+            delay = override
+        elif status == 429:
+            delay = _retry_after_seconds(response)
+        else:
+            delay = self.backoff(attempt)
+        
+        if status == 429:
+            events.warning('http.rate_limited', "⏳ Rate limited on {endpoint}, retrying in {delay:.1f}s", endpoint=endpoint, delay=delay)
+        else:
+            events.debug('http.retry', "Retrying {endpoint} in {delay:.2f}s after attempt {attempt}", endpoint=endpoint, delay=delay, attempt=attempt, status=status)
+        
+        if self.metrics:
+            reason = {429: RATE_LIMITED, 403: CSRF_REJECTED}.get(status, RETRYABLE)
+            self.metrics.inc('retries_total', reason=reason)
+        return delay
+    
+    def call(self, url, send, retryable=_is_retryable_response, failed=_is_failed_response, on_retry=None, max_attempts=None):
+        """
+        Make a call with bounded retries, unless the endpoint's circuit is open
+        
+        Args:
+            url (str): URL being called, used to pick the endpoint's breaker
+            send (callable): Makes the request and returns the response
+            retryable (callable): Whether a response is worth another attempt
+            failed (callable): Whether a response counts against the endpoint's breaker
+            on_retry (callable, optional): Called with the response before a retry, e.g. to refresh a token.
+                If it returns a number, that is used as the delay instead of the backoff.
+            max_attempts (int, optional): Override the guard's attempt limit for this call
+            
+        Returns:
+            requests.Response: The first good response, or the last one once attempts run out
+            
+        Raises:
+            CircuitOpenError: The endpoint's circuit is open
+            requests.RequestException: The call failed at the transport level, after urllib3's retries
+        """
+        endpoint = _endpoint_label(url)
+        breaker = self.breaker(endpoint)
+        max_attempts = max_attempts or self.max_attempts
+        
+        for attempt in range(1, max_attempts + 1):
+            self._admit(endpoint, breaker)
+            response = None
+            try:
+                response = send()
+            except requests.RequestException:
+                # The transport has already retried it
+                self._settle(endpoint, breaker, True)
+                raise
+            else:
+                if self._settle(endpoint, breaker, failed(response)) or not retryable(response) or attempt == max_attempts:
+                    return response
+            
+            override = on_retry(response) if on_retry else None
+            time.sleep(self._retry_delay(endpoint, response, attempt, override))
+        
+        return response
+    
+    async def call_async(self, url, send, retryable=_is_retryable_response, failed=_is_failed_response, on_retry=None, max_attempts=None):
+        """
+        Asynchronous call(), awaiting send and on_retry and sleeping on the event loop
+        
+        Args:
+            url (str): URL being called, used to pick the endpoint's breaker
+            send (callable): Returns an awaitable resolving to the response
+            retryable (callable): Whether a response is worth another attempt
+            failed (callable): Whether a response counts against the endpoint's breaker
+            on_retry (callable, optional): Called, and awaited if needed, before a retry.
+                If it returns a number, that is used as the delay instead of the backoff.
+            max_attempts (int, optional): Override the guard's attempt limit for this call
+            
+        Returns:
+            requests.Response: The first good response, or the last one once attempts run out
+        """
+        endpoint = _endpoint_label(url)
+        breaker = self.breaker(endpoint)
+        max_attempts = max_attempts or self.max_attempts
+        
+        for attempt in range(1, max_attempts + 1):
+            self._admit(endpoint, breaker)
+            response = None
+            try:
+                response = await send()
+            except requests.RequestException:
+                # The transport has already retried it
+                self._settle(endpoint, breaker, True)
+                raise
+            else:
+                if self._settle(endpoint, breaker, failed(response)) or not retryable(response) or attempt == max_attempts:
+                    return response
+            
+            override = on_retry(response) if on_retry else None
+            if asyncio.iscoroutine(override):
+                override = await override
+            await asyncio.sleep(self._retry_delay(endpoint, response, attempt, override))
+        
+        return response
+
+
+class CsrfTokenManager:
+    """
+    Owns the session's X-CSRF-TOKEN
+    
+    Tokens are harvested from the x-csrf-token header of any response. When a
+    fresh token has to be fetched, the method that worked last time is tried
+    first, and concurrent callers share a single refresh instead of each
+    starting their own. The token can optionally be persisted to disk so a
+    restart doesn't need to fetch a new one.
+    """
+    
+    METHODS = [
+        {
+            "name": "Account settings endpoint",
+            "url": "https://accountsettings.roblox.com/v1/email",
+            "data": {}
+        },
+        {
+            "name": "Friends endpoint",
+            "url": "https://friends.roblox.com/v1/users/1/request-friendship",
+            "data": {}
+        },
+        {
+            "name": "Avatar endpoint",
+            "url": "https://avatar.roblox.com/v1/avatar/set-wearing-assets",
+            "data": {"assetIds":[]}
+        },
+        {
+            "name": "Groups endpoint",
+            "url": "https://groups.roblox.com/v1/groups/search",
+            "data": {"keyword":"", "limit":10}
+        }
     ]
-)
+    
+    def __init__(self, session, cookie, cache_path=None, base_url=None, guard=None):
+        """
+        Args:
+            session (requests.Session): Session whose X-CSRF-TOKEN header is managed
+            cookie (str): The .ROBLOSECURITY cookie, used to tie a persisted token to its account
+            cache_path (str, optional): File to persist the token in across restarts
+            base_url (str, optional): Send requests here instead of roblox.com, see _rebase_url
+            guard (RequestGuard, optional): Circuit breakers that skip methods which keep failing
+        """
+        self.session = session
+        self.cache_path = cache_path
+        self.base_url = base_url
+        self.guard = guard
+        self.token = None
+        self.preferred_method = None
+        self._cookie_hash = hashlib.sha256(cookie.encode()).hexdigest()[:16]
+        self._lock = threading.Lock()
+        self._generation = 0
+    
+    def set_token(self, token, source):
+        """Install a new token on the session"""
+        if not token or token == self.token:
+            return
+        
+        self.token = token
+        self.session.headers['X-CSRF-TOKEN'] = token
+        self._generation += 1
+        events.info('csrf.updated', "CSRF token updated from {source}", source=source)
+    
+    def harvest(self, response):
+        """Take the token from a response's x-csrf-token header, if it has one"""
+        token = response.headers.get('x-csrf-token')
+        if token and token != self.token:
+            self.set_token(token, getattr(response, 'url', None) or 'response headers')
+            self._save()
+    
+    def refresh(self, stale_token=None):
+        """
+        Fetch a new CSRF token, sharing the work with any refresh already in flight
+        
+        Args:
+            stale_token (str, optional): The token the caller saw rejected. If the
+                current token already differs, no request is made.
+                
+        Returns:
+            bool: True if a usable token is available
+        """
+        generation = self._generation
+        
+        with self._lock:
+            # Another caller refreshed or harvested a token while we were waiting
+            if self._generation != generation and self.token:
+                return True
+            if stale_token is not None and self.token and self.token != stale_token:
+                return True
+            
+            methods = sorted(self.METHODS, key=lambda method: method['name'] != self.preferred_method)
+            for method in methods:
+                try:
+                    events.debug('csrf.trying', "Trying to get CSRF token from {method}", method=method['name'])
+                    response = self._post(method)
+                    
+                    if 'x-csrf-token' in response.headers:
+                        self.preferred_method = method['name']
+                        self.set_token(response.headers['x-csrf-token'], method['name'])
+                        self._save()
+                        events.info('csrf.refreshed', "✅ CSRF token refreshed successfully using {method}", method=method['name'])
+                        return True
+                    else:
+                        events.warning('csrf.method_failed', "❌ Failed to get CSRF token from {method}. Status: {status}", method=method['name'], status=response.status_code)
+                except Exception as e:
+                    events.warning('csrf.method_error', "❌ Error refreshing CSRF token via {method}: {error}", method=method['name'], error=e)
+            
+            events.error('csrf.failed', "❌ Failed to get CSRF token from all methods")
+            return False
+    
+    def race(self):
+        """
+        Fetch a new CSRF token by trying every method at once and keeping the first token returned
+        
+        Used on a cold start, when there is no persisted token and no known good
+        method, so startup waits for the fastest endpoint rather than the sum of
+        a sequential walk. The slower calls finish in the background and are ignored.
+        
+        Returns:
+            bool: True if a usable token is available
+        """
+        with self._lock:
+            pool = ThreadPoolExecutor(max_workers=len(self.METHODS), thread_name_prefix='csrf-race')
+            futures = {pool.submit(self._post, method): method for method in self.METHODS}
+            try:
+                for future in as_completed(futures):
+                    method = futures[future]
+                    try:
+                        response = future.result()
+                    except Exception as e:
+                        events.warning('csrf.method_error', "❌ Error refreshing CSRF token via {method}: {error}", method=method['name'], error=e)
+                        continue
+                    
+                    if 'x-csrf-token' in response.headers:
+                        self.preferred_method = method['name']
+                        self.set_token(response.headers['x-csrf-token'], method['name'])
+                        self._save()
+                        events.info('csrf.refreshed', "✅ CSRF token acquired from {method}, the fastest of {count} methods", method=method['name'], count=len(futures))
+                        return True
+                    events.warning('csrf.method_failed', "❌ Failed to get CSRF token from {method}. Status: {status}", method=method['name'], status=response.status_code)
+            finally:
+                pool.shutdown(wait=False)
+            
+            events.error('csrf.failed', "❌ Failed to get CSRF token from all methods")
+            return False
+    
+    def _post(self, method):
+        """POST to a CSRF method once, through the guard's breaker for that endpoint if there is one"""
+        url = _rebase_url(method['url'], self.base_url)
+        send = functools.partial(self.session.post, url, json=method['data'], allow_redirects=False)
+        if self.guard is None:
+            return send()
+        # The 403 carrying a token is the success case here, only a missing token counts as a failure
+        return self.guard.call(url, send, retryable=lambda response: False,
+                               failed=lambda response: 'x-csrf-token' not in response.headers, max_attempts=1)
+    
+    def load(self):
+        """
+        Restore a persisted token for the same account
+        
+        Returns:
+            bool: True if a token was loaded
+        """
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return False
+        
+        try:
+            with open(self.cache_path) as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            events.warning('csrf.cache_read_failed', "Could not read CSRF token cache {path}: {error}", path=self.cache_path, error=e)
+            return False
+        
+        if data.get('cookie') != self._cookie_hash or not data.get('token'):
+            return False
+        
+        self.preferred_method = data.get('method')
+        self.token = data['token']
+        self.session.headers['X-CSRF-TOKEN'] = self.token
+        events.info('csrf.loaded', "✅ Loaded cached CSRF token", method=self.preferred_method)
+        return True
+    
+    def _save(self):
+        if not self.cache_path:
+            return
+        
+        data = {'cookie': self._cookie_hash, 'token': self.token, 'method': self.preferred_method, 'saved_at': time.time()}
+        tmp_path = f"{self.cache_path}.tmp"
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            events.warning('csrf.cache_write_failed', "Could not write CSRF token cache {path}: {error}", path=self.cache_path, error=e)
+
+
+# Ways of accepting a friend request, tried in order of observed success rate
+ACCEPT_ENDPOINTS = [
+    {
+        "name": "direct",
+        "url": "https://friends.roblox.com/v1/users/{user_id}/accept-friend-request"
+    },
+    {
+        "name": "accept-request",
+        "url": "https://friends.roblox.com/v1/users/{user_id}/accept-request"
+    },
+    {
+        "name": "request-accept",
+        "url": "https://friends.roblox.com/v1/users/{user_id}/request/accept"
+    },
+    {
+        "name": "legacy-user",
+        "url": "https://friends.roblox.com/v1/user/{user_id}/accept-friend-request"
+    },
+    {
+        "name": "web",
+        "url": "https://www.roblox.com/api/friends/acceptfriendrequest",
+        "form": True
+    }
+]
+
+# Accept response classifications
+ACCEPTED = 'accepted'
+TERMINAL = 'terminal'
+CSRF_REJECTED = 'csrf'
+RATE_LIMITED = 'rate_limited'
+RETRYABLE = 'retryable'
+ENDPOINT_FAILED = 'endpoint_failed'
+CIRCUIT_OPEN = 'circuit_open'
+
+# Friends API error codes that mean retrying, on any endpoint, cannot help
+TERMINAL_ERROR_CODES = {
+    1: 'invalid_user',
+    5: 'already_friends',
+    10: 'request_not_found',
+    11: 'friends_limit_reached',
+    12: 'target_friends_limit_reached'
+}
+TERMINAL_ERROR_MESSAGES = [
+    (re.compile(r'already (a )?friend', re.IGNORECASE), 'already_friends'),
+    (re.compile(r'request does not exist', re.IGNORECASE), 'request_not_found'),
+    (re.compile(r'friends limit', re.IGNORECASE), 'friends_limit_reached'),
+    (re.compile(r'invalid or does not exist', re.IGNORECASE), 'invalid_user')
+]
+
+# Accept outcomes worth another attempt on the same endpoint
+RETRYABLE_KINDS = (CSRF_REJECTED, RATE_LIMITED, RETRYABLE)
+
+AcceptResult = namedtuple('AcceptResult', ['accepted', 'kind', 'reason', 'calls'])
+
+
+def _is_failed_accept(kind, response):
+    """
+    Whether an accept response counts against the endpoint's circuit breaker
+    
+    A CSRF rejection just means the token rotated, which is routine and carries
+    the new token, so only rate limits, server errors and a lost login count.
+    """
+    return kind in (RATE_LIMITED, RETRYABLE) or response.status_code == 401
+
+
+def classify_accept_response(endpoint, response):
+    """
+    Classify an accept response so the caller knows whether to retry, move on or stop
+    
+    Args:
+        endpoint (dict): Entry from ACCEPT_ENDPOINTS that produced the response
+        response (requests.Response): The accept response
+        
+    Returns:
+        tuple: (kind, reason) where kind is one of ACCEPTED, TERMINAL, CSRF_REJECTED,
+            RATE_LIMITED, RETRYABLE or ENDPOINT_FAILED
+    """
+    status = response.status_code
+    
+    try:
+        body = response.json()
+    except ValueError:
+        body = None
+    
+    if status == 200:
+        # The web endpoint answers 200 even on failure and reports success in the body
+        if endpoint.get('form') and not (isinstance(body, dict) and body.get('success')):
+            return ENDPOINT_FAILED, 'web endpoint reported no success'
+        return ACCEPTED, endpoint['name']
+    if status == 429:
+        return RATE_LIMITED, 'rate limited'
+    if status >= 500:
+        return RETRYABLE, f'server error {status}'
+    if status == 403 and 'x-csrf-token' in response.headers:
+        return CSRF_REJECTED, 'token validation failed'
+    
+    errors = body.get('errors', []) if isinstance(body, dict) else []
+    for error in errors:
+        if error.get('code') in TERMINAL_ERROR_CODES and status == 400:
+            return TERMINAL, TERMINAL_ERROR_CODES[error['code']]
+        for pattern, reason in TERMINAL_ERROR_MESSAGES:
+            if pattern.search(error.get('message') or ''):
+                return TERMINAL, reason
+        if status == 403 and 'token validation' in (error.get('message') or '').lower():
+            return CSRF_REJECTED, 'token validation failed'
+    
+    return ENDPOINT_FAILED, f'status {status}'
+
+
+class AcceptStrategy:
+    """Tracks per-endpoint accept success rates and orders the fallback chain by them"""
+    
+    def __init__(self, endpoints=ACCEPT_ENDPOINTS):
+        """
+        Args:
+            endpoints (list): Accept endpoints, in their initial preference order
+        """
+        self.endpoints = list(endpoints)
+        self.stats = {endpoint['name']: {'attempts': 0, 'successes': 0} for endpoint in self.endpoints}
+        self._lock = threading.Lock()
+    
+    def _score(self, endpoint):
+        stats = self.stats[endpoint['name']]
+        # Laplace smoothing so untried endpoints keep a neutral score
+        return (stats['successes'] + 1) / (stats['attempts'] + 2)
+    
+    def ordered(self, names=None):
+        """
+        Args:
+            names (list, optional): Only include these endpoint names
+            
+        Returns:
+            list: Endpoints sorted by success rate, ties keeping their original order
+        """
+        with self._lock:
+            endpoints = [endpoint for endpoint in self.endpoints if names is None or endpoint['name'] in names]
+            return sorted(endpoints, key=self._score, reverse=True)
+    
+    def record(self, name, success):
+        """Record whether an endpoint managed to accept a request"""
+        with self._lock:
+            self.stats[name]['attempts'] += 1
+            if success:
+                self.stats[name]['successes'] += 1
+    
+    def snapshot(self):
+        """Per-endpoint attempts, successes and success rate"""
+        with self._lock:
+            return {
+                name: dict(stats, rate=round(stats['successes'] / stats['attempts'], 3) if stats['attempts'] else None)
+                for name, stats in self.stats.items()
+            }
+
+
+class RequestStateStore:
+    """
+    SQLite-backed record of what happened to each requester, surviving restarts
+    
+    Every requester ID maps to its last status (accepted, failed or skipped),
+    the reason, how many attempts have been made and when it may be retried.
+    Lookups are served from an in-memory copy, and outcomes are buffered and
+    written in a single transaction by flush(), so recording them doesn't add
+    a disk sync per request.
+    """
+    
+    ACCEPTED = 'accepted'
+    FAILED = 'failed'
+    SKIPPED = 'skipped'
+    
+    def __init__(self, path=DEFAULT_STATE_DB, base_backoff=60, max_backoff=6 * 3600, skipped_backoff=3600,
+                 accepted_ttl=300, retention=30 * 86400):
+        """
+        Args:
+            path (str): SQLite database file, or ':memory:'
+            base_backoff (float): Seconds before the first retry of a failed request, doubled on each further failure
+            max_backoff (float): Upper bound on the failed request backoff
+            skipped_backoff (float): Seconds before a request that failed terminally is looked at again
+            accepted_ttl (float): Seconds an accepted request is ignored if it is still listed
+            retention (float): Rows not updated for this long are pruned on startup
+        """
+        self.path = path
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.skipped_backoff = skipped_backoff
+        self.accepted_ttl = accepted_ttl
+        self._lock = threading.Lock()
+        self._pending = {}
+        
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS requests (
+                requester_id INTEGER PRIMARY KEY,
+                status TEXT NOT NULL,
+                reason TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                updated_at REAL NOT NULL,
+                retry_after REAL NOT NULL DEFAULT 0
+            )
+        ''')
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS checkpoint (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                saved_at REAL NOT NULL,
+                data TEXT NOT NULL
+            )
+        ''')
+        with self._conn:
+            self._conn.execute('DELETE FROM requests WHERE updated_at < ?', (time.time() - retention,))
+        
+        self._entries = {
+            row[0]: {'status': row[1], 'reason': row[2], 'attempts': row[3], 'updated_at': row[4], 'retry_after': row[5]}
+            for row in self._conn.execute('SELECT requester_id, status, reason, attempts, updated_at, retry_after FROM requests')
+        }
+        events.info('state.loaded', "Loaded {count} requester states from {path}", count=len(self._entries), path=path)
+    
+    def get(self, requester_id):
+        """
+        Returns:
+            dict: Stored state for the requester, or None if it has never been seen
+        """
+        with self._lock:
+            entry = self._entries.get(int(requester_id))
+            return dict(entry) if entry else None
+    
+    def should_skip(self, requester_id):
+        """
+        Returns:
+            bool: True if the requester was recently handled and its backoff hasn't expired
+        """
+        with self._lock:
+            entry = self._entries.get(int(requester_id))
+            return entry is not None and entry['retry_after'] > time.time()
+    
+    def record(self, requester_id, status, reason=None):
+        """
+        Buffer the outcome of handling a request, to be written by flush()
+        
+        Args:
+            requester_id (int): User ID that sent the friend request
+            status (str): ACCEPTED, FAILED or SKIPPED
+            reason (str, optional): Why the request ended up in this status
+        """
+        requester_id = int(requester_id)
+        now = time.time()
+        
+        with self._lock:
+            previous = self._entries.get(requester_id)
+            attempts = (previous['attempts'] if previous and previous['status'] == status else 0) + 1
+            
+            if status == self.ACCEPTED:
+                retry_after = now + self.accepted_ttl
+            elif status == self.SKIPPED:
+                retry_after = now + self.skipped_backoff
+            else:
+                retry_after = now + min(self.base_backoff * 2 ** (attempts - 1), self.max_backoff)
+            
+            entry = {'status': status, 'reason': reason, 'attempts': attempts, 'updated_at': now, 'retry_after': retry_after}
+            self._entries[requester_id] = entry
+            self._pending[requester_id] = entry
+    
+    def record_result(self, requester_id, result):
+        """Record an AcceptResult under the matching status"""
+        if result.accepted:
+            self.record(requester_id, self.ACCEPTED, result.reason)
+        elif result.kind == TERMINAL:
+            self.record(requester_id, self.SKIPPED, result.reason)
+        else:
+            self.record(requester_id, self.FAILED, result.reason)
+    
+    def flush(self):
+        """
+        Write all buffered outcomes in one transaction
+        
+        Returns:
+            int: Number of rows written
+        """
+        with self._lock:
+            if not self._pending:
+                return 0
+            rows = [
+                (requester_id, entry['status'], entry['reason'], entry['attempts'], entry['updated_at'], entry['retry_after'])
+                for requester_id, entry in self._pending.items()
+            ]
+            self._pending = {}
+            
+            with self._conn:
+                self._conn.executemany('''
+                    INSERT INTO requests (requester_id, status, reason, attempts, updated_at, retry_after)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(requester_id) DO UPDATE SET
+                        status = excluded.status,
+                        reason = excluded.reason,
+                        attempts = excluded.attempts,
+                        updated_at = excluded.updated_at,
+                        retry_after = excluded.retry_after
+                ''', rows)
+        
+        events.debug('state.flushed', "Wrote {count} requester states to {path}", count=len(rows), path=self.path)
+        return len(rows)
+    
+    def save_checkpoint(self, progress, scheduler=None, reason=None):
+        """
+        Flush pending outcomes and save what a run left unfinished, replacing any previous checkpoint
+        
+        Args:
+            progress (RunProgress): Friend requests still pending or in flight
+            scheduler (PollScheduler, optional): Scheduler whose interval the next run should start from
+            reason (str, optional): Why the run stopped
+        """
+        data = dict(progress.snapshot(), reason=reason, scheduler=scheduler.snapshot() if scheduler else {})
+        self.flush()
+        with self._lock, self._conn:
+            self._conn.execute('INSERT OR REPLACE INTO checkpoint (id, saved_at, data) VALUES (1, ?, ?)', (time.time(), json.dumps(data)))
+        events.info('state.checkpoint_saved', "💾 Saved checkpoint with {pending} pending and {in_flight} in-flight friend requests",
+                    pending=len(data['pending']), in_flight=len(data['in_flight']), reason=reason)
+    
+    def take_checkpoint(self, max_age=DEFAULT_CHECKPOINT_MAX_AGE):
+        """
+        Load and remove the checkpoint saved by the previous run
+        
+        Args:
+            max_age (float): Checkpoints older than this many seconds are discarded
+            
+        Returns:
+            dict: 'pending', 'in_flight', 'scheduler', 'reason' and 'age', or None if there is no usable checkpoint
+        """
+        with self._lock, self._conn:
+            row = self._conn.execute('SELECT saved_at, data FROM checkpoint WHERE id = 1').fetchone()
+            self._conn.execute('DELETE FROM checkpoint')
+        
+        if row is None:
+            return None
+        age = time.time() - row[0]
+        if age > max_age:
+            events.info('state.checkpoint_expired', "Ignoring checkpoint saved {age:.0f}s ago", age=age)
+            return None
+        return dict(json.loads(row[1]), age=age)
+    
+    def counts(self):
+        """Number of stored requesters per status"""
+        with self._lock:
+            counts = {}
+            for entry in self._entries.values():
+                counts[entry['status']] = counts.get(entry['status'], 0) + 1
+            return counts
+    
+    def close(self):
+        """Flush pending outcomes and close the database"""
+        self.flush()
+        self._conn.close()
+
+
+class FriendRequest:
+    """A pending friend request, reduced to the fields the bot acts on"""
+    
+    __slots__ = ('requester_id', 'requester_name')
+    
+    # Keys of the dicts get_friend_requests used to return
+    _LEGACY_KEYS = {'requesterUserId': 'requester_id', 'requesterUsername': 'requester_name'}
+    
+    def __init__(self, requester_id, requester_name='Unknown'):
+        self.requester_id = requester_id
+        self.requester_name = requester_name
+    
+    def get(self, key, default=None):
+        """Dict-style access by the old requesterUserId/requesterUsername keys"""
+        attribute = self._LEGACY_KEYS.get(key)
+        return getattr(self, attribute) if attribute else default
+    
+    def __repr__(self):
+        return f"FriendRequest(requester_id={self.requester_id!r}, requester_name={self.requester_name!r})"
+    
+    def __eq__(self, other):
+        if not isinstance(other, FriendRequest):
+            return NotImplemented
+        return (self.requester_id, self.requester_name) == (other.requester_id, other.requester_name)
+
+
+def _compile_getter(path):
+    """Turn a key path such as ('id',) or ('requester', 'id') into a fast lookup function"""
+    if path is None:
+        return None
+    if len(path) == 1:
+        return operator.itemgetter(path[0])
+    
+    outer, inner = path
+    
+    def getter(item):
+        return item[outer][inner]
+    
+    return getter
+
+
+class FriendRequestParser:
+    """
+    Extracts requester IDs and names from friend request payloads
+    
+    The field layout is detected once from the first item of a response and
+    compiled into direct key lookups, which are reused for the remaining items
+    and for later responses with the same layout. Items that don't match the
+    compiled layout fall back to probing every known field.
+    """
+    
+    ID_FIELDS = ['requesterUserId', 'userId', 'id', 'requesterId', 'sourceUserId']
+    NAME_FIELDS = ['requesterUsername', 'username', 'name', 'displayName']
+    NESTED_FIELDS = ['requester', 'user']
+    NESTED_ID_FIELDS = ['id', 'userId']
+    NESTED_NAME_FIELDS = ['name', 'username', 'displayName']
+    
+    def __init__(self):
+        self._extractors = {}
+    
+    def detect_shape(self, item):
+        """
+        Find where the requester ID and name live in an item, using the same priority as before
+        
+        Returns:
+            tuple: (id_path, name_path), each a tuple of keys or None if not found
+        """
+        id_path = None
+        name_path = None
+        
+        for field in self.ID_FIELDS:
+            if item.get(field):
+                id_path = (field,)
+                break
+        
+        for field in self.NAME_FIELDS:
+            if item.get(field):
+                name_path = (field,)
+                break
+        
+        for nested in self.NESTED_FIELDS:
+            value = item.get(nested)
+            if not isinstance(value, dict):
+                continue
+            if id_path is None:
+                id_path = next(((nested, field) for field in self.NESTED_ID_FIELDS if value.get(field)), None)
+            if name_path is None:
+                name_path = next(((nested, field) for field in self.NESTED_NAME_FIELDS if value.get(field)), None)
+            break
+        
+        return id_path, name_path
+    
+    def compile(self, shape):
+        """
+        Build (or reuse) an extractor function for a detected shape
+        
+        Returns:
+            function: Maps an item to a FriendRequest, raising LookupError or TypeError if it doesn't fit
+        """
+        extractor = self._extractors.get(shape)
+        if extractor is not None:
+            return extractor
+        
+        id_path, name_path = shape
+        if id_path is None:
+            return None
+        
+        get_id = _compile_getter(id_path)
+        get_name = _compile_getter(name_path)
+        
+        if get_name is None:
+            def extractor(item):
+                requester_id = get_id(item)
+                if not requester_id:
+                    raise LookupError(id_path)
+                return FriendRequest(requester_id)
+        else:
+            def extractor(item):
+                requester_id = get_id(item)
+                if not requester_id:
+                    raise LookupError(id_path)
+                return FriendRequest(requester_id, get_name(item) or 'Unknown')
+        
+        self._extractors[shape] = extractor
+        events.debug('parser.compiled', "Compiled friend request extractor for id {id_path}, name {name_path}", id_path=id_path, name_path=name_path)
+        return extractor
+    
+    def parse_item(self, item):
+        """
+        Extract one item by probing every known field
+        
+        Returns:
+            FriendRequest: The request, or None if no requester ID could be found
+        """
+        if not isinstance(item, dict):
+            return None
+        
+        extractor = self.compile(self.detect_shape(item))
+        if extractor is None:
+            return None
+        return extractor(item)
+    
+    def parse(self, items):
+        """
+        Extract every item of a response, compiling the layout of the first one
+        
+        Args:
+            items (list): The response's data array
+            
+        Returns:
+            list: FriendRequest records, skipping items without a requester ID
+        """
+        if not items:
+            return []
+        
+        extractor = None
+        for item in items:
+            if isinstance(item, dict):
+                extractor = self.compile(self.detect_shape(item))
+                break
+        
+        records = []
+        append = records.append
+        missing = 0
+        
+        for item in items:
+            try:
+                append(extractor(item))
+                continue
+            except (LookupError, TypeError):
+                pass
+            
+            record = self.parse_item(item)
+            if record is None:
+                missing += 1
+                events.debug('parser.missing_id', "Could not extract user ID from friend request data: {item}", item=item)
+            else:
+                append(record)
+        
+        if missing:
+            events.warning('parser.missing_ids', "⚠️ Could not extract a user ID from {missing} of {total} friend requests", missing=missing, total=len(items))
+        return records
+
+
+RequesterProfile = namedtuple('RequesterProfile', ['user_id', 'name', 'display_name', 'created', 'banned', 'verified'])
+
+
+def _parse_roblox_timestamp(value):
+    """Turn an ISO 8601 timestamp such as 2020-01-01T00:00:00.000Z into epoch seconds, or None"""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+def _profile_from_item(item, created=None):
+    """Build a RequesterProfile from a friend request item or a batch users entry"""
+    return RequesterProfile(
+        user_id=item['id'],
+        name=item.get('name'),
+        display_name=item.get('displayName'),
+        created=_parse_roblox_timestamp(item.get('created')) or created,
+        banned=bool(item.get('isBanned')),
+        verified=bool(item.get('hasVerifiedBadge'))
+    )
+
+
+class ProfileCache:
+    """Thread-safe LRU cache of RequesterProfiles, bounded by size and by age"""
+    
+    def __init__(self, maxsize=DEFAULT_PROFILE_CACHE_SIZE, ttl=DEFAULT_PROFILE_CACHE_TTL):
+        """
+        Args:
+            maxsize (int): Most profiles kept, the least recently used are evicted first
+            ttl (float): Seconds a profile is trusted before it has to be looked up again
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def __len__(self):
+        return len(self._entries)
+    
+    def get(self, user_id):
+        """
+        Returns:
+            RequesterProfile: The cached profile, or None if it is missing or expired
+        """
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            profile, stored_at = entry
+            if time.monotonic() - stored_at > self.ttl:
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return profile
+    
+    def put(self, profile):
+        with self._lock:
+            self._entries[profile.user_id] = (profile, time.monotonic())
+            self._entries.move_to_end(profile.user_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+
+class RequesterRules:
+    """
+    Which requesters to accept, compiled into one predicate
+    
+    Allowlisted requesters are always accepted and blocklisted ones never
+    are, matched by user ID or, case-insensitively, by username. Everyone
+    else must be at least min_account_age_days old and must not match any
+    of the blocked name patterns, checked against both username and display
+    name.
+    
+    An allowlist on its own is exclusive: when no other rule is set, only
+    allowlisted requesters are accepted and everyone else is rejected as
+    not allowlisted. Alongside other rules it only exempts from them.
+    """
+    
+    def __init__(self, allowlist=(), blocklist=(), min_account_age_days=None, blocked_name_patterns=(), allow_unknown_age=True):
+        """
+        Args:
+            allowlist (iterable): User IDs or usernames to always accept
+            blocklist (iterable): User IDs or usernames to never accept
+            min_account_age_days (float, optional): Youngest account accepted, in days
+            blocked_name_patterns (iterable): Regular expressions for usernames or display names to reject
+            allow_unknown_age (bool): Accept requesters whose account age couldn't be found when an age limit is set
+        """
+        self.allow_ids, self.allow_names = self._split(allowlist)
+        self.block_ids, self.block_names = self._split(blocklist)
+        self.min_account_age_days = min_account_age_days
+        self.blocked_name_patterns = [pattern for pattern in blocked_name_patterns if pattern]
+        self.allow_unknown_age = allow_unknown_age
+    
+    @property
+    def exclusive(self):
+        """True if the allowlist is the only rule, so nobody else is accepted"""
+        return bool(self.allow_ids or self.allow_names) and not (self.block_ids or self.block_names or self.min_account_age_days
+                                                                  or self.blocked_name_patterns)
+    
+    @staticmethod
+    def _split(entries):
+        ids = set()
+        names = set()
+        for entry in entries:
+            entry = str(entry).strip()
+            if entry.isdigit():
+                ids.add(int(entry))
+            elif entry:
+                names.add(entry.lower())
+        return frozenset(ids), frozenset(names)
+    
+    @classmethod
+    def from_env(cls):
+        """
+        Build rules from FILTER_ALLOWLIST and FILTER_BLOCKLIST (comma separated IDs or usernames),
+        FILTER_MIN_ACCOUNT_AGE_DAYS, FILTER_BLOCKED_NAME_PATTERN (a regular expression) and
+        FILTER_ALLOW_UNKNOWN_AGE
+        
+        FILTER_ALLOWLIST set on its own accepts only the listed requesters.
+        
+        Returns:
+            RequesterRules: The rules, or None if no filter is configured
+        """
+        env = os.environ
+        allowlist = [entry for entry in env.get('FILTER_ALLOWLIST', '').split(',') if entry.strip()]
+        blocklist = [entry for entry in env.get('FILTER_BLOCKLIST', '').split(',') if entry.strip()]
+        min_age = env.get('FILTER_MIN_ACCOUNT_AGE_DAYS')
+        pattern = env.get('FILTER_BLOCKED_NAME_PATTERN')
+        
+        if not (allowlist or blocklist or min_age or pattern):
+            return None
+        
+        return cls(
+            allowlist=allowlist,
+            blocklist=blocklist,
+            min_account_age_days=float(min_age) if min_age else None,
+            blocked_name_patterns=[pattern] if pattern else [],
+            allow_unknown_age=env.get('FILTER_ALLOW_UNKNOWN_AGE', 'true').lower() not in ('0', 'false', 'no')
+        )
+    
+    @property
+    def needs_profiles(self):
+        """True if any rule looks at more than the user ID"""
+        return bool(self.allow_names or self.block_names or self.min_account_age_days or self.blocked_name_patterns)
+    
+    def compile(self):
+        """
+        Build the predicate, including only the checks that are configured
+        
+        Returns:
+            function: Maps (requester_id, profile) to None to accept, or the reason to reject.
+                profile may be None when only user ID rules apply.
+        """
+        allow_ids, allow_names = self.allow_ids, self.allow_names
+        block_ids, block_names = self.block_ids, self.block_names
+        exclusive = self.exclusive
+        checks = []
+        
+        if block_names:
+            checks.append(lambda profile: 'blocklisted' if (profile.name or '').lower() in block_names else None)
+        
+        if self.min_account_age_days:
+            min_age = self.min_account_age_days * 86400
+            allow_unknown = self.allow_unknown_age
+            
+            def check_age(profile):
+                if profile.created is None:
+                    return None if allow_unknown else 'account age unknown'
+                return 'account too new' if time.time() - profile.created < min_age else None
+            
+            checks.append(check_age)
+        
+        if self.blocked_name_patterns:
+            # One alternation instead of a loop over patterns
+            blocked = re.compile('|'.join(f'(?:{pattern})' for pattern in self.blocked_name_patterns), re.IGNORECASE)
+            checks.append(lambda profile: 'blocked name' if blocked.search(profile.name or '') or blocked.search(profile.display_name or '') else None)
+        
+        def predicate(requester_id, profile):
+            if requester_id in allow_ids:
+                return None
+            if requester_id in block_ids:
+                return 'blocklisted'
+            if profile is None:
+                # An ID-only allowlist can reject without a profile, otherwise the name rules need one
+                return 'not allowlisted' if exclusive and not allow_names else None
+            if allow_names and (profile.name or '').lower() in allow_names:
+                return None
+            if exclusive:
+                return 'not allowlisted'
+            for check in checks:
+                reason = check(profile)
+                if reason:
+                    return reason
+            return None
+        
+        return predicate
+
+
+class RequesterFilter:
+    """
+    Filters pages of friend requests through RequesterRules, looking requesters up in bulk
+    
+    Profiles come first from the friend request listing itself, which already
+    carries names and creation dates, then from the cache, and only the
+    remaining requesters are fetched, up to batch_size per call, from the
+    batch users endpoint. Filtering a page therefore costs at most one
+    request per batch_size requesters, and usually none.
+    """
+    
+    def __init__(self, rules, cache=None, batch_size=DEFAULT_PROFILE_BATCH_SIZE, metrics=None):
+        """
+        Args:
+            rules (RequesterRules): What to accept
+            cache (ProfileCache, optional): Profile cache. A default sized one is created if not provided.
+            batch_size (int): Most user IDs per batch lookup
+            metrics (BotMetrics, optional): Where to count filter outcomes and cache hits
+        """
+        self.rules = rules
+        self.cache = cache or ProfileCache()
+        self.batch_size = batch_size
+        self.metrics = metrics
+        self.predicate = rules.compile()
+        self.needs_profiles = rules.needs_profiles
+    
+    @classmethod
+    def from_env(cls, metrics=None):
+        """
+        Build a filter from the FILTER_* rules and PROFILE_CACHE_SIZE / PROFILE_CACHE_TTL
+        
+        Returns:
+            RequesterFilter: The filter, or None if no rules are configured
+        """
+        rules = RequesterRules.from_env()
+        if rules is None:
+            return None
+        cache = ProfileCache(int(os.environ.get('PROFILE_CACHE_SIZE', DEFAULT_PROFILE_CACHE_SIZE)),
+                             float(os.environ.get('PROFILE_CACHE_TTL', DEFAULT_PROFILE_CACHE_TTL)))
+        return cls(rules, cache, metrics=metrics)
+    
+    def seed(self, items):
+        """Cache the requester profiles embedded in a friend request listing"""
+        if not self.needs_profiles:
+            return
+        for item in items:
+            if isinstance(item, dict) and item.get('id') and ('created' in item or 'displayName' in item):
+                self.cache.put(_profile_from_item(item))
+    
+    def store(self, entries):
+        """Cache profiles from a batch users response, keeping any creation date already known"""
+        for entry in entries:
+            if not isinstance(entry, dict) or not entry.get('id'):
+                continue
+            known = self.cache.get(entry['id'])
+            self.cache.put(_profile_from_item(entry, known.created if known else None))
+    
+    def missing(self, requests_page):
+        """
+        Returns:
+            list: Batches of user IDs whose profiles have to be fetched before the page can be filtered
+        """
+        if not self.needs_profiles:
+            return []
+        
+        missing = []
+        for request in requests_page:
+            requester_id = request.requester_id
+            if requester_id in self.rules.allow_ids or requester_id in self.rules.block_ids:
+                continue
+            if self.cache.get(requester_id) is None:
+                missing.append(requester_id)
+        
+        if self.metrics:
+            self.metrics.inc('profile_cache_total', len(requests_page) - len(missing), result='hit')
+            self.metrics.inc('profile_cache_total', len(missing), result='miss')
+        return [missing[start:start + self.batch_size] for start in range(0, len(missing), self.batch_size)]
+    
+    def apply(self, requests_page):
+        """
+        Run the predicate over a page
+        
+        Returns:
+            tuple: (kept, rejected, deferred) where rejected is a list of (request, reason) and
+                deferred holds requests whose profile couldn't be found, to be looked at next cycle
+        """
+        kept, rejected, deferred = [], [], []
+        predicate = self.predicate
+        
+        for request in requests_page:
+            profile = self.cache.get(request.requester_id) if self.needs_profiles else None
+            reason = predicate(request.requester_id, profile)
+            if reason:
+                rejected.append((request, reason))
+            elif profile is None and self.needs_profiles and request.requester_id not in self.rules.allow_ids:
+                deferred.append(request)
+            else:
+                kept.append(request)
+        
+        if self.metrics:
+            for outcome, count in (('kept', len(kept)), ('rejected', len(rejected)), ('deferred', len(deferred))):
+                if count:
+                    self.metrics.inc('filter_total', count, outcome=outcome)
+        return kept, rejected, deferred
+
+
+def _is_failed_lookup(response):
+    """Breaker failure test for the batch users endpoint, where a CSRF rejection is routine"""
+    if response.status_code == 403 and 'x-csrf-token' in response.headers:
+        return False
+    return _is_failed_response(response)
+
+
+class WebSocketConnection:
+    """
+    Minimal RFC 6455 client, enough to talk to a text-framed SignalR hub
+    
+    Incoming bytes are buffered and a frame is only taken off the buffer once
+    it has fully arrived, so a socket timeout halfway through one leaves it for
+    the next recv() to finish. Pings from the server are answered as they are read.
+    """
+    
+    CONTINUATION = 0x0
+    TEXT = 0x1
+    BINARY = 0x2
+    CLOSE = 0x8
+    PING = 0x9
+    PONG = 0xA
+    
+    _ACCEPT_GUID = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+    
+    def __init__(self, sock):
+        self.sock = sock
+        self._buffer = bytearray()
+        self._fragments = []
+    
+    @classmethod
+    def connect(cls, url, headers=None, timeout=DEFAULT_CONNECT_TIMEOUT):
+        """
+        Open a connection and complete the opening handshake
+        
+        Args:
+            url (str): ws://, wss://, http:// or https:// URL of the endpoint
+            headers (dict, optional): Extra handshake headers, such as Cookie
+            timeout (float): Seconds to wait for the TCP connection and the handshake
+            
+        Returns:
+            WebSocketConnection: The open connection
+        """
+        parts = urlsplit(url)
+        secure = parts.scheme in ('wss', 'https')
+        sock = socket.create_connection((parts.hostname, parts.port or (443 if secure else 80)), timeout=timeout)
+        try:
+            if secure:
+                sock = ssl.create_default_context().wrap_socket(sock, server_hostname=parts.hostname)
+            
+            key = base64.b64encode(os.urandom(16)).decode()
+            lines = [f"GET {parts.path or '/'}{'?' + parts.query if parts.query else ''} HTTP/1.1", f'Host: {parts.netloc}',
+                     'Upgrade: websocket', 'Connection: Upgrade', f'Sec-WebSocket-Key: {key}', 'Sec-WebSocket-Version: 13']
+            lines.extend(f'{name}: {value}' for name, value in (headers or {}).items())
+            sock.sendall(('\r\n'.join(lines) + '\r\n\r\n').encode())
+            
+            connection = cls(sock)
+            status_line, response_headers = connection._read_handshake()
+            expected = base64.b64encode(hashlib.sha1((key + cls._ACCEPT_GUID).encode()).digest()).decode()
+            if status_line.split()[1:2] != ['101'] or response_headers.get('sec-websocket-accept') != expected:
+                raise ConnectionError(f"WebSocket handshake rejected: {status_line}")
+            return connection
+        except BaseException:
+            sock.close()
+            raise
+    
+    def _fill(self):
+        chunk = self.sock.recv(65536)
+        if not chunk:
+            raise ConnectionError("WebSocket closed by the server")
+        self._buffer += chunk
+    
+    def _read_handshake(self):
+        """
+        Returns:
+            tuple: (status line, response headers keyed in lower case)
+        """
+        while b'\r\n\r\n' not in self._buffer:
+            if len(self._buffer) > 65536:
+                raise ConnectionError("WebSocket handshake response too large")
+            self._fill()
+        
+        head, _, rest = bytes(self._buffer).partition(b'\r\n\r\n')
+        self._buffer = bytearray(rest)
+        status_line, *header_lines = head.decode('latin-1').split('\r\n')
+        headers = {}
+        for line in header_lines:
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+        return status_line, headers
+    
+    @staticmethod
+    def _mask(payload, mask):
+        # XOR the whole payload as one integer rather than byte by byte
+        if not payload:
+            return b''
+        length = len(payload)
+        return (int.from_bytes(payload, 'big') ^ int.from_bytes((mask * (length // 4 + 1))[:length], 'big')).to_bytes(length, 'big')
+    
+    def _send(self, opcode, payload):
+        header = bytearray([0x80 | opcode])
+        length = len(payload)
+        if length < 126:
+            header.append(0x80 | length)
+        elif length < 1 << 16:
+            header.append(0x80 | 126)
+            header += struct.pack('!H', length)
+        else:
+            header.append(0x80 | 127)
+            header += struct.pack('!Q', length)
+        
+        # Client frames are always masked
+        mask = os.urandom(4)
+        self.sock.sendall(bytes(header) + mask + self._mask(payload, mask))
+    
+    def send_text(self, text):
+        self._send(self.TEXT, text.encode('utf-8'))
+    
+    def _take_frame(self):
+        """
+        Returns:
+            tuple: (fin, opcode, payload) of the first buffered frame, or None if it hasn't fully arrived
+        """
+        buffer = self._buffer
+        if len(buffer) < 2:
+            return None
+        
+        first, second = buffer[0], buffer[1]
+        length = second & 0x7f
+        offset = 2
+        if length == 126:
+            if len(buffer) < 4:
+                return None
+            length = struct.unpack_from('!H', buffer, 2)[0]
+            offset = 4
+        elif length == 127:
+            if len(buffer) < 10:
+                return None
+            length = struct.unpack_from('!Q', buffer, 2)[0]
+            offset = 10
+        
+        mask = None
+        if second & 0x80:
+            mask = bytes(buffer[offset:offset + 4])
+            offset += 4
+        if len(buffer) < offset + length:
+            return None
+        
+        payload = bytes(buffer[offset:offset + length])
+        del buffer[:offset + length]
+        if mask:
+            payload = self._mask(payload, mask)
+        return bool(first & 0x80), first & 0x0f, payload
+    
+    def recv(self):
+        """
+        Read the next complete message, answering pings on the way
+        
+        Returns:
+            str: The message text
+            
+        Raises:
+            ConnectionError: The server closed the connection
+            socket.timeout: Nothing arrived within the socket's timeout
+        """
+        while True:
+            frame = self._take_frame()
+            if frame is None:
+                self._fill()
+                continue
+            
+            fin, opcode, payload = frame
+            if opcode == self.PING:
+                self._send(self.PONG, payload)
+            elif opcode == self.CLOSE:
+                code = struct.unpack('!H', payload[:2])[0] if len(payload) >= 2 else None
+                raise ConnectionError(f"WebSocket closed by the server (code {code})")
+            elif opcode in (self.TEXT, self.BINARY, self.CONTINUATION):
+                self._fragments.append(payload)
+                if fin:
+                    message = b''.join(self._fragments)
+                    self._fragments = []
+                    return message.decode('utf-8')
+    
+    def abort(self):
+        """Drop the connection, waking a recv() blocked on another thread"""
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+    
+    def close(self):
+        try:
+            self._send(self.CLOSE, struct.pack('!H', 1000))
+        except OSError:
+            pass
+        self.sock.close()
+
+
+class RealtimeSubscriber:
+    """
+    Pushes incoming friend requests from Roblox's realtime notification hub to run_forever
+    
+    The hub is a SignalR endpoint speaking the JSON protocol over a WebSocket.
+    A background thread negotiates a connection with the bot's session, keeps
+    it alive and queues a FriendRequest for every FriendshipRequested
+    notification sent to the bot's account, waking run_forever to accept it.
+    
+    While the stream is up, polling only runs as a safety net every
+    poll_interval seconds. When it drops, run_forever goes back to the poll
+    scheduler's interval while the subscriber reconnects with exponential
+    backoff, and every (re)connect triggers one listing to pick up friend
+    requests sent while nothing was listening.
+    """
+    
+    SEPARATOR = '\x1e'
+    HANDSHAKE = json.dumps({'protocol': 'json', 'version': 1}) + SEPARATOR
+    PING = json.dumps({'type': 6}) + SEPARATOR
+    
+    # SignalR message types
+    INVOCATION = 1
+    CLOSE = 7
+    
+    def __init__(self, hub_url=REALTIME_HUB_URL, poll_interval=DEFAULT_REALTIME_POLL_INTERVAL, reconnect_max=DEFAULT_REALTIME_RECONNECT_MAX,
+                 keepalive=REALTIME_KEEPALIVE_INTERVAL, server_timeout=REALTIME_SERVER_TIMEOUT):
+        """
+        Args:
+            hub_url (str): The notification hub, resolved against the bot's base_url
+            poll_interval (float): Seconds between safety net polls while the stream is connected
+            reconnect_max (float): Upper bound on the backoff between reconnect attempts
+            keepalive (float): Seconds between pings sent to the hub
+            server_timeout (float): Seconds of silence from the hub before the connection is treated as dead
+        """
+        self.hub_url = hub_url
+        self.poll_interval = poll_interval
+        self.reconnect_max = reconnect_max
+        self.keepalive = keepalive
+        self.server_timeout = server_timeout
+        self.bot = None
+        self.connected = False
+        self._queue = deque()
+        self._resync = False
+        self._arrived = threading.Event()
+        self._stopped = threading.Event()
+        self._async_wake = None
+        self._connection = None
+        self._thread = None
+    
+    @classmethod
+    def from_env(cls):
+        """
+        Build from REALTIME_POLL_INTERVAL and REALTIME_RECONNECT_MAX if REALTIME_NOTIFICATIONS is set
+        
+        Returns:
+            RealtimeSubscriber: The subscriber, or None if realtime notifications are off
+        """
+        env = os.environ
+        if env.get('REALTIME_NOTIFICATIONS', '').lower() not in ('1', 'true', 'yes'):
+            return None
+        return cls(poll_interval=float(env.get('REALTIME_POLL_INTERVAL', DEFAULT_REALTIME_POLL_INTERVAL)),
+                   reconnect_max=float(env.get('REALTIME_RECONNECT_MAX', DEFAULT_REALTIME_RECONNECT_MAX)))
+    
+    def start(self, bot, loop=None):
+        """
+        Start listening on a background thread
+        
+        Args:
+            bot (RobloxFriendBot): Bot whose session, account and metrics the subscriber uses
+            loop (asyncio.AbstractEventLoop, optional): Event loop of the async engine, woken when a friend request arrives
+        """
+        self.bot = bot
+        if loop is not None:
+            self._async_wake = (loop, asyncio.Event())
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name='realtime-subscriber', daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        """Close the stream and wait for the background thread to exit"""
+        self._stopped.set()
+        connection = self._connection
+        if connection is not None:
+            connection.abort()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+    
+    def _run(self):
+        delay = 1
+        while not self._stopped.is_set():
+            connected_at = None
+            try:
+                self._connection = self._connect()
+                connected_at = time.monotonic()
+                self._listen(self._connection)
+            except (OSError, ValueError, requests.RequestException) as e:
+                if not self._stopped.is_set():
+                    events.warning('realtime.disconnected', "📴 Realtime notifications unavailable, polling instead: {error}", error=e)
+            except Exception as e:
+                # A bug or an unexpected message must not end the subscriber, polling covers the gap until it reconnects
+                if not self._stopped.is_set():
+                    events.exception('realtime.error', "❌ Realtime subscriber error, polling instead: {error}", error=e)
+            finally:
+                if self._connection is not None:
+                    self._connection.close()
+                    self._connection = None
+                self._set_connected(False)
+            
+            # Only start the backoff over once a connection has stayed up for a while
+            if connected_at is not None and time.monotonic() - connected_at > self.keepalive:
+                delay = 1
+            if self._stopped.wait(delay * random.uniform(0.8, 1.2)):
+                break
+            self.bot.metrics.inc('realtime_reconnects_total')
+            delay = min(delay * 2, self.reconnect_max)
+    
+    def _connect(self):
+        """Negotiate a connection token with the bot's session and open the hub's WebSocket"""
+        bot = self.bot
+        url = bot._url(f'{self.hub_url}/negotiate?negotiateVersion=1')
+        response = bot.guard.call(url, functools.partial(bot.session.post, url))
+        if response.status_code != 200:
+            raise ConnectionError(f"negotiate failed: {response.status_code}")
+        negotiated = response.json()
+        token = negotiated.get('connectionToken') or negotiated.get('connectionId')
+        
+        headers = {'Cookie': f".ROBLOSECURITY={bot.cookie}", 'User-Agent': bot.session.headers.get('User-Agent', 'python-requests')}
+        connection = WebSocketConnection.connect(f"{bot._url(self.hub_url)}?id={quote(token or '')}", headers, timeout=bot.transport.connect_timeout)
+        connection.sock.settimeout(self.keepalive)
+        return connection
+    
+    def _messages(self, connection):
+        """Yield hub messages, pinging the hub on schedule and giving up once it has been silent for server_timeout"""
+        connection.send_text(self.HANDSHAKE)
+        last_received = last_sent = time.monotonic()
+        
+        while not self._stopped.is_set():
+            try:
+                text = connection.recv()
+                last_received = time.monotonic()
+            except socket.timeout:
+                text = ''
+                if time.monotonic() - last_received > self.server_timeout:
+                    raise ConnectionError(f"no message from the hub for {self.server_timeout}s")
+            
+            if time.monotonic() - last_sent >= self.keepalive:
+                connection.send_text(self.PING)
+                last_sent = time.monotonic()
+            
+            for record in text.split(self.SEPARATOR):
+                if record:
+                    yield json.loads(record)
+    
+    def _listen(self, connection):
+        messages = self._messages(connection)
+        handshake = next(messages, None)
+        if handshake is None:
+            return
+        if not isinstance(handshake, dict):
+            raise ConnectionError(f"unexpected hub handshake: {handshake!r}")
+        if handshake.get('error'):
+            raise ConnectionError(f"hub handshake failed: {handshake['error']}")
+        self._set_connected(True)
+        
+        # Pings (type 6) only keep the connection alive
+        for message in messages:
+            if not isinstance(message, dict):
+                continue
+            if message.get('type') == self.INVOCATION and message.get('target') == 'notification':
+                arguments = message.get('arguments')
+                if isinstance(arguments, list) and len(arguments) >= 2:
+                    self._on_notification(*arguments[:2])
+            elif message.get('type') == self.CLOSE:
+                raise ConnectionError(f"hub closed the connection: {message.get('error') or 'no reason given'}")
+    
+    def _on_notification(self, namespace, detail):
+        """Queue the requester of a FriendshipRequested notification addressed to the bot's account"""
+        if namespace != 'FriendshipNotifications':
+            return
+        if isinstance(detail, str):
+            try:
+                detail = json.loads(detail)
+            except ValueError:
+                return
+        if not isinstance(detail, dict):
+            return
+        self.bot.metrics.inc('realtime_events_total', type=str(detail.get('Type')))
+        if detail.get('Type') != 'FriendshipRequested':
+            return
+        
+        # UserId1 sent the request and UserId2 received it, requests the bot sent itself are ignored
+        event_args = detail.get('EventArgs')
+        if not isinstance(event_args, dict):
+            return
+        requester_id, recipient_id = event_args.get('UserId1'), event_args.get('UserId2')
+        if not requester_id or (self.bot.user_id and recipient_id != self.bot.user_id):
+            return
+        
+        events.info('realtime.friend_request', "⚡ Friend request from ID {requester_id} pushed by the realtime hub", requester_id=requester_id)
+        self.bot.metrics.track_backlog([requester_id])
+        self._queue.append(FriendRequest(requester_id))
+        self._wake()
+    
+    def _set_connected(self, connected):
+        if connected == self.connected:
+            return
+        self.connected = connected
+        self.bot.metrics.set_gauge('realtime_connected', int(connected))
+        if connected:
+            events.info('realtime.connected', "⚡ Listening for friend requests on the realtime hub, polling every {interval}s as a safety net",
+                        interval=self.poll_interval)
+            self._resync = True
+        self._wake()
+    
+    def _wake(self):
+        self._arrived.set()
+        if self._async_wake is not None:
+            loop, event = self._async_wake
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                # The loop has already been closed
+                pass
+    
+    def take(self):
+        """
+        Returns:
+            tuple: (FriendRequest records pushed since the last call, whether a listing should run to catch up)
+        """
+        self._arrived.clear()
+        if self._async_wake is not None:
+            self._async_wake[1].clear()
+        
+        pushed = []
+        while self._queue:
+            pushed.append(self._queue.popleft())
+        resync, self._resync = self._resync, False
+        return pushed, resync
+    
+    def wait(self, timeout, shutdown):
+        """
+        Sleep until the subscriber has news, timeout passes or shutdown is requested
+        
+        Returns:
+            bool: True if woken by a pushed friend request or a change of connection
+        """
+        deadline = time.monotonic() + timeout
+        while not shutdown.stopping:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            if self._arrived.wait(min(remaining, 0.25)):
+                return True
+        return False
+    
+    async def wait_async(self, timeout, shutdown):
+        """Async counterpart of wait(), needs start() to have been given the loop"""
+        event = self._async_wake[1]
+        deadline = time.monotonic() + timeout
+        while not shutdown.stopping:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            try:
+                await asyncio.wait_for(event.wait(), min(remaining, 0.25))
+                return True
+            except asyncio.TimeoutError:
+                pass
+        return False
+
 
 class RobloxFriendBot:
-    def __init__(self, cookie=None):
+    def __init__(self, cookie=None, session_ttl=DEFAULT_SESSION_TTL, csrf_cache_path=None, metrics=None, base_url=None, transport=None, guard=None,
+                 fast_start=None, startup=None):
         """
         Initialize the Roblox Friend Bot
         
         Args:
-            cookie (str, optional): The .ROBLOSECURITY cookie. If not provided, will look for ROBLOSECURITY env var.
+            cookie (str, optional): The .ROBLOSECURITY cookie. If not provided, will look for ROBLOSECURITY env var.
+            session_ttl (float): Seconds a successful login check is trusted before it is re-verified
+            csrf_cache_path (str, optional): File to persist the CSRF token in. If not provided, will look for CSRF_TOKEN_CACHE env var.
+            metrics (BotMetrics, optional): Where to record latency and counters. A private one is created if not provided.
+            base_url (str, optional): Send API calls to this server instead of roblox.com, e.g. a local mock.
+                If not provided, will look for ROBLOX_BASE_URL env var.
+            transport (TransportConfig, optional): Pools, timeouts and retries. If not provided, read from HTTP_* env vars.
+            guard (RequestGuard, optional): Retry policy and circuit breakers for every API call.
+                If not provided, read from RETRY_* and CIRCUIT_* env vars.
+            fast_start (bool, optional): Return once login is verified, racing the CSRF methods in the
+                background instead of walking them first. If not provided, will look for FAST_STARTUP env var (default on).
+            startup (StartupTimer, optional): Timer started at process launch, so time-to-first-poll includes imports
+        """
+        self.startup = startup or StartupTimer()
+        self.session = requests.Session()
+        self.user_id = None
+        self.username = None
+        self.session_ttl = session_ttl
+        self._session_verified_at = None
+        self._unauthorized = False
+        self._last_friend_request_count = None
+        self._listed_ids = []
+        self._listing_complete = False
+        self._idle_backlog = None
+        self.scheduler = None
+        self.accept_strategy = AcceptStrategy()
+        self.state_store = None
+        self.requester_filter = None
+        self.progress = None
+        self.shutdown = None
+        self.parser = FriendRequestParser()
+        self.metrics = metrics or BotMetrics()
+        self.base_url = base_url or os.environ.get('ROBLOX_BASE_URL')
+        self.transport = transport or TransportConfig.from_env()
+        self.guard = guard or RequestGuard.from_env(self.metrics)
+        self._csrf_warmup = None
+        if fast_start is None:
+            fast_start = os.environ.get('FAST_STARTUP', 'true').lower() not in ('0', 'false', 'no')
+        
+        # Per-host connection pools with timeouts and retries, timing every HTTP call per endpoint
+        self.transport.mount(self.session, self.metrics, base_url=self.base_url)
+        
+        # Set the cookie from parameter or environment variable
+        if cookie:
+            self.cookie = cookie
+        else:
+            self.cookie = os.environ.get('ROBLOSECURITY')
+            
+        if not self.cookie:
+            raise ValueError("No ROBLOSECURITY cookie provided. Please set it as an environment variable or pass it to the constructor.")
+            
+        # Set the cookie in the session
+        self.session.cookies['.ROBLOSECURITY'] = self.cookie
+        self.csrf = CsrfTokenManager(self.session, self.cookie, csrf_cache_path or os.environ.get('CSRF_TOKEN_CACHE'), self.base_url, self.guard)
+        
+        # Let the poll scheduler and session cache see every response
+        self.session.hooks['response'].append(self._observe_response)
+        
+        # Common headers
+        self.session.headers.update({
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+            'Referer': 'https://www.roblox.com/',
+            'Origin': 'https://www.roblox.com',
+            'Accept': 'application/json, text/plain, */*',
+            'Content-Type': 'application/json'
+        })
+        
+        # Initialize CSRF token, reusing a persisted one when available, and verify login
+        if fast_start:
+            self._start_fast()
+        else:
+            if not self.csrf.load():
+                self._refresh_csrf_token()
+            self.startup.mark('csrf_ready')
+            self._get_user_info()
+            self.startup.mark('login_verified')
+        self.startup.mark('initialized')
+    
+    def _start_fast(self):
+        """
+        Verify login while the CSRF token is acquired in the background
+        
+        The first poll only needs a verified login, so the CSRF race is left
+        running and the first call that needs a token waits for it.
+        """
+        if self.csrf.load():
+            self.startup.mark('csrf_ready')
+        else:
+            self._csrf_warmup = threading.Thread(target=self._warm_csrf_token, name='csrf-warmup', daemon=True)
+            self._csrf_warmup.start()
+        
+        self._get_user_info()
+        self.startup.mark('login_verified')
+    
+    def _warm_csrf_token(self):
+        self.csrf.race()
+        self.startup.mark('csrf_ready')
+        
+    @property
+    def csrf_token(self):
+        return self.csrf.token
+    
+    def _url(self, url):
+        """Resolve a roblox.com URL against base_url"""
+        return _rebase_url(url, self.base_url)
+    
+    def _refresh_csrf_token(self, stale_token=None):
+        """
+        Get a new CSRF token, trying the method that worked last time first
+        
+        Args:
+            stale_token (str, optional): The token that was just rejected, so a refresh
+                already done by another caller isn't repeated
+        """
+        # Join the startup race instead of starting a second walk
+        warmup = self._csrf_warmup
+        if warmup is not None:
+            warmup.join()
+            self._csrf_warmup = None
+            if self.csrf_token and self.csrf_token != stale_token:
+                return True
+        return self.csrf.refresh(stale_token)
+            
+    def _get_user_info(self):
+        """Get current user information to verify login"""
+        try:
+            events.debug('login.verifying', "Verifying login by getting user info")
+            url = self._url('https://users.roblox.com/v1/users/authenticated')
+            response = self.guard.call(url, functools.partial(self.session.get, url))
+            
+            if response.status_code == 200:
+                data = response.json()
+                self.user_id = data.get('id')
+                self.username = data.get('name')
+                self._session_verified_at = time.monotonic()
+                self._unauthorized = False
+                events.info('login.ok', "✅ Logged in as {username} (ID: {user_id})", username=self.username, user_id=self.user_id)
+                return True
+            elif response.status_code == 401:
+                events.error('login.unauthorized', "❌ Authentication failed. Please check your .ROBLOSECURITY cookie.")
+                return False
+            else:
+                events.error('login.failed', "❌ Failed to get user info: {status}", status=response.status_code, body=lambda: response.text)
+                return False
+        except Exception as e:
+            events.error('login.error', "❌ Error getting user info: {error}", error=e)
+            return False
+            
+    @property
+    def session_valid(self):
+        """True while the last successful login check is younger than session_ttl"""
+        if self._session_verified_at is None:
+            return False
+        return time.monotonic() - self._session_verified_at < self.session_ttl
+    
+    def _invalidate_session(self):
+        """Forget the cached login check after a 401, so the next cycle re-verifies"""
+        if self._session_verified_at is not None:
+            events.warning('login.invalidated', "⚠️ Received 401, login will be re-verified")
+        self._session_verified_at = None
+        self._unauthorized = True
+    
+    def _ensure_logged_in(self):
+        """
+        Verify login only when the cached check has expired or been invalidated
+        
+        Returns:
+            bool: True if the session is known to be logged in
+        """
+        if self.session_valid:
+            return True
+        return self._get_user_info()
+    
+    def _observe_response(self, response, *args, **kwargs):
+        """Session response hook that harvests CSRF tokens, tracks 401s and forwards status codes to the poll scheduler"""
+        self.csrf.harvest(response)
+        
+        if response.status_code == 401:
+            self._invalidate_session()
+        
+        if self.scheduler is not None:
+            retry_after = _retry_after_seconds(response) if response.status_code == 429 else None
+            self.scheduler.observe_response(response.status_code, retry_after)
+        return response
+    
+    def _get_friend_request_count(self):
+        """
+        Get the number of pending friend requests from the lightweight count endpoint
+        
+        Returns:
+            int: Pending friend request count, or None if the probe failed
+            
+        Raises:
+            CircuitOpenError: The count endpoint's circuit is open, so the cycle should be skipped
+        """
+        try:
+            url = self._url('https://friends.roblox.com/v1/user/friend-requests/count')
+            return self._parse_friend_request_count(self.guard.call(url, functools.partial(self.session.get, url)))
+        except CircuitOpenError:
+            raise
+        except Exception as e:
+            events.warning('friend_requests.count_error', "❌ Error getting friend request count: {error}", error=e)
+            return None
+    
+    def _parse_friend_request_count(self, response):
+        """
+        Read a count probe response, shared by both engines
+        
+        Returns:
+            int: Pending friend request count, or None if the probe failed
+        """
+        if response.status_code == 200:
+            count = response.json().get('count', 0)
+            events.debug('friend_requests.count', "Friend request count: {count}", count=count)
+            return count
+        
+        events.warning('friend_requests.count_failed', "❌ Failed to get friend request count: {status}", status=response.status_code)
+        return None
+    
+    def _should_list_friend_requests(self, count):
+        """
+        Decide from a count probe whether the full friend request listing is worth fetching
+        
+        Args:
+            count (int): Result of _get_friend_request_count, None if the probe failed
+            
+        Returns:
+            bool: True if the count is non-zero, changed since the last cycle, or unknown,
+                unless the count still matches a backlog with nothing to act on yet
+        """
+        self.startup.record_first_poll(self.metrics)
+        previous = self._last_friend_request_count
+        self._last_friend_request_count = count
+        
+        # Fall back to the full listing when the probe failed
+        if count is None:
+            return True
+        
+        self.metrics.set_gauge('friend_requests_pending', count)
+        
+        # Filtered requesters stay pending, so a non-zero count alone doesn't mean there is work
+        if self._idle_backlog and count == self._idle_backlog[0] and time.time() < self._idle_backlog[1]:
+            return False
+        
+        return count > 0 or count != previous
+    
+    def _note_idle_backlog(self):
+        """
+        Remember a complete listing that held nothing to act on yet, shared by both engines
+        
+        Requesters the filter rejects are only marked skipped, not declined, so
+        they keep the count above zero. When every listed requester has a stored
+        state whose backoff hasn't expired, listing them again before the earliest
+        backoff runs out changes nothing, so the count gate skips the listing
+        while the count matches the ones that weren't accepted, for at most
+        DEFAULT_IDLE_BACKLOG_RELIST.
+        """
+        self._idle_backlog = None
+        if not self.state_store or not self._listing_complete or not self._listed_ids:
+            return
+        
+        now = time.time()
+        due = now + DEFAULT_IDLE_BACKLOG_RELIST
+        pending = 0
+        for requester_id in self._listed_ids:
+            entry = self.state_store.get(requester_id) if requester_id else None
+            if entry is None or entry['retry_after'] <= now:
+                return
+            # Accepted requests leave the count, everything else stays in it
+            if entry['status'] != RequestStateStore.ACCEPTED:
+                pending += 1
+                due = min(due, entry['retry_after'])
+        
+        self._idle_backlog = (pending, due)
+        events.debug('friend_requests.idle_backlog', "{count} pending friend requests need nothing until {wait:.0f}s from now",
+                     count=pending, wait=due - now)
+    
+    def _fetch_friend_requests_page(self, limit, cursor=None):
+        """
+        Fetch a single page of pending friend requests
+        
+        Args:
+            limit (int): Page size to request, one of FRIEND_REQUEST_PAGE_SIZES
+            cursor (str, optional): Cursor returned by the previous page
+            
+        Returns:
+            tuple: (requests_page, next_cursor) on success, or None if the page could not be fetched
+        """
+        url, params = self._friend_requests_page_args(limit, cursor)
+        token = self.csrf_token
+        
+        def on_retry(response):
+            nonlocal token
+            if response.status_code == 403:
+                events.warning('friend_requests.auth_failed', "❌ Authentication failed ({status}), refreshing CSRF token", status=response.status_code)
+                # A token in the error response has already been harvested, only refresh if it was missing
+                self._refresh_csrf_token(stale_token=token)
+                token = self.csrf_token
+        
+        response = self.guard.call(url, functools.partial(self.session.get, url, params=params), on_retry=on_retry)
+        return self._parse_friend_requests_page(response)
+    
+    def _friend_requests_page_args(self, limit, cursor=None):
+        """
+        Build the listing call for one page, shared by both engines
+        
+        Returns:
+            tuple: (url, params) to pass to session.get
+        """
+        params = {'limit': limit, 'sortOrder': 'Desc'}
+        if cursor:
+            params['cursor'] = cursor
+        
+        events.debug('friend_requests.fetching', "Fetching friend requests page", limit=limit, cursor=cursor)
+        return self._url('https://friends.roblox.com/v1/my/friends/requests'), params
+    
+    def _parse_friend_requests_page(self, response):
+        """
+        Turn a listing response into FriendRequest records, shared by both engines
+        
+        Requester profiles in the listing are fed to the requester filter and
+        the requests are noted on the backlog. The listing counts as complete
+        once a page comes back without a cursor.
+        
+        Returns:
+            tuple: (requests_page, next_cursor) on success, or None if the page could not be fetched
+        """
+        if response.status_code == 200:
+            data = response.json()
+            
+            # The full payload is only serialised if debug logging is enabled
+            events.debug('friend_requests.payload', "Friend requests response", payload=lambda: json.dumps(data))
+            self.startup.record_first_poll(self.metrics)
+            
+            items = data.get('data', [])
+            if self.requester_filter:
+                self.requester_filter.seed(items)
+            requests_page = self.parser.parse(items)
+            self.metrics.track_backlog(request.requester_id for request in requests_page)
+            
+            cursor = data.get('nextPageCursor')
+            self._listed_ids.extend(request.requester_id for request in requests_page)
+            self._listing_complete = not cursor
+            return requests_page, cursor
+        elif response.status_code in [401, 403]:
+            events.warning('friend_requests.auth_failed', "❌ Authentication failed ({status}), giving up on this page", status=response.status_code)
+            return None
+        else:
+            events.error('friend_requests.failed', "❌ Failed to get friend requests: {status}", status=response.status_code, body=lambda: response.text)
+            return None
+    
+    def _begin_listing(self):
+        """Start collecting the requester IDs of a new listing, shared by both engines"""
+        self._listed_ids = []
+        self._listing_complete = False
+    
+    @staticmethod
+    def _check_page_size(limit):
+        if limit not in FRIEND_REQUEST_PAGE_SIZES:
+            raise ValueError(f"Invalid friend request page size {limit}. Must be one of {FRIEND_REQUEST_PAGE_SIZES}.")
+    
+    def iter_friend_request_pages(self, limit=DEFAULT_FRIEND_REQUEST_PAGE_SIZE, max_pages=DEFAULT_FRIEND_REQUEST_MAX_PAGES):
+        """
+        Lazily yield pages of pending friend requests, following nextPageCursor
+        
+        The next page is only fetched once the caller has consumed the current
+        one, so requests from the first page can be accepted before the rest of
+        the backlog has been downloaded.
+        
+        Args:
+            limit (int): Page size, one of FRIEND_REQUEST_PAGE_SIZES
+            max_pages (int, optional): Maximum number of pages to pull. None means no cap.
+            
+        Yields:
+            list: FriendRequest records of one page
+        """
+        self._check_page_size(limit)
+        self._begin_listing()
+        
+        cursor = None
+        pages = 0
+        
+        try:
+            while max_pages is None or pages < max_pages:
+                try:
+                    page = self._fetch_friend_requests_page(limit, cursor)
+                except CircuitOpenError as e:
+                    events.warning('friend_requests.circuit_open', "🔌 Not fetching friend requests: {error}", error=e)
+                    return
+                if page is None:
+                    return
+                
+                requests_page, cursor = page
+                pages += 1
+                events.info('friend_requests.page', "✅ Page {page}: found {count} pending friend requests", page=pages, count=len(requests_page))
+                yield requests_page
+                
+                if not cursor:
+                    return
+            
+            events.info('friend_requests.page_cap', "⚠️ Stopped after {pages} pages, more friend requests are waiting for the next cycle", pages=pages)
+        except Exception as e:
+            events.exception('friend_requests.error', "❌ Error getting friend requests: {error}", error=e)
+    
+    def iter_friend_requests(self, limit=DEFAULT_FRIEND_REQUEST_PAGE_SIZE, max_pages=DEFAULT_FRIEND_REQUEST_MAX_PAGES):
+        """
+        Lazily yield pending friend requests, page by page
+        
+        Args:
+            limit (int): Page size, one of FRIEND_REQUEST_PAGE_SIZES
+            max_pages (int, optional): Maximum number of pages to pull. None means no cap.
+            
+        Yields:
+            FriendRequest: Pending friend request
+        """
+        for requests_page in self.iter_friend_request_pages(limit=limit, max_pages=max_pages):
+            yield from requests_page
+    
+    def get_friend_requests(self, limit=DEFAULT_FRIEND_REQUEST_PAGE_SIZE, max_pages=DEFAULT_FRIEND_REQUEST_MAX_PAGES):
+        """
+        Get all pending friend requests
+        
+        Args:
+            limit (int): Page size, one of FRIEND_REQUEST_PAGE_SIZES
+            max_pages (int, optional): Maximum number of pages to pull. None means no cap.
+            
+        Returns:
+            list: FriendRequest records from every fetched page
+        """
+        processed_requests = list(self.iter_friend_requests(limit=limit, max_pages=max_pages))
+        events.info('friend_requests.found', "✅ Found {count} pending friend requests", count=len(processed_requests))
+        return processed_requests
+    
+    def _lookup_profiles(self, user_ids):
+        """
+        Fetch requester profiles in one call to the batch users endpoint
+        
+        Args:
+            user_ids (list): Up to DEFAULT_PROFILE_BATCH_SIZE user IDs
+            
+        Returns:
+            list: User entries from the response, empty if the lookup failed
+        """
+        url, body = self._lookup_profiles_args(user_ids)
+        token = self.csrf_token
+        
+        def on_retry(response):
+            nonlocal token
+            if response.status_code == 403:
+                # A token in the error response has already been harvested, only refresh if it was missing
+                if self.csrf_token == token:
+                    self._refresh_csrf_token(stale_token=token)
+                token = self.csrf_token
+                return 0
+            return None
+        
+        try:
+            response = self.guard.call(url, functools.partial(self.session.post, url, json=body), failed=_is_failed_lookup, on_retry=on_retry)
+        except requests.RequestException as e:
+            events.warning('filter.lookup_error', "⚠️ Error looking up {count} requesters: {error}", count=len(user_ids), error=e)
+            return []
+        return self._parse_lookup_profiles(response, user_ids)
+    
+    def _lookup_profiles_args(self, user_ids):
+        """
+        Build the batch users call, shared by both engines
+        
+        Returns:
+            tuple: (url, json body) to pass to session.post
+        """
+        self.metrics.inc('profile_lookups_total')
+        return self._url('https://users.roblox.com/v1/users'), {'userIds': user_ids, 'excludeBannedUsers': False}
+    
+    def _parse_lookup_profiles(self, response, user_ids):
+        """
+        Returns:
+            list: User entries from a batch users response, empty if the lookup failed
+        """
+        if response.status_code != 200:
+            events.warning('filter.lookup_failed', "⚠️ Failed to look up {count} requesters: {status}", count=len(user_ids), status=response.status_code)
+            return []
+        return response.json().get('data', [])
+    
+    def filter_friend_requests(self, requests_page):
+        """
+        Drop friend requests the requester filter rejects, looking up unknown requesters in bulk
+        
+        Rejected requests are recorded as skipped in the state store. Requests whose
+        requester couldn't be looked up are left out of this cycle and tried again
+        on the next one.
+        
+        Args:
+            requests_page (list): FriendRequest records of one page
+            
+        Returns:
+            list: FriendRequest records to accept
+        """
+        if not self.requester_filter or not requests_page:
+            return requests_page
+        
+        for batch in self.requester_filter.missing(requests_page):
+            self.requester_filter.store(self._lookup_profiles(batch))
+        
+        kept, rejected, deferred = self.requester_filter.apply(requests_page)
+        self._record_filtered(rejected, deferred)
+        return kept
+    
+    def _record_filtered(self, rejected, deferred):
+        """Record rejected requests as skipped and take rejected and deferred requests off the backlog"""
+        for request, reason in rejected:
+            events.info('filter.rejected', "🚫 Not accepting {requester_name} (ID: {requester_id}): {reason}",
+                        requester_name=request.requester_name, requester_id=request.requester_id, reason=reason)
+            if self.state_store:
+                self.state_store.record(request.requester_id, RequestStateStore.SKIPPED, f'filtered: {reason}')
+            self.metrics.resolve_backlog(request.requester_id)
+        
+        for request in deferred:
+            self.metrics.resolve_backlog(request.requester_id)
+        if deferred:
+            events.warning('filter.deferred', "⚠️ Couldn't look up {count} requesters, leaving them for the next cycle", count=len(deferred))
+    
+    def _accept_request_args(self, endpoint, requester_id):
+        """
+        Build the session call for an accept endpoint
+        
+        Returns:
+            tuple: (url, kwargs) to pass to session.post
+        """
+        url = self._url(endpoint['url'].format(user_id=requester_id))
+        if endpoint.get('form'):
+            return url, {'data': {'targetUserID': requester_id}}
+        return url, {'json': {}}
+    
+    def _accept(self, requester_id, endpoint_names=None, max_attempts=3):
+        """
+        Accept a friend request, walking the endpoints in order of observed success
+        
+        Stops immediately on terminal responses such as already being friends or
+        the request no longer existing. CSRF rejections, rate limits and server
+        errors are retried on the same endpoint with the guard's backoff. A rate
+        limit that outlasts those retries ends the chain with a retryable
+        result, since it applies to the account rather than the endpoint.
+        An endpoint whose circuit is open ends the chain the same way, without
+        counting against its success rate. Anything else moves on to the next
+        endpoint.
+        
+        Args:
+            requester_id (int): User ID that sent the friend request
+            endpoint_names (list, optional): Only use these endpoints from ACCEPT_ENDPOINTS
+            max_attempts (int): Attempts per endpoint for retryable responses
+            
+        Returns:
+            AcceptResult: Whether it was accepted, how the last response was classified and why
+        """
+        calls = 0
+        kind, reason = ENDPOINT_FAILED, 'no endpoints tried'
+        
+        for endpoint in self.accept_strategy.ordered(endpoint_names):
+            if not self.csrf_token:
+                events.debug('accept.no_token', "No CSRF token available, refreshing before accepting request")
+                self._refresh_csrf_token()
+            
+            url, kwargs = self._accept_request_args(endpoint, requester_id)
+            token = self.csrf_token
+            attempt = 0
+            outcome = [ENDPOINT_FAILED, 'no response']
+            
+            def send():
+                nonlocal calls, token, attempt
+                calls += 1
+                attempt += 1
+                token = self.csrf_token
+                events.debug('accept.attempt', "Accept attempt {attempt}/{max_attempts} via {endpoint} for user ID: {requester_id}",
+                             attempt=attempt, max_attempts=max_attempts, endpoint=endpoint['name'], requester_id=requester_id)
+                response = self.session.post(url, **kwargs)
+                outcome[:] = self._classify_accept(endpoint, response)
+                return response
+            
+            def on_retry(response):
+                if outcome[0] == CSRF_REJECTED:
+                    # A token in the error response has already been harvested, only refresh if it was missing
+                    if self.csrf_token == token:
+                        self._refresh_csrf_token(stale_token=token)
+                    return 0
+                return None
+            
+            try:
+                self.guard.call(url, send, retryable=lambda response: outcome[0] in RETRYABLE_KINDS,
+                                failed=lambda response: _is_failed_accept(outcome[0], response), on_retry=on_retry, max_attempts=max_attempts)
+                kind, reason = outcome
+            except requests.RequestException as e:
+                kind, reason = self._accept_error(endpoint, e)
+            
+            result = self._settle_accept(endpoint, requester_id, kind, reason, calls)
+            if result is not None:
+                return result
+        
+        return AcceptResult(False, kind, reason, calls)
+    
+    def _classify_accept(self, endpoint, response):
+        """Classify an accept response and count it, shared by both engines"""
+        kind, reason = classify_accept_response(endpoint, response)
+        self.metrics.inc('accept_attempts_total', endpoint=endpoint['name'], kind=kind)
+        events.debug('accept.response', "Accept response status: {status} ({kind}: {reason})", status=response.status_code, kind=kind, reason=reason)
+        return kind, reason
+    
+    def _accept_error(self, endpoint, error):
+        """
+        Classify an accept call that raised instead of returning a response, shared by both engines
+        
+        Returns:
+            tuple: (kind, reason)
+        """
+        if isinstance(error, CircuitOpenError):
+            # Nothing was sent, so the endpoint's success rate is left alone
+            return CIRCUIT_OPEN, str(error)
+        self.metrics.inc('accept_attempts_total', endpoint=endpoint['name'], kind=RETRYABLE)
+        events.warning('accept.error', "❌ Error accepting via {endpoint}: {error}", endpoint=endpoint['name'], error=error)
+        return RETRYABLE, str(error)
+    
+    def _settle_accept(self, endpoint, requester_id, kind, reason, calls):
+        """
+        Decide what an endpoint's outcome means for the fallback chain, shared by both engines
+        
+        Returns:
+            AcceptResult: The result to stop with, or None to move on to the next endpoint
+        """
+        if kind == ACCEPTED:
+            self.accept_strategy.record(endpoint['name'], True)
+            events.info('accept.succeeded', "✅ Accepted friend request via {endpoint} from user ID: {requester_id}", endpoint=endpoint['name'], requester_id=requester_id)
+            return AcceptResult(True, kind, endpoint['name'], calls)
+        elif kind == TERMINAL:
+            events.info('accept.terminal', "⛔ Not retrying friend request from user ID {requester_id}: {reason}", requester_id=requester_id, reason=reason)
+            return AcceptResult(False, kind, reason, calls)
+        elif kind == CIRCUIT_OPEN:
+            # The breaker is shedding load, falling back to the other endpoints would add it back
+            events.warning('accept.circuit_open', "🔌 Not accepting friend request from user ID {requester_id} for now: {reason}",
+                           requester_id=requester_id, reason=reason)
+            return AcceptResult(False, kind, reason, calls)
+        elif kind == RATE_LIMITED:
+            # The limit is on the account, so the other endpoints would only add to it
+            events.warning('accept.rate_limited', "⏳ Still rate limited via {endpoint}, leaving friend request from user ID {requester_id} for later",
+                           endpoint=endpoint['name'], requester_id=requester_id)
+            return AcceptResult(False, kind, reason, calls)
+        elif kind == ENDPOINT_FAILED:
+            self.accept_strategy.record(endpoint['name'], False)
+            events.debug('accept.endpoint_failed', "❌ Endpoint {endpoint} failed: {reason}", endpoint=endpoint['name'], reason=reason)
+        return None
+    
+    def accept_friend_request_direct(self, requester_id):
+        """Accept a friend request using the direct API endpoint only"""
+        return self._accept(requester_id, endpoint_names=['direct']).accepted
+    
+    def accept_friend_request_alternative(self, requester_id):
+        """Accept a friend request using the alternative API endpoints only"""
+        return self._accept(requester_id, endpoint_names=['accept-request', 'request-accept', 'legacy-user']).accepted
+    
+    def accept_friend_request_web_based(self, requester_id):
+        """Accept a friend request using the web-based endpoint only"""
+        return self._accept(requester_id, endpoint_names=['web']).accepted
+    
+    def _accept_friend_request(self, requester_id):
+        """
+        Accept a friend request using all available methods and report the outcome
+        
+        Returns:
+            AcceptResult: Whether it was accepted, how the last response was classified and why
+        """
+        if self.progress is not None:
+            self.progress.start(requester_id)
+        self.metrics.add_gauge('accepts_in_flight', 1)
+        try:
+            with self.metrics.timer('accept_duration_seconds'):
+                result = self._accept(requester_id)
+        finally:
+            self.metrics.add_gauge('accepts_in_flight', -1)
+        self._record_accept_metrics(requester_id, result)
+        
+        if result.kind == TERMINAL:
+            events.warning('accept.rejected', "❌ Friend request from user ID {requester_id} cannot be accepted: {reason}", requester_id=requester_id, reason=result.reason)
+        elif not result.accepted:
+            events.warning('accept.exhausted', "❌ All methods failed to accept friend request from user ID {requester_id}", requester_id=requester_id, calls=result.calls)
+        return result
+    
+    def accept_friend_request(self, requester_id):
+        """Master method to accept a friend request using all available methods"""
+        return self._accept_friend_request(requester_id).accepted
+    
+    def _record_accept_metrics(self, requester_id, result):
+        """Count an accept outcome and the HTTP calls it cost, and take it off the backlog"""
+        outcome = result.kind if result.kind in (ACCEPTED, TERMINAL) else 'failed'
+        self.metrics.inc('accepts_total', outcome=outcome)
+        self.metrics.observe('accept_http_calls', result.calls, buckets=DEFAULT_CALL_COUNT_BUCKETS)
+        self.metrics.resolve_backlog(requester_id)
+            
+    def _process_requests(self, requests_page):
+        """
+        Skip, filter and accept a page of friend requests one at a time
+        
+        Stops before the next accept once shutdown is requested, leaving the
+        rest of the page in self.progress for the checkpoint.
+        
+        Returns:
+            tuple: (found, skipped) counts
+        """
+        fresh, skipped = self._skip_handled(requests_page)
+        fresh = self.filter_friend_requests(fresh)
+        self.progress.add(fresh)
+        
+        found = 0
+        for request in fresh:
+            if self.shutdown.stopping:
+                break
+            
+            requester_id = request.requester_id
+            requester_name = request.requester_name
+            
+            found += 1
+            if requester_id:
+                events.info('request.processing', "👥 Processing friend request from {requester_name} (ID: {requester_id})",
+                            requester_name=requester_name, requester_id=requester_id)
+                result = self._accept_friend_request(requester_id)
+                if self.state_store:
+                    self.state_store.record_result(requester_id, result)
+                self.progress.finish(requester_id)
+        
+        return found, skipped
+    
+    def _skip_handled(self, requests_page):
+        """
+        Drop requesters we recently accepted or gave up on, shared by both engines
+        
+        Returns:
+            tuple: (fresh requests, number skipped)
+        """
+        if not self.state_store:
+            return list(requests_page), 0
+        
+        fresh = []
+        for request in requests_page:
+            if request.requester_id and self.state_store.should_skip(request.requester_id):
+                self.metrics.resolve_backlog(request.requester_id)
+            else:
+                fresh.append(request)
+        return fresh, len(requests_page) - len(fresh)
+    
+    def _checkpoint_requests(self, checkpoint):
+        """
+        Restore the scheduler from a checkpoint and rebuild the friend requests it left unfinished, shared by both engines
+        
+        Returns:
+            list: FriendRequest records, in-flight ones first
+        """
+        self.scheduler.restore(checkpoint.get('scheduler') or {})
+        
+        # Requests that were in flight may already be accepted, retrying them costs one terminal response
+        requests_list = [FriendRequest(requester_id, requester_name) for requester_id, requester_name in checkpoint['in_flight'] + checkpoint['pending']]
+        if requests_list:
+            events.info('bot.resuming', "♻️ Resuming {count} friend requests from a checkpoint saved {age:.0f}s ago",
+                        count=len(requests_list), age=checkpoint['age'], reason=checkpoint.get('reason'))
+            self.metrics.track_backlog(request.requester_id for request in requests_list)
+        return requests_list
+    
+    def _resume(self, checkpoint):
+        """Accept the friend requests a previous run left unfinished, before the first poll"""
+        requests_list = self._checkpoint_requests(checkpoint)
+        if not requests_list:
+            return
+        
+        found, skipped = self._process_requests(requests_list)
+        if self.state_store:
+            self.state_store.flush()
+        events.info('bot.resumed', "♻️ Resumed {found} friend requests, skipped {skipped} already handled", found=found, skipped=skipped)
+    
+    def _wait_for_pushes(self, realtime, delay, caught_up):
+        """
+        Wait until the next poll is due, accepting friend requests as the realtime hub pushes them
+        
+        While the stream is connected and the last poll left nothing behind,
+        the wait stretches to the subscriber's poll_interval. If the stream
+        drops, the poll is due delay seconds after the wait started, and a
+        (re)connect makes it due straight away.
+        
+        Args:
+            realtime (RealtimeSubscriber): The running subscriber
+            delay (float): Seconds until the next poll without the stream
+            caught_up (bool): The last poll saw the whole backlog
         """
-        self.session = requests.Session()
-        self.csrf_token = None
-        self.user_id = None
-        self.username = None
-        
-        # Set the cookie from parameter or environment variable
-        if cookie:
-            self.cookie = cookie
-        else:
-            self.cookie = os.environ.get('ROBLOSECURITY')
-            
-        if not self.cookie:
-            raise ValueError("No ROBLOSECURITY cookie provided. Please set it as an environment variable or pass it to the constructor.")
+        started = time.monotonic()
+        while not self.shutdown.stopping:
+            wait = max(delay, realtime.poll_interval) if realtime.connected and caught_up else delay
+            if not realtime.wait(started + wait - time.monotonic(), self.shutdown):
+                return
             
-        # Set the cookie in the session
-        self.session.cookies['.ROBLOSECURITY'] = self.cookie
+            pushed, resync = realtime.take()
+            if pushed:
+                self._process_requests(pushed)
+                if self.state_store:
+                    self.state_store.flush()
+            if resync:
+                return
+    
+    def run_forever(self, check_interval=5, page_size=DEFAULT_FRIEND_REQUEST_PAGE_SIZE, max_pages=DEFAULT_FRIEND_REQUEST_MAX_PAGES, count_probe=True, scheduler=None, state_store=None,
+                    requester_filter=None, shutdown=None, realtime=None):  # Reduced interval for faster response
+        """
+        Run the bot, checking for and accepting friend requests until shutdown is requested
         
-        # Common headers
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Referer': 'https://www.roblox.com/',
-            'Origin': 'https://www.roblox.com',
-            'Accept': 'application/json, text/plain, */*',
-            'Content-Type': 'application/json'
-        })
+        SIGTERM and SIGINT stop polling and let the current accept finish. The
+        friend requests left over are checkpointed in the state store, and the
+        next run accepts them before its first poll. With a realtime subscriber,
+        pushed friend requests are accepted as they arrive and polling falls back
+        to a safety net while the stream is connected.
         
-        # Initialize CSRF token and verify login
-        self._refresh_csrf_token()
-        self._get_user_info()
+        Args:
+            check_interval (int): Starting interval between checks, in seconds
+            page_size (int): How many friend requests to fetch per page
+            max_pages (int, optional): Maximum number of pages to pull per cycle. None means no cap.
+            count_probe (bool): Check the friend request count first and skip the full listing when idle
+            scheduler (PollScheduler, optional): Decides how long to wait between checks. Defaults to an AdaptivePollScheduler.
+            state_store (RequestStateStore, optional): Remembers outcomes so recently handled requesters are skipped,
+                and holds the checkpoint
+            requester_filter (RequesterFilter, optional): Decides which requesters to accept. Everyone is accepted if not provided.
+            shutdown (ShutdownController, optional): Handles shutdown signals. If not provided, read from SHUTDOWN_DEADLINE env var.
+            realtime (RealtimeSubscriber, optional): Pushes friend requests from the realtime notification hub. Polling only if not provided.
+        """
+        self.scheduler = scheduler or AdaptivePollScheduler(initial_interval=check_interval)
+        self.state_store = state_store
+        self.requester_filter = requester_filter
+        self.shutdown = shutdown or ShutdownController.from_env()
+        self.progress = RunProgress()
+        self.shutdown.install()
+        if realtime is not None:
+            realtime.start(self)
         
-    def _refresh_csrf_token(self):
-        """Get a new CSRF token using multiple methods for reliability"""
-        methods = [
-            {
-                "name": "Account settings endpoint",
-                "url": "https://accountsettings.roblox.com/v1/email",
-                "method": "POST",
-                "data": {}
-            },
-            {
-                "name": "Friends endpoint",
-                "url": "https://friends.roblox.com/v1/users/1/request-friendship",
-                "method": "POST",
-                "data": {}
-            },
-            {
-                "name": "Avatar endpoint",
-                "url": "https://avatar.roblox.com/v1/avatar/set-wearing-assets",
-                "method": "POST",
-                "data": {"assetIds":[]}
-            },
-            {
-                "name": "Groups endpoint",
-                "url": "https://groups.roblox.com/v1/groups/search",
-                "method": "POST",
-                "data": {"keyword":"", "limit":10}
-            }
-        ]
+        events.info('bot.started', "🤖 Bot started. Checking for friend requests every {interval} seconds ({scheduler})",
+                    interval=check_interval, scheduler=type(self.scheduler).__name__)
         
-        for method in methods:
-            try:
-                print(f"Trying to get CSRF token from {method['name']}...")
-                response = self.session.post(method['url'], json=method['data'], allow_redirects=False)
-                print(f"Response status: {response.status_code}")
-                
-                if 'x-csrf-token' in response.headers:
-                    self.csrf_token = response.headers['x-csrf-token']
-                    self.session.headers['X-CSRF-TOKEN'] = self.csrf_token
-                    print(f"✅ CSRF token obtained successfully from {method['name']}: {self.csrf_token[:5]}...")
-                    logging.info(f"CSRF token refreshed successfully using {method['name']}")
-                    return True
-                else:
-                    print(f"❌ Failed to get CSRF token from {method['name']}. Status: {response.status_code}")
-                    logging.warning(f"Failed to get CSRF token from {method['name']}. Status: {response.status_code}")
-            except Exception as e:
-                print(f"❌ Error refreshing CSRF token via {method['name']}: {e}")
-                logging.warning(f"Error refreshing CSRF token via {method['name']}: {e}")
+        if self.username:
+            events.info('bot.user', "👤 Logged in as {username} (ID: {user_id})", username=self.username, user_id=self.user_id)
+        else:
+            events.error('bot.not_logged_in', "❌ Not logged in! Please check your security token.")
         
-        print("❌ Failed to get CSRF token from all methods")
-        logging.error("Failed to get CSRF token from all methods")
-        return False
-            
-    def _get_user_info(self):
-        """Get current user information to verify login"""
-        try:
-            print("Verifying login by getting user info...")
-            response = self.session.get('https://users.roblox.com/v1/users/authenticated')
-            print(f"User info response status: {response.status_code}")
-            
-            if response.status_code == 200:
-                data = response.json()
-                self.user_id = data.get('id')
-                self.username = data.get('name')
-                print(f"✅ Successfully logged in as {self.username} (ID: {self.user_id})")
-                logging.info(f"Logged in as {self.username} (ID: {self.user_id})")
-                return True
-            elif response.status_code == 401:
-                print("❌ Authentication failed. Please check your .ROBLOSECURITY cookie.")
-                logging.error("Authentication failed. Please check your .ROBLOSECURITY cookie.")
-                return False
-            else:
-                print(f"❌ Failed to get user info: {response.status_code} - {response.text}")
-                logging.error(f"Failed to get user info: {response.status_code} - {response.text}")
-                return False
-        except Exception as e:
-            print(f"❌ Error getting user info: {e}")
-            logging.error(f"Error getting user info: {e}")
-            return False
-            
-    def get_friend_requests(self):
-        """Get all pending friend requests"""
         try:
-            print("Fetching friend requests...")
-            response = self.session.get('https://friends.roblox.com/v1/my/friends/requests')
-            print(f"Friend requests response status: {response.status_code}")
+            checkpoint = self.state_store.take_checkpoint() if self.state_store else None
+            if checkpoint:
+                self._resume(checkpoint)
             
-            if response.status_code == 200:
-                data = response.json()
-                
-                # Print the full JSON response for debugging
-                print("FULL JSON RESPONSE:")
-                print(json.dumps(data, indent=2))
-                
-                requests_data = data.get('data', [])
-                print(f"✅ Found {len(requests_data)} pending friend requests")
-                logging.info(f"Found {len(requests_data)} pending friend requests")
-                
-                # Extract request information with proper error handling
-                processed_requests = []
-                for i, request in enumerate(requests_data):
-                    # Try multiple possible field names for user ID
-                    requester_id = None
-                    for field in ['requesterUserId', 'userId', 'id', 'requesterId', 'sourceUserId']:
-                        if field in request:
-                            requester_id = request.get(field)
-                            if requester_id:
-                                break
+            while not self.shutdown.stopping:
+                try:
+                    events.debug('cycle.started', "🔄 Checking for new friend requests")
+                    self.progress.clear()
                     
-                    # If no ID found in direct fields, check nested objects
-                    if not requester_id:
-                        if 'requester' in request and isinstance(request['requester'], dict):
-                            requester_id = request['requester'].get('id') or request['requester'].get('userId')
-                        elif 'user' in request and isinstance(request['user'], dict):
-                            requester_id = request['user'].get('id') or request['user'].get('userId')
+                    # Check if we're still logged in, using the cached check while it is fresh
+                    if not self._ensure_logged_in():
+                        events.warning('login.expired', "❌ Session may have expired, refreshing login")
+                        self._refresh_csrf_token()
+                        self.scheduler.record_error()
+                        # The scheduler's error backoff spaces out repeated failures
+                        self.shutdown.wait(self.scheduler.next_delay())
+                        continue
                     
-                    # Try multiple possible field names for username
-                    requester_name = 'Unknown'
-                    for field in ['requesterUsername', 'username', 'name', 'displayName']:
-                        if field in request:
-                            name = request.get(field)
-                            if name:
-                                requester_name = name
-                                break
+                    found = 0
+                    skipped = 0
+                    cycle_started = time.perf_counter()
                     
-                    # If no name found in direct fields, check nested objects
-                    if requester_name == 'Unknown':
-                        if 'requester' in request and isinstance(request['requester'], dict):
-                            requester_name = request['requester'].get('name') or request['requester'].get('username') or request['requester'].get('displayName') or 'Unknown'
-                        elif 'user' in request and isinstance(request['user'], dict):
-                            requester_name = request['user'].get('name') or request['user'].get('username') or request['user'].get('displayName') or 'Unknown'
+                    # Probe the cheap count endpoint before pulling the full listing, skipping the cycle while its circuit is open
+                    try:
+                        count = self._get_friend_request_count() if count_probe else None
+                    except CircuitOpenError as e:
+                        events.warning('cycle.circuit_open', "🔌 Skipping this cycle: {error}", error=e)
+                        self.scheduler.record_error()
+                        self.shutdown.wait(max(self.scheduler.next_delay(), e.retry_in))
+                        continue
                     
-                    # If we still don't have an ID but have an originSourceType, this might be a different type of request
-                    if not requester_id and 'originSourceType' in request:
-                        print(f"⚠️ This appears to be a different type of request with originSourceType: {request.get('originSourceType')}")
+                    caught_up = True
+                    if count_probe and not self._should_list_friend_requests(count):
+                        events.debug('cycle.idle', "ℹ️ No pending friend requests found.")
+                    elif self._unauthorized:
+                        # The probe got a 401, re-verify login on the next cycle instead of listing
+                        self.scheduler.record_error()
+                        self.shutdown.wait(self.scheduler.next_delay())
+                        continue
+                    else:
+                        # Stream friend requests page by page, accepting as they arrive
+                        for requests_page in self.iter_friend_request_pages(limit=page_size, max_pages=max_pages):
+                            page_found, page_skipped = self._process_requests(requests_page)
+                            found += page_found
+                            skipped += page_skipped
+                            if self.shutdown.stopping:
+                                break
                         
-                        # For requests with originSourceType, try to find the ID in different locations
-                        if 'sourceUserId' in request:
-                            requester_id = request.get('sourceUserId')
-                        elif 'userId' in request:
-                            requester_id = request.get('userId')
+                        if skipped:
+                            events.info('cycle.skipped', "⏭️ Skipped {skipped} recently handled friend requests", skipped=skipped)
+                        if not found:
+                            events.debug('cycle.idle', "ℹ️ No pending friend requests found.")
+                        else:
+                            events.info('cycle.processed', "🎉 Processed {found} pending friend requests", found=found, endpoints=self.accept_strategy.snapshot)
+                        
+                        # Write this cycle's outcomes in one transaction
+                        if self.state_store:
+                            self.state_store.flush()
+                        self._note_idle_backlog()
+                        caught_up = self._listing_complete
                     
-                    # If we have an ID, add to processed requests
-                    if requester_id:
-                        print(f"  Request {i+1}: User {requester_name} (ID: {requester_id})")
-                        logging.info(f"Request {i+1}: User {requester_name} (ID: {requester_id})")
-                        processed_requests.append({
-                            'requesterUserId': requester_id,
-                            'requesterUsername': requester_name,
-                            'originalData': request  # Keep original data for reference
-                        })
+                    self.metrics.observe('poll_cycle_duration_seconds', time.perf_counter() - cycle_started)
+                    self.metrics.maybe_log_summary()
+                    
+                    # Let the scheduler decide how long to wait before checking again, waking early on shutdown
+                    self.scheduler.record_cycle(found)
+                    delay = self.scheduler.next_delay()
+                    events.debug('cycle.wait', "⏱️ Waiting {delay:.2f} seconds before checking again", delay=delay, scheduler=self.scheduler.snapshot)
+                    if realtime is None:
+                        self.shutdown.wait(delay)
                     else:
-                        print(f"  ⚠️ Request {i+1}: Could not extract user ID from request data")
-                        print(f"  Raw request data: {request}")
-                
-                return processed_requests
-            elif response.status_code in [401, 403]:
-                print(f"❌ Authentication failed ({response.status_code}), refreshing CSRF token")
-                logging.warning(f"Authentication failed ({response.status_code}), refreshing CSRF token")
-                
-                if 'x-csrf-token' in response.headers:
-                    self.csrf_token = response.headers['x-csrf-token']
-                    self.session.headers['X-CSRF-TOKEN'] = self.csrf_token
-                    print(f"✅ CSRF token refreshed from error response: {self.csrf_token[:5]}...")
-                    logging.info("CSRF token refreshed from error response")
-                    time.sleep(1)  # Brief pause before retry
-                    return self.get_friend_requests()
-                else:
-                    print("❌ No CSRF token in response, trying refresh method")
-                    self._refresh_csrf_token()
-                    time.sleep(1)  # Brief pause before retry
-                    return self.get_friend_requests()
-            else:
-                print(f"❌ Failed to get friend requests: {response.status_code} - {response.text}")
-                logging.error(f"Failed to get friend requests: {response.status_code} - {response.text}")
-                return []
+                        self._wait_for_pushes(realtime, delay, caught_up)
+                    
+                except Exception as e:
+                    events.exception('cycle.error', "❌ Error in main loop: {error}", error=e)
+                    self.scheduler.record_error()
+                    if self.state_store:
+                        self.state_store.flush()
+                    
+                    # Don't exit the loop, just wait and try again
+                    self.shutdown.wait(self.scheduler.next_delay())
+        finally:
+            # Runs on the deadline's KeyboardInterrupt too, so an interrupted accept is kept as in flight
+            self.shutdown.close()
+            if realtime is not None:
+                realtime.stop()
+                self.progress.add(realtime.take()[0])
+            if self.state_store:
+                self.state_store.save_checkpoint(self.progress, self.scheduler, self.shutdown.reason)
+            events.info('bot.stopped', "👋 Bot stopped ({reason}) with {left} friend requests left for the next run",
+                        reason=self.shutdown.reason or 'interrupted', left=len(self.progress))
+
+
+class AsyncRobloxFriendBot:
+    def __init__(self, cookie=None, max_concurrency=DEFAULT_ACCEPT_CONCURRENCY, bot=None):
+        """
+        Initialize the asyncio Roblox Friend Bot
+        
+        Blocking HTTP calls are run on worker threads through the wrapped
+        RobloxFriendBot's session, so up to max_concurrency accepts can be in
+        flight at once without blocking the event loop.
+        
+        Args:
+            cookie (str, optional): The .ROBLOSECURITY cookie. If not provided, will look for ROBLOSECURITY env var.
+            max_concurrency (int): Maximum number of friend requests accepted at the same time
+            bot (RobloxFriendBot, optional): Existing bot to reuse instead of creating a new one
+        """
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        
+        self.bot = bot or RobloxFriendBot(cookie)
+        self.max_concurrency = max_concurrency
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        
+        # Dedicated worker threads so the default executor's size doesn't cap concurrency
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency + 2, thread_name_prefix='roblox-bot')
+        
+        # Size the per-host connection pools so concurrent accepts don't queue for a connection
+        self.bot.transport.mount(self.bot.session, self.bot.metrics, pool_maxsize=max_concurrency, base_url=self.bot.base_url)
+    
+    @property
+    def session(self):
+        return self.bot.session
+    
+    @property
+    def username(self):
+        return self.bot.username
+    
+    @property
+    def user_id(self):
+        return self.bot.user_id
+    
+    @property
+    def metrics(self):
+        return self.bot.metrics
+    
+    async def _run_blocking(self, func, *args, **kwargs):
+        """Run a blocking call on the bot's worker threads"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+    
+    async def _request(self, method, url, retryable=_is_retryable_response, failed=_is_failed_response, on_retry=None, max_attempts=None, **kwargs):
+        """
+        Send a request on a worker thread through the bot's RequestGuard
+        
+        Rate limits, CSRF rejections and server errors are retried with backoff,
+        honouring Retry-After, and calls to an endpoint whose circuit is open
+        fail fast with CircuitOpenError.
+        
+        Args:
+            method (str): 'get' or 'post'
+            url (str): Request URL
+            retryable, failed, on_retry, max_attempts: See RequestGuard.call_async
+            **kwargs: Passed through to the session call
+            
+        Returns:
+            requests.Response: The last response received
+        """
+        send = getattr(self.bot.session, method)
+        return await self.bot.guard.call_async(url, lambda: self._run_blocking(send, url, **kwargs), retryable=retryable,
+                                               failed=failed, on_retry=on_retry, max_attempts=max_attempts)
+    
+    async def _update_csrf_token(self, stale_token):
+        """Refresh the CSRF token after a rejection, unless the error response already carried a new one"""
+        if self.bot.csrf_token == stale_token:
+            await self._run_blocking(self.bot._refresh_csrf_token, stale_token)
+    
+    async def _get_friend_request_count(self):
+        """
+        Get the number of pending friend requests from the lightweight count endpoint
+        
+        Returns:
+            int: Pending friend request count, or None if the probe failed
+            
+        Raises:
+            CircuitOpenError: The count endpoint's circuit is open, so the cycle should be skipped
+        """
+        try:
+            return self.bot._parse_friend_request_count(await self._request('get', self.bot._url('https://friends.roblox.com/v1/user/friend-requests/count')))
+        except CircuitOpenError:
+            raise
         except Exception as e:
-            print(f"❌ Error getting friend requests: {e}")
-            logging.error(f"Error getting friend requests: {e}")
-            traceback.print_exc()
-            return []
+            events.warning('friend_requests.count_error', "❌ Error getting friend request count: {error}", error=e)
+            return None
     
-    def accept_friend_request_direct(self, requester_id):
-        """Accept a friend request using direct API call with multiple retries"""
-        max_retries = 3
+    async def _fetch_friend_requests_page(self, limit, cursor=None):
+        """
+        Fetch a single page of pending friend requests
         
-        for attempt in range(1, max_retries + 1):
-            try:
-                print(f"Direct accept attempt {attempt}/{max_retries} for user ID: {requester_id}")
-                
-                # Ensure we have a valid CSRF token
-                if not self.csrf_token:
-                    print("No CSRF token available, refreshing before accepting request")
-                    self._refresh_csrf_token()
-                
-                url = f'https://friends.roblox.com/v1/users/{requester_id}/accept-friend-request'
-                print(f"Sending accept request to: {url}")
-                print(f"Using CSRF token: {self.csrf_token[:5]}...")
-                
-                # Print all headers for debugging
-                print(f"Request headers: X-CSRF-TOKEN: {self.session.headers.get('X-CSRF-TOKEN', 'None')}")
-                
-                response = self.session.post(url, json={})
-                
-                # Log the complete response for debugging
-                print(f"Accept response status: {response.status_code}")
-                print(f"Accept response body: {response.text}")
-                
-                if response.status_code == 200:
-                    print(f"✅ Successfully accepted friend request from user ID: {requester_id}")
-                    logging.info(f"Successfully accepted friend request from user ID: {requester_id}")
-                    return True
-                elif response.status_code == 403:
-                    print(f"❌ Received 403 when accepting request. Response: {response.text}")
-                    
-                    if 'x-csrf-token' in response.headers:
-                        print("CSRF token expired, refreshing from response headers")
-                        self.csrf_token = response.headers['x-csrf-token']
-                        self.session.headers['X-CSRF-TOKEN'] = self.csrf_token
-                        print(f"New token: {self.csrf_token[:5]}...")
-                        time.sleep(1)  # Brief pause before retry
-                    else:
-                        print("No token in response headers, refreshing via method")
-                        self._refresh_csrf_token()
-                        time.sleep(1)  # Brief pause before retry
-                else:
-                    print(f"❌ Failed with status {response.status_code}: {response.text}")
-                    time.sleep(1)  # Brief pause before retry
-                    
-            except Exception as e:
-                print(f"❌ Error in accept attempt {attempt}: {e}")
-                traceback.print_exc()
-                time.sleep(1)  # Brief pause before retry
+        Args:
+            limit (int): Page size to request, one of FRIEND_REQUEST_PAGE_SIZES
+            cursor (str, optional): Cursor returned by the previous page
+            
+        Returns:
+            tuple: (requests_page, next_cursor) on success, or None if the page could not be fetched
+        """
+        url, params = self.bot._friend_requests_page_args(limit, cursor)
+        token = self.bot.csrf_token
         
-        # If we get here, try the alternative method
-        return self.accept_friend_request_alternative(requester_id)
+        async def on_retry(response):
+            nonlocal token
+            if response.status_code == 403:
+                events.warning('friend_requests.auth_failed', "❌ Authentication failed ({status}), refreshing CSRF token", status=response.status_code)
+                await self._update_csrf_token(token)
+                token = self.bot.csrf_token
+        
+        response = await self._request('get', url, on_retry=on_retry, params=params)
+        return self.bot._parse_friend_requests_page(response)
     
-    def accept_friend_request_alternative(self, requester_id):
-        """Alternative method to accept friend requests if the primary method fails"""
-        alternative_endpoints = [
-            f'https://friends.roblox.com/v1/users/{requester_id}/accept-request',
-            f'https://friends.roblox.com/v1/users/{requester_id}/request/accept',
-            f'https://friends.roblox.com/v1/user/{requester_id}/accept-friend-request'
-        ]
-        
-        for endpoint in alternative_endpoints:
-            try:
-                print(f"Trying alternative accept endpoint: {endpoint}")
+    async def iter_friend_request_pages(self, limit=DEFAULT_FRIEND_REQUEST_PAGE_SIZE, max_pages=DEFAULT_FRIEND_REQUEST_MAX_PAGES):
+        """
+        Asynchronously yield pages of pending friend requests, following nextPageCursor
+        
+        Args:
+            limit (int): Page size, one of FRIEND_REQUEST_PAGE_SIZES
+            max_pages (int, optional): Maximum number of pages to pull. None means no cap.
+            
+        Yields:
+            list: FriendRequest records of one page
+        """
+        self.bot._check_page_size(limit)
+        self.bot._begin_listing()
+        
+        cursor = None
+        pages = 0
+        
+        try:
+            while max_pages is None or pages < max_pages:
+                try:
+                    page = await self._fetch_friend_requests_page(limit, cursor)
+                except CircuitOpenError as e:
+                    events.warning('friend_requests.circuit_open', "🔌 Not fetching friend requests: {error}", error=e)
+                    return
+                if page is None:
+                    return
                 
-                response = self.session.post(endpoint, json={})
-                print(f"Alternative accept response status: {response.status_code}")
-                print(f"Alternative accept response body: {response.text}")
+                requests_page, cursor = page
+                pages += 1
+                events.info('friend_requests.page', "✅ Page {page}: found {count} pending friend requests", page=pages, count=len(requests_page))
+                yield requests_page
                 
-                if response.status_code == 200:
-                    print(f"✅ Successfully accepted friend request using alternative endpoint from user ID: {requester_id}")
-                    logging.info(f"Successfully accepted friend request using alternative endpoint from user ID: {requester_id}")
-                    return True
-                else:
-                    print(f"❌ Alternative endpoint failed: {response.status_code} - {response.text}")
-            except Exception as e:
-                print(f"❌ Error in alternative accept method: {e}")
-                traceback.print_exc()
+                if not cursor:
+                    return
+            
+            events.info('friend_requests.page_cap', "⚠️ Stopped after {pages} pages, more friend requests are waiting for the next cycle", pages=pages)
+        except Exception as e:
+            events.exception('friend_requests.error', "❌ Error getting friend requests: {error}", error=e)
+    
+    async def iter_friend_requests(self, limit=DEFAULT_FRIEND_REQUEST_PAGE_SIZE, max_pages=DEFAULT_FRIEND_REQUEST_MAX_PAGES):
+        """
+        Asynchronously yield pending friend requests, page by page
         
-        # If all alternatives fail, try the web-based approach
-        return self.accept_friend_request_web_based(requester_id)
+        Args:
+            limit (int): Page size, one of FRIEND_REQUEST_PAGE_SIZES
+            max_pages (int, optional): Maximum number of pages to pull. None means no cap.
+            
+        Yields:
+            FriendRequest: Pending friend request
+        """
+        async for requests_page in self.iter_friend_request_pages(limit=limit, max_pages=max_pages):
+            for request in requests_page:
+                yield request
     
-    def accept_friend_request_web_based(self, requester_id):
-        """Web-based approach to accept friend requests by simulating browser behavior"""
+    async def get_friend_requests(self, limit=DEFAULT_FRIEND_REQUEST_PAGE_SIZE, max_pages=DEFAULT_FRIEND_REQUEST_MAX_PAGES):
+        """
+        Get all pending friend requests
+        
+        Args:
+            limit (int): Page size, one of FRIEND_REQUEST_PAGE_SIZES
+            max_pages (int, optional): Maximum number of pages to pull. None means no cap.
+            
+        Returns:
+            list: FriendRequest records from every fetched page
+        """
+        processed_requests = [request async for request in self.iter_friend_requests(limit=limit, max_pages=max_pages)]
+        events.info('friend_requests.found', "✅ Found {count} pending friend requests", count=len(processed_requests))
+        return processed_requests
+    
+    async def _lookup_profiles(self, user_ids):
+        """
+        Fetch requester profiles in one call to the batch users endpoint
+        
+        Args:
+            user_ids (list): Up to DEFAULT_PROFILE_BATCH_SIZE user IDs
+            
+        Returns:
+            list: User entries from the response, empty if the lookup failed
+        """
+        url, body = self.bot._lookup_profiles_args(user_ids)
+        token = self.bot.csrf_token
+        
+        async def on_retry(response):
+            nonlocal token
+            if response.status_code == 403:
+                await self._update_csrf_token(token)
+                token = self.bot.csrf_token
+                return 0
+            return None
+        
         try:
-            print(f"Trying web-based approach for user ID: {requester_id}")
+            response = await self._request('post', url, failed=_is_failed_lookup, on_retry=on_retry, json=body)
+        except requests.RequestException as e:
+            events.warning('filter.lookup_error', "⚠️ Error looking up {count} requesters: {error}", count=len(user_ids), error=e)
+            return []
+        return self.bot._parse_lookup_profiles(response, user_ids)
+    
+    async def filter_friend_requests(self, requests_page):
+        """
+        Drop friend requests the requester filter rejects, looking up unknown requesters in bulk
+        
+        Same rules and bookkeeping as RobloxFriendBot.filter_friend_requests, running the batch lookups concurrently.
+        
+        Args:
+            requests_page (list): FriendRequest records of one page
             
-            # First, get the CSRF token from the web page
-            response = self.session.get('https://www.roblox.com/home')
-            if response.status_code != 200:
-                print(f"❌ Failed to load home page: {response.status_code}")
-                return False
+        Returns:
+            list: FriendRequest records to accept
+        """
+        requester_filter = self.bot.requester_filter
+        if not requester_filter or not requests_page:
+            return requests_page
+        
+        batches = requester_filter.missing(requests_page)
+        for entries in await asyncio.gather(*(self._lookup_profiles(batch) for batch in batches)):
+            requester_filter.store(entries)
+        
+        kept, rejected, deferred = requester_filter.apply(requests_page)
+        self.bot._record_filtered(rejected, deferred)
+        return kept
+    
+    async def _accept(self, requester_id, endpoint_names=None, max_attempts=3):
+        """
+        Accept a friend request, walking the endpoints in order of observed success
+        
+        Makes the same decisions as RobloxFriendBot._accept, backing off on the
+        event loop instead of the thread.
+        
+        Args:
+            requester_id (int): User ID that sent the friend request
+            endpoint_names (list, optional): Only use these endpoints from ACCEPT_ENDPOINTS
+            max_attempts (int): Attempts per endpoint for retryable responses
             
-            # Now try the web-based accept endpoint
-            url = f'https://www.roblox.com/api/friends/acceptfriendrequest'
-            payload = {
-                'targetUserID': requester_id
-            }
+        Returns:
+            AcceptResult: Whether it was accepted, how the last response was classified and why
+        """
+        calls = 0
+        kind, reason = ENDPOINT_FAILED, 'no endpoints tried'
+        
+        for endpoint in self.bot.accept_strategy.ordered(endpoint_names):
+            if not self.bot.csrf_token:
+                events.debug('accept.no_token', "No CSRF token available, refreshing before accepting request")
+                await self._run_blocking(self.bot._refresh_csrf_token)
             
-            response = self.session.post(url, data=payload)
-            print(f"Web-based accept response status: {response.status_code}")
-            print(f"Web-based accept response body: {response.text}")
+            url, kwargs = self.bot._accept_request_args(endpoint, requester_id)
+            token = self.bot.csrf_token
+            attempt = 0
+            outcome = [ENDPOINT_FAILED, 'no response']
             
-            if response.status_code == 200:
-                try:
-                    result = response.json()
-                    if result.get('success'):
-                        print(f"✅ Successfully accepted friend request using web-based approach from user ID: {requester_id}")
-                        logging.info(f"Successfully accepted friend request using web-based approach from user ID: {requester_id}")
-                        return True
-                except:
-                    pass
+            async def send():
+                nonlocal calls, token, attempt
+                calls += 1
+                attempt += 1
+                token = self.bot.csrf_token
+                events.debug('accept.attempt', "Accept attempt {attempt}/{max_attempts} via {endpoint} for user ID: {requester_id}",
+                             attempt=attempt, max_attempts=max_attempts, endpoint=endpoint['name'], requester_id=requester_id)
+                response = await self._run_blocking(self.bot.session.post, url, **kwargs)
+                outcome[:] = self.bot._classify_accept(endpoint, response)
+                return response
             
-            print(f"❌ Web-based approach failed: {response.status_code} - {response.text}")
-            return False
+            async def on_retry(response):
+                if outcome[0] == CSRF_REJECTED:
+                    await self._update_csrf_token(token)
+                    return 0
+                return None
             
-        except Exception as e:
-            print(f"❌ Error in web-based accept method: {e}")
-            traceback.print_exc()
+            try:
+                await self.bot.guard.call_async(url, send, retryable=lambda response: outcome[0] in RETRYABLE_KINDS,
+                                                failed=lambda response: _is_failed_accept(outcome[0], response), on_retry=on_retry, max_attempts=max_attempts)
+                kind, reason = outcome
+            except requests.RequestException as e:
+                kind, reason = self.bot._accept_error(endpoint, e)
+            
+            result = self.bot._settle_accept(endpoint, requester_id, kind, reason, calls)
+            if result is not None:
+                return result
+        
+        return AcceptResult(False, kind, reason, calls)
+    
+    async def _accept_friend_request(self, requester_id):
+        """
+        Accept a friend request once a concurrency slot is free and report the outcome
+        
+        Returns:
+            AcceptResult: Whether it was accepted, how the last response was classified and why
+        """
+        async with self._semaphore:
+            if self.bot.progress is not None:
+                self.bot.progress.start(requester_id)
+            self.metrics.add_gauge('accepts_in_flight', 1)
+            try:
+                with self.metrics.timer('accept_duration_seconds'):
+                    result = await self._accept(requester_id)
+            finally:
+                self.metrics.add_gauge('accepts_in_flight', -1)
+        self.bot._record_accept_metrics(requester_id, result)
+        
+        if result.kind == TERMINAL:
+            events.warning('accept.rejected', "❌ Friend request from user ID {requester_id} cannot be accepted: {reason}", requester_id=requester_id, reason=result.reason)
+        elif not result.accepted:
+            events.warning('accept.exhausted', "❌ All methods failed to accept friend request from user ID {requester_id}", requester_id=requester_id, calls=result.calls)
+        return result
+    
+    async def accept_friend_request(self, requester_id):
+        """
+        Accept a friend request, waiting for a free concurrency slot first
+        
+        Args:
+            requester_id (int): User ID that sent the friend request
+            
+        Returns:
+            bool: True if the friend request was accepted
+        """
+        return (await self._accept_friend_request(requester_id)).accepted
+    
+    async def _process_request(self, request):
+        """Accept one processed friend request, record and log the outcome"""
+        requester_id = request.requester_id
+        requester_name = request.requester_name
+        
+        if not requester_id:
             return False
+        
+        events.info('request.processing', "👥 Processing friend request from {requester_name} (ID: {requester_id})",
+                    requester_name=requester_name, requester_id=requester_id)
+        result = await self._accept_friend_request(requester_id)
+        if self.bot.state_store:
+            self.bot.state_store.record_result(requester_id, result)
+        if self.bot.progress is not None:
+            self.bot.progress.finish(requester_id)
+        return result.accepted
     
-    def accept_friend_request(self, requester_id):
-        """Master method to accept a friend request using all available methods"""
-        print(f"\n==== ACCEPTING FRIEND REQUEST FROM USER ID: {requester_id} ====")
+    async def accept_friend_requests(self, requests_list):
+        """
+        Accept a batch of friend requests concurrently
         
-        # Try the direct method first
-        result = self.accept_friend_request_direct(requester_id)
+        Args:
+            requests_list (list): FriendRequest records
+            
+        Returns:
+            int: Number of friend requests accepted
+        """
+        results = await asyncio.gather(*(self._process_request(request) for request in requests_list))
+        return sum(1 for result in results if result)
+    
+    async def _admit(self, items):
+        """Drop recently handled and filtered-out friend requests, noting the rest in the run's progress"""
+        items, _ = self.bot._skip_handled(items)
+        items = await self.filter_friend_requests(items)
+        self.bot.progress.add(items)
+        return items
+    
+    async def _gather_accepts(self, tasks):
+        """
+        Wait for a cycle's accepts, cutting it short on shutdown
         
-        # If successful, return True
-        if result:
-            print(f"✅ SUCCESSFULLY ACCEPTED FRIEND REQUEST FROM USER ID: {requester_id}")
-            return True
+        Once shutdown is requested, accepts still waiting for a concurrency slot
+        are cancelled and those in flight get until the deadline to finish.
+        Anything unsettled by then stays in the run's progress for the checkpoint.
         
-        # If we get here, all methods failed
-        print(f"❌ ALL METHODS FAILED TO ACCEPT FRIEND REQUEST FROM USER ID: {requester_id}")
-        return False
+        Args:
+            tasks (dict): Accept tasks mapped to their requester IDs
+            
+        Returns:
+            list: Results of the accepts that finished
+        """
+        shutdown = self.bot.shutdown
+        gathered = asyncio.gather(*tasks, return_exceptions=True)
+        stopped = asyncio.ensure_future(shutdown.wait_stopping())
+        await asyncio.wait({gathered, stopped}, return_when=asyncio.FIRST_COMPLETED)
+        stopped.cancel()
+        
+        if not gathered.done():
+            for task, requester_id in tasks.items():
+                if not self.bot.progress.is_in_flight(requester_id):
+                    task.cancel()
+            await asyncio.wait(tasks, timeout=shutdown.remaining())
+            for task in tasks:
+                task.cancel()
+        
+        results = await gathered
+        for result in results:
+            if isinstance(result, Exception) and not isinstance(result, asyncio.CancelledError):
+                raise result
+        return [result for result in results if not isinstance(result, BaseException)]
+    
+    async def _resume(self, checkpoint):
+        """Accept the friend requests a previous run left unfinished, before the first poll"""
+        items = self.bot._checkpoint_requests(checkpoint)
+        if not items:
+            return
+        
+        items = await self._admit(items)
+        tasks = {asyncio.create_task(self._process_request(request)): request.requester_id for request in items}
+        if tasks:
+            results = await self._gather_accepts(tasks)
+            await self._run_blocking(self.bot.state_store.flush)
+            events.info('bot.resumed', "♻️ Resumed {accepted}/{found} friend requests", accepted=sum(1 for result in results if result), found=len(tasks))
+    
+    async def _wait_for_pushes(self, realtime, delay, caught_up):
+        """
+        Wait until the next poll is due, accepting friend requests as the realtime hub pushes them
+        
+        Same timing as RobloxFriendBot._wait_for_pushes, with each batch of pushed requests accepted concurrently.
+        """
+        shutdown = self.bot.shutdown
+        started = time.monotonic()
+        while not shutdown.stopping:
+            wait = max(delay, realtime.poll_interval) if realtime.connected and caught_up else delay
+            if not await realtime.wait_async(started + wait - time.monotonic(), shutdown):
+                return
             
-    def run_forever(self, check_interval=5):  # Reduced interval for faster response
+            pushed, resync = realtime.take()
+            items = await self._admit(pushed) if pushed else []
+            tasks = {asyncio.create_task(self._process_request(request)): request.requester_id for request in items}
+            if tasks:
+                await self._gather_accepts(tasks)
+                if self.bot.state_store:
+                    await self._run_blocking(self.bot.state_store.flush)
+            if resync:
+                return
+    
+    async def run_forever(self, check_interval=5, page_size=DEFAULT_FRIEND_REQUEST_PAGE_SIZE, max_pages=DEFAULT_FRIEND_REQUEST_MAX_PAGES, count_probe=True, scheduler=None, state_store=None,
+                          requester_filter=None, shutdown=None, realtime=None):
         """
-        Run the bot continuously, checking for and accepting friend requests
+        Run the bot, accepting friend requests concurrently until shutdown is requested
+        
+        Accepts for a page are started as soon as the page arrives, so they run
+        while the next page is being fetched. SIGTERM and SIGINT stop polling
+        and drain the accepts in flight within the shutdown deadline. The
+        friend requests left over are checkpointed in the state store, and the
+        next run accepts them before its first poll. With a realtime subscriber,
+        pushed friend requests are accepted as they arrive and polling falls back
+        to a safety net while the stream is connected.
         
         Args:
-            check_interval (int): How often to check for new friend requests, in seconds
+            check_interval (int): Starting interval between checks, in seconds
+            page_size (int): How many friend requests to fetch per page
+            max_pages (int, optional): Maximum number of pages to pull per cycle. None means no cap.
+            count_probe (bool): Check the friend request count first and skip the full listing when idle
+            scheduler (PollScheduler, optional): Decides how long to wait between checks. Defaults to an AdaptivePollScheduler.
+            state_store (RequestStateStore, optional): Remembers outcomes so recently handled requesters are skipped,
+                and holds the checkpoint
+            requester_filter (RequesterFilter, optional): Decides which requesters to accept. Everyone is accepted if not provided.
+            shutdown (ShutdownController, optional): Handles shutdown signals. If not provided, read from SHUTDOWN_DEADLINE env var.
+            realtime (RealtimeSubscriber, optional): Pushes friend requests from the realtime notification hub. Polling only if not provided.
         """
-        print("\n==================================================")
-        print("🤖 ROBLOX FRIEND REQUEST AUTO-ACCEPTER BOT STARTED")
-        print("==================================================\n")
-        print(f"⏱️ Checking for friend requests every {check_interval} seconds")
-        logging.info(f"Bot started. Checking for friend requests every {check_interval} seconds")
+        self.bot.scheduler = scheduler or AdaptivePollScheduler(initial_interval=check_interval)
+        self.bot.state_store = state_store
+        self.bot.requester_filter = requester_filter
+        self.bot.shutdown = shutdown = shutdown or ShutdownController.from_env()
+        self.bot.progress = RunProgress()
+        shutdown.install(asyncio.get_running_loop())
+        if realtime is not None:
+            realtime.start(self.bot, asyncio.get_running_loop())
+        
+        events.info('bot.started', "🤖 Async bot started. Checking every {interval} seconds, accepting up to {concurrency} at once",
+                    interval=check_interval, concurrency=self.max_concurrency, scheduler=type(self.bot.scheduler).__name__)
         
         if self.username:
-            print(f"👤 Logged in as {self.username} (ID: {self.user_id})")
+            events.info('bot.user', "👤 Logged in as {username} (ID: {user_id})", username=self.username, user_id=self.user_id)
         else:
-            print("❌ Not logged in! Please check your security token.")
+            events.error('bot.not_logged_in', "❌ Not logged in! Please check your security token.")
         
-        retry_count = 0
-        max_retries = 5
-        
-        while True:
-            try:
-                print("\n--------------------------------------------------")
-                print("🔄 CHECKING FOR NEW FRIEND REQUESTS...")
-                print("--------------------------------------------------")
-                
-                # Check if we're still logged in
-                if not self._get_user_info():
-                    print("❌ Session may have expired, refreshing login")
-                    logging.warning("Session may have expired, refreshing login")
-                    self._refresh_csrf_token()
-                    retry_count += 1
+        try:
+            checkpoint = await self._run_blocking(state_store.take_checkpoint) if state_store else None
+            if checkpoint:
+                await self._resume(checkpoint)
+            
+            while not shutdown.stopping:
+                try:
+                    events.debug('cycle.started', "🔄 Checking for new friend requests")
+                    self.bot.progress.clear()
+                    started = time.monotonic()
+                    cycle_started = time.perf_counter()
+                    tasks = {}
                     
-                    if retry_count >= max_retries:
-                        print(f"❌ Failed to authenticate after {max_retries} attempts. Waiting longer before retry.")
-                        logging.error(f"Failed to authenticate after {max_retries} attempts. Waiting longer before retry.")
-                        time.sleep(check_interval * 2)  # Wait longer before next attempt
-                        retry_count = 0
+                    # Check if we're still logged in, using the cached check while it is fresh
+                    if not await self._run_blocking(self.bot._ensure_logged_in):
+                        await self._run_blocking(self.bot._refresh_csrf_token)
+                        self.bot.scheduler.record_error()
+                        await shutdown.sleep(self.bot.scheduler.next_delay())
+                        continue
                     
-                    continue
-                
-                # Reset retry count on successful authentication
-                retry_count = 0
-                
-                # Get and process friend requests
-                requests = self.get_friend_requests()
-                
-                if not requests:
-                    print("ℹ️ No pending friend requests found.")
-                else:
-                    print(f"🎉 Found {len(requests)} pending friend requests!")
-                
-                for request in requests:
-                    requester_id = request.get('requesterUserId')
-                    requester_name = request.get('requesterUsername', 'Unknown')
+                    # Probe the cheap count endpoint before pulling the full listing, skipping the cycle while its circuit is open
+                    try:
+                        count = await self._get_friend_request_count() if count_probe else None
+                    except CircuitOpenError as e:
+                        events.warning('cycle.circuit_open', "🔌 Skipping this cycle: {error}", error=e)
+                        self.bot.scheduler.record_error()
+                        await shutdown.sleep(max(self.bot.scheduler.next_delay(), e.retry_in))
+                        continue
                     
-                    if requester_id:
-                        print(f"\n👥 Processing friend request from {requester_name} (ID: {requester_id})")
-                        logging.info(f"Processing friend request from {requester_name} (ID: {requester_id})")
-                        success = self.accept_friend_request(requester_id)
-                        if success:
-                            print(f"✅ Successfully accepted friend request from {requester_name}")
-                            logging.info(f"Successfully accepted friend request from {requester_name}")
+                    caught_up = True
+                    if count_probe and not self.bot._should_list_friend_requests(count):
+                        events.debug('cycle.idle', "ℹ️ No pending friend requests found.")
+                    elif self.bot._unauthorized:
+                        # The probe got a 401, re-verify login on the next cycle instead of listing
+                        self.bot.scheduler.record_error()
+                        await shutdown.sleep(self.bot.scheduler.next_delay())
+                        continue
+                    else:
+                        async for items in self.iter_friend_request_pages(limit=page_size, max_pages=max_pages):
+                            items = await self._admit(items)
+                            tasks.update((asyncio.create_task(self._process_request(request)), request.requester_id) for request in items)
+                            if shutdown.stopping:
+                                break
+                        
+                        if not tasks:
+                            events.debug('cycle.idle', "ℹ️ No pending friend requests found.")
                         else:
-                            print(f"❌ Failed to accept friend request from {requester_name}")
-                            logging.warning(f"Failed to accept friend request from {requester_name}")
-                
-                # Wait before checking again
-                print(f"\n⏱️ Waiting {check_interval} seconds before checking again...")
-                time.sleep(check_interval)
-                
-            except Exception as e:
-                print(f"❌ Error in main loop: {e}")
-                logging.error(f"Error in main loop: {e}")
-                traceback.print_exc()
-                retry_count += 1
-                
-                if retry_count >= max_retries:
-                    print(f"❌ Too many errors ({max_retries}). Waiting longer before retry.")
-                    logging.error(f"Too many errors ({max_retries}). Waiting longer before retry.")
-                    time.sleep(check_interval * 2)  # Wait longer before next attempt
-                    retry_count = 0
-                else:
-                    # Don't exit the loop, just wait and try again
-                    time.sleep(check_interval)
+                            results = await self._gather_accepts(tasks)
+                            accepted = sum(1 for result in results if result)
+                            elapsed = time.monotonic() - started
+                            events.info('cycle.processed', "🎉 Accepted {accepted}/{found} friend requests in {elapsed:.2f}s",
+                                        accepted=accepted, found=len(tasks), elapsed=elapsed, endpoints=self.bot.accept_strategy.snapshot)
+                            
+                            # Write this cycle's outcomes in one transaction
+                            if state_store:
+                                await self._run_blocking(state_store.flush)
+                        self.bot._note_idle_backlog()
+                        caught_up = self.bot._listing_complete
+                    
+                    self.metrics.observe('poll_cycle_duration_seconds', time.perf_counter() - cycle_started)
+                    self.metrics.maybe_log_summary()
+                    
+                    # Wait before checking again, waking early on shutdown
+                    self.bot.scheduler.record_cycle(len(tasks))
+                    delay = self.bot.scheduler.next_delay()
+                    events.debug('cycle.wait', "⏱️ Waiting {delay:.2f} seconds before checking again", delay=delay, scheduler=self.bot.scheduler.snapshot)
+                    if realtime is None:
+                        await shutdown.sleep(delay)
+                    else:
+                        await self._wait_for_pushes(realtime, delay, caught_up)
+                except Exception as e:
+                    events.exception('cycle.error', "❌ Error in main loop: {error}", error=e)
+                    self.bot.scheduler.record_error()
+                    await shutdown.sleep(self.bot.scheduler.next_delay())
+        finally:
+            shutdown.close()
+            if realtime is not None:
+                await self._run_blocking(realtime.stop)
+                self.bot.progress.add(realtime.take()[0])
+            if state_store:
+                await self._run_blocking(state_store.save_checkpoint, self.bot.progress, self.bot.scheduler, shutdown.reason)
+            events.info('bot.stopped', "👋 Bot stopped ({reason}) with {left} friend requests left for the next run",
+                        reason=shutdown.reason or 'interrupted', left=len(self.bot.progress))
+            # Accepts abandoned at the deadline may still hold worker threads, don't wait for them
+            self._executor.shutdown(wait=False, cancel_futures=True)
 
 
 if __name__ == "__main__":
+    startup = StartupTimer()
+    configure_logging()
+    
     # Instructions for Railway
     print("\n==================================================")
     print("🤖 ROBLOX FRIEND REQUEST AUTO-ACCEPTER BOT")
@@ -476,17 +4741,57 @@ if __name__ == "__main__":
     if not os.environ.get('ROBLOSECURITY'):
         print("\n❌ WARNING: ROBLOSECURITY environment variable not found!")
         print("The bot will not work until you set this.")
-        print("Waiting for 10 seconds before attempting to start anyway...")
-        time.sleep(10)
     
     try:
-        # Create and run the bot
-        bot = RobloxFriendBot()
-        bot.run_forever()
+        # Pick the poll scheduler, adaptive unless a fixed interval is requested
+        check_interval = float(os.environ.get('CHECK_INTERVAL', 5))
+        if os.environ.get('POLL_SCHEDULER', 'adaptive').lower() == 'fixed':
+            scheduler = PollScheduler(interval=check_interval)
+        else:
+            scheduler = AdaptivePollScheduler(
+                initial_interval=check_interval,
+                min_interval=float(os.environ.get('POLL_MIN_INTERVAL', DEFAULT_POLL_MIN_INTERVAL)),
+                max_interval=float(os.environ.get('POLL_MAX_INTERVAL', DEFAULT_POLL_MAX_INTERVAL))
+            )
+        
+        # Remember handled requesters across restarts
+        state_store = RequestStateStore(os.environ.get('STATE_DB', DEFAULT_STATE_DB))
+        
+        # Collect metrics, logging a summary periodically and serving them if a port is set
+        metrics = BotMetrics(summary_interval=float(os.environ.get('METRICS_SUMMARY_INTERVAL', DEFAULT_METRICS_SUMMARY_INTERVAL)))
+        if os.environ.get('METRICS_PORT'):
+            MetricsServer(metrics, int(os.environ['METRICS_PORT']), os.environ.get('METRICS_HOST', DEFAULT_METRICS_HOST)).start()
+        
+        # Only accept requesters that pass the FILTER_* rules, if any are set
+        requester_filter = RequesterFilter.from_env(metrics)
+        
+        # Stop gracefully on SIGTERM, checkpointing unfinished requests into the state store
+        shutdown = ShutdownController.from_env()
+        
+        # Accept friend requests as the realtime hub pushes them if REALTIME_NOTIFICATIONS is set, polling as a fallback
+        realtime = RealtimeSubscriber.from_env()
+        
+        # Profile CPU and memory if PROFILE_CPU or PROFILE_MEMORY is set, pair with HTTP_REPLAY to profile offline
+        profile = ProfileSession.from_env()
+        
+        # Create and run the bot, using the asyncio engine if requested
+        profile.start()
+        try:
+            if os.environ.get('BOT_ENGINE', 'sync').lower() == 'async':
+                concurrency = int(os.environ.get('ACCEPT_CONCURRENCY', DEFAULT_ACCEPT_CONCURRENCY))
+                bot = AsyncRobloxFriendBot(max_concurrency=concurrency, bot=RobloxFriendBot(metrics=metrics, startup=startup))
+                asyncio.run(bot.run_forever(check_interval=check_interval, scheduler=scheduler, state_store=state_store, requester_filter=requester_filter,
+                                            shutdown=shutdown, realtime=realtime))
+            else:
+                bot = RobloxFriendBot(metrics=metrics, startup=startup)
+                bot.run_forever(check_interval=check_interval, scheduler=scheduler, state_store=state_store, requester_filter=requester_filter,
+                                shutdown=shutdown, realtime=realtime)
+        except KeyboardInterrupt:
+            events.warning('shutdown.deadline', "🛑 Shutdown deadline reached, in-flight accepts were left in the checkpoint")
+        finally:
+            profile.stop()
+            state_store.close()
     except ValueError as e:
-        print(f"❌ Error: {e}")
-        print("Please set your .ROBLOSECURITY cookie and try again.")
+        events.error('bot.config_error', "❌ Error: {error}. Please set your .ROBLOSECURITY cookie and try again.", error=e)
     except Exception as e:
-        print(f"❌ Unexpected error: {e}")
-        traceback.print_exc()
-        print("The bot has crashed. Please check the logs for details.")
+        events.exception('bot.crashed', "❌ Unexpected error: {error}. The bot has crashed.", error=e)